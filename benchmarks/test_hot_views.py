@@ -0,0 +1,53 @@
+"""
+The hot views of ``djforms.benchmark`` as a pytest-benchmark suite, on a small seeded dataset:
+
+    pytest benchmarks --benchmark-autosave
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=median:20%
+
+The ``benchmark_views`` command runs the same requests without pytest, on datasets of any size.
+"""
+import random
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytest.importorskip("pytest_django")
+pytest.importorskip("pytest_benchmark")
+
+# once pytest-django has set Django up
+from djforms.benchmark import VIEW_BENCHMARKS, seed_benchmark_dataset, request_view
+
+FORMS = 2
+QUESTIONS = 30
+OPTIONS = 5
+RESPONSES = 200
+
+
+@pytest.fixture
+def dataset(db, settings, tmp_path):
+    settings.DJFORMS_EXPORT_ROOT = str(tmp_path)
+    return seed_benchmark_dataset(FORMS, QUESTIONS, OPTIONS, RESPONSES)
+
+
+@pytest.fixture
+def owner_client(client, dataset):
+    client.force_login(dataset.owner)
+    return client
+
+
+@pytest.mark.parametrize("view", VIEW_BENCHMARKS, ids=[view.name for view in VIEW_BENCHMARKS])
+def test_hot_view(benchmark, view, owner_client, dataset):
+    rnd = random.Random(0)
+
+    with CaptureQueriesContext(connection) as context:
+        response = request_view(view, owner_client, dataset, rnd)
+
+    assert response.status_code < 400
+    benchmark.extra_info["queries"] = len(context.captured_queries)
+    benchmark.extra_info["dataset"] = {"forms": FORMS, "questions": QUESTIONS, "options": OPTIONS,
+                                       "responses": RESPONSES}
+
+    response = benchmark(request_view, view, owner_client, dataset, rnd)
+
+    assert response.status_code < 400
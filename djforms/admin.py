@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import User, Form, Question, Option, Settings, Response, Answer
+from .models import User, Form, Question, Option, Settings, Response, Answer, ExportJob
 
 
 class UserAdmin(admin.ModelAdmin):
@@ -8,7 +8,7 @@ class UserAdmin(admin.ModelAdmin):
 
 
 class FormAdmin(admin.ModelAdmin):
-    list_display = ["id", "title", "description", "created_by", "created_at", "updated_at"]
+    list_display = ["id", "title", "description", "created_by", "created_at", "updated_at", "version"]
 
 
 class QuestionAdmin(admin.ModelAdmin):
@@ -31,6 +31,11 @@ class AnswerAdmin(admin.ModelAdmin):
     list_display = ["id", "response", "question", "text"]
 
 
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ["id", "form", "requested_by", "status", "processed", "total", "file_size", "created_at",
+                    "updated_at"]
+
+
 admin.site.register(User, UserAdmin)
 admin.site.register(Form, FormAdmin)
 admin.site.register(Question, QuestionAdmin)
@@ -38,3 +43,4 @@ admin.site.register(Option, OptionAdmin)
 admin.site.register(Settings, SettingsAdmin)
 admin.site.register(Response, ResponseAdmin)
 admin.site.register(Answer, AnswerAdmin)
+admin.site.register(ExportJob, ExportJobAdmin)
@@ -0,0 +1,206 @@
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from typing import NamedTuple, Callable
+
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import User, Form, Question, Option, Settings, Response
+from .schema import compile_form, CompiledForm
+from .storage import save_response
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet"]
+
+
+def create_benchmark_form(label: str, questions: int, options: int, user: User = None):
+    """
+    Creates a form of the user (of a new user by default), cycling through the question types,
+    and returns it compiled.
+    """
+    user = user or User.objects.create_user(f"benchmark-{label}-{time.time_ns()}")
+    form = Form.objects.create(title=f"Benchmark ({label})", created_by=user)
+    Settings.objects.create(form=form)
+
+    question_types = Question.QuestionType.values
+    created_questions = Question.objects.bulk_create([
+        Question(form=form, text=f"Question {order}", type=question_types[order % len(question_types)],
+                 order=order)
+        for order in range(1, questions + 1)
+    ])
+    Option.objects.bulk_create([
+        Option(question=question, text=f"Option {order}", order=order)
+        for question in created_questions
+        if question.type in [Question.QuestionType.RADIO, Question.QuestionType.CHECKBOX]
+        for order in range(1, options + 1)
+    ])
+
+    return compile_form(form.id)
+
+
+def random_answers(form: CompiledForm, rnd):
+    """
+    Random answers to all the questions of the form, in the format of the submitted form data.
+    """
+    answers = {}
+
+    for question in form.questions:
+        option_ids = [str(option.id) for option in question.options]
+
+        if question.type == Question.QuestionType.RADIO:
+            answers[str(question.id)] = rnd.choice(option_ids)
+        elif question.type == Question.QuestionType.CHECKBOX:
+            answers[str(question.id)] = rnd.sample(option_ids, rnd.randint(1, len(option_ids)))
+        else:
+            answers[str(question.id)] = " ".join(rnd.choices(WORDS, k=rnd.randint(1, 30)))
+
+    return answers
+
+
+class BenchmarkDataset(NamedTuple):
+    owner: User
+    forms: list  # compiled forms
+    response_id: int  # a response of the first form
+
+
+def seed_benchmark_dataset(forms: int, questions: int, options: int, responses: int, seed: int = 0):
+    """
+    Creates forms of a new user, each of them with the given numbers of questions, options per choice question
+    and responses (saved as submitted, with counters and search index).
+    """
+    rnd = random.Random(seed)
+    owner = User.objects.create_user(f"benchmark-views-{time.time_ns()}")
+    compiled_forms = [create_benchmark_form("views", questions, options, user=owner) for _ in range(forms)]
+
+    for form in compiled_forms:
+        for _ in range(responses):
+            save_response(form, Response(form_id=form.id), random_answers(form, rnd))
+
+    response_id = Response.objects.filter(form_id=compiled_forms[0].id).values_list("id", flat=True).first()
+    return BenchmarkDataset(owner, compiled_forms, response_id)
+
+
+class ViewBenchmark(NamedTuple):
+    name: str
+    # request made by the test client, logged in as the owner of the forms, returning the response
+    request: Callable[[object, BenchmarkDataset, random.Random], object]
+
+
+def _post_response(client, dataset: BenchmarkDataset, rnd):
+    form = dataset.forms[0]
+    data = {
+        f"answers[{question_id}][]" if isinstance(value, list) else f"answers[{question_id}]": value
+        for question_id, value in random_answers(form, rnd).items()
+    }
+    return client.post(reverse("respond", args=[form.id]), data)
+
+
+def _put_form(client, dataset: BenchmarkDataset, rnd):
+    form = dataset.forms[0]
+    form_data = form.serialize()
+    form_data["questions"][0]["text"] = f"Question {rnd.randint(0, 10 ** 9)}"  # one changed question per request
+    return client.put(reverse("api_forms", args=[form.id]), form_data, content_type="application/json")
+
+
+VIEW_BENCHMARKS = [
+    ViewBenchmark("respond GET", lambda client, dataset, rnd: client.get(
+        reverse("respond", args=[dataset.forms[0].id]))),
+    ViewBenchmark("respond POST", _post_response),
+    ViewBenchmark("download", lambda client, dataset, rnd: client.get(
+        reverse("download", args=[dataset.forms[0].id]))),
+    ViewBenchmark("response", lambda client, dataset, rnd: client.get(
+        reverse("response", args=[dataset.response_id]))),
+    ViewBenchmark("form_responses", lambda client, dataset, rnd: client.get(
+        reverse("form_responses", args=[dataset.forms[0].id]))),
+    ViewBenchmark("index", lambda client, dataset, rnd: client.get(reverse("index"))),
+    ViewBenchmark("api_forms PUT", _put_form),  # last, as the compiled forms of the dataset are then outdated
+]
+
+
+def request_view(benchmark: ViewBenchmark, client, dataset: BenchmarkDataset, rnd):
+    """
+    Makes the request of the benchmark, reading streamed contents entirely, and returns the response.
+    """
+    response = benchmark.request(client, dataset, rnd)
+
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+
+    return response
+
+
+def run_view_benchmark(benchmark: ViewBenchmark, client, dataset: BenchmarkDataset, repeat: int, seed: int = 0):
+    """
+    Requests the view once to warm up, ``repeat`` times timed, then once counting the queries
+    and once tracing the peak memory (both slow the request down). Streamed contents are read entirely.
+
+    Returns the latencies (in milliseconds), the number of queries, the peak memory (in KiB) and the status code.
+    """
+    rnd = random.Random(seed)
+
+    def request():
+        return request_view(benchmark, client, dataset, rnd)
+
+    request()
+    latencies = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        request()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    reset_queries()  # the log of the queries is bounded, and may be full with DEBUG
+
+    with CaptureQueriesContext(connection) as context:
+        response = request()
+
+    queries = len(context.captured_queries)  # read from the log of the queries, reset by the next request
+    tracemalloc.start()
+    try:
+        request()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(latencies), 3),
+        "min_ms": round(min(latencies), 3),
+        "max_ms": round(max(latencies), 3),
+        "queries": queries,
+        "peak_kb": round(peak / 1024, 1),
+        "status": response.status_code,
+    }
+
+
+def load_benchmark_results(path: str):
+    with open(path) as file:
+        return json.load(file)
+
+
+def compare_benchmark_results(previous: dict, current: dict, threshold: float):
+    """
+    Compares the results of two runs, view by view, returning the regressions as messages:
+    a median latency or a peak memory above the previous one by more than ``threshold`` (0.2 for 20 %),
+    or more queries. Views missing from either run are skipped.
+    """
+    regressions = []
+
+    for name, result in current["results"].items():
+        before = previous["results"].get(name)
+
+        if not before:
+            continue
+
+        for key in ["median_ms", "peak_kb"]:
+            if before[key] and result[key] > before[key] * (1 + threshold):
+                regressions.append(f"{name}: {key} {before[key]} -> {result[key]} "
+                                   f"(+{100 * (result[key] / before[key] - 1):.0f} %)")
+
+        if result["queries"] > before["queries"]:
+            regressions.append(f"{name}: queries {before['queries']} -> {result['queries']}")
+
+    return regressions
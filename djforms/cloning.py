@@ -0,0 +1,139 @@
+from django.conf import settings
+from django.db import transaction
+
+from .models import User, Form, Settings, Question, Option, Response, Answer, FormCounter, QuestionCounter, \
+    OptionCounter
+from .schema import CompiledForm
+from .search import index_answer_rows
+
+CLONE_CHUNK_SIZE = 500
+
+
+def is_response_cloning_allowed():
+    """
+    Whether forms can be cloned with their responses (meant for test environments),
+    set by ``DJFORMS_CLONE_RESPONSES``, allowed in debug mode by default.
+    """
+    return getattr(settings, "DJFORMS_CLONE_RESPONSES", settings.DEBUG)
+
+
+def clone_form(form: CompiledForm, user: User, with_responses: bool = False):
+    """
+    Copies the form with its settings, questions and options for the user, in a fixed number of inserts
+    whatever the size of the form: the questions and options are inserted in bulk, with their new IDs
+    mapped from the old ones. Returns the new form.
+
+    With ``with_responses``, the responses, answers, choices and counters are copied too,
+    by chunks of responses (with a fixed number of queries per chunk).
+    """
+    with transaction.atomic():
+        clone = Form.objects.create(title=f"{form.title} (copy)"[:256], description=form.description,
+                                    created_by=user)
+        Settings.objects.create(
+            form=clone,
+            is_open=form.settings.is_open,
+            authenticated_response=form.settings.authenticated_response,
+            multiple_response=form.settings.multiple_response,
+        )
+
+        questions = Question.objects.bulk_create([
+            Question(form=clone, text=question.text, type=question.type, is_required=question.is_required,
+                     order=question.order)
+            for question in form.questions
+        ])
+        question_ids = {old.id: new.id for old, new in zip(form.questions, questions)}
+
+        old_options = [option for question in form.questions for option in question.options]
+        options = Option.objects.bulk_create([
+            Option(question_id=question_ids[option.question_id], text=option.text, order=option.order)
+            for option in old_options
+        ])
+        option_ids = {old.id: new.id for old, new in zip(old_options, options)}
+
+        if with_responses:
+            _clone_responses(form.id, clone.id, question_ids, option_ids)
+
+    return clone
+
+
+def _clone_responses(form_id: int, clone_id: int, question_ids: dict, option_ids: dict):
+    objects = Response.objects.filter(form_id=form_id).order_by("id").values_list(
+        "id", "user_id", "created_at", "answers_data"
+    )
+    last_id = 0
+
+    while chunk := list(objects.filter(id__gt=last_id)[:CLONE_CHUNK_SIZE]):
+        last_id = chunk[-1][0]
+
+        responses = Response.objects.bulk_create([
+            Response(form_id=clone_id, user_id=user_id, created_at=created_at,
+                     answers_data=_clone_answers_data(answers_data, question_ids, option_ids))
+            for _, user_id, created_at, answers_data in chunk
+        ])
+        response_ids = {old[0]: new.id for old, new in zip(chunk, responses)}
+
+        old_answers = list(Answer.objects.filter(response_id__in=response_ids).values_list(
+            "id", "response_id", "question_id", "text"
+        ))
+        answers = Answer.objects.bulk_create([
+            Answer(response_id=response_ids[response_id], question_id=question_ids[question_id], text=text)
+            for _, response_id, question_id, text in old_answers
+        ])
+        answer_ids = {old[0]: new.id for old, new in zip(old_answers, answers)}
+
+        Answer.choices.through.objects.bulk_create([
+            Answer.choices.through(answer_id=answer_ids[answer_id], option_id=option_ids[option_id])
+            for answer_id, option_id in Answer.choices.through.objects.filter(
+                answer_id__in=answer_ids
+            ).values_list("answer_id", "option_id")
+        ])
+
+        texts = [(clone_id, response_ids[response_id], question_ids[question_id], text)
+                 for _, response_id, question_id, text in old_answers]
+        texts += [(clone_id, response.id, question_id, value)
+                  for response in responses if response.answers_data is not None
+                  for question_id, value in Response.unpack_answers(response.answers_data).items()
+                  if isinstance(value, str)]
+        index_answer_rows(texts)
+
+    FormCounter.objects.bulk_create([
+        FormCounter(form_id=clone_id, responses=responses)
+        for responses in FormCounter.objects.filter(form_id=form_id).values_list("responses", flat=True)
+    ])
+    QuestionCounter.objects.bulk_create([
+        QuestionCounter(question_id=question_ids[question_id], answers=answers)
+        for question_id, answers in QuestionCounter.objects.filter(
+            question_id__in=question_ids).values_list("question_id", "answers")
+    ])
+    OptionCounter.objects.bulk_create([
+        OptionCounter(option_id=option_ids[option_id], selections=selections)
+        for option_id, selections in OptionCounter.objects.filter(
+            option_id__in=option_ids).values_list("option_id", "selections")
+    ])
+
+
+def _clone_answers_data(answers_data: dict, question_ids: dict, option_ids: dict):
+    """
+    Maps the question and option IDs of compact answers to the ones of the clone. The answers of deleted questions
+    and the choices of deleted options (still referred to by compact answers) are dropped, as when expanded.
+    """
+    if answers_data is None:
+        return None
+
+    answers = {}
+
+    for question_id, value in Response.unpack_answers(answers_data).items():
+        if question_id not in question_ids:
+            continue
+
+        if isinstance(value, list):
+            value = [option_ids[option_id] for option_id in value if option_id in option_ids]
+        elif not isinstance(value, str):
+            if value not in option_ids:
+                continue
+
+            value = option_ids[value]
+
+        answers[question_ids[question_id]] = value
+
+    return Response.pack_answers(answers)
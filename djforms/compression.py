@@ -0,0 +1,100 @@
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional dependency, responses are then only compressed with gzip
+    zstandard = None
+
+GZIP = "gzip"
+ZSTD = "zstd"
+
+# input bytes compressed together before the compressed output is flushed to the client
+COMPRESSION_CHUNK_SIZE = 64 * 1024
+
+GZIP_LEVEL = 6
+GZIP_WBITS = 16 + zlib.MAX_WBITS  # deflate in a gzip container
+
+
+def get_content_encodings():
+    """
+    Content codings of the responses, most preferred first: zstd (if ``zstandard`` is installed) and gzip.
+    """
+    return [ZSTD, GZIP] if zstandard is not None else [GZIP]
+
+
+def accepted_encodings(accept_encoding: str):
+    """
+    Supported content codings accepted by the ``Accept-Encoding`` header, by quality value, then by preference.
+    Empty when the response must not be compressed.
+    """
+    qualities = {}
+
+    for item in accept_encoding.split(","):
+        coding, _, parameters = item.partition(";")
+        parameters = parameters.strip().lower()
+        quality = 1.0
+
+        if parameters.startswith("q="):
+            try:
+                quality = float(parameters[2:])
+            except ValueError:
+                quality = 0.0
+
+        if coding.strip():
+            qualities[coding.strip().lower()] = quality
+
+    default = qualities.get("*", 0.0)
+    ranked = [(qualities.get(coding, default), -index, coding)
+              for index, coding in enumerate(get_content_encodings())]
+
+    return [coding for quality, _, coding in sorted(ranked, reverse=True) if quality > 0]
+
+
+def compress_stream(chunks, encoding: str, chunk_size: int = COMPRESSION_CHUNK_SIZE):
+    """
+    Compresses the str or bytes chunks, flushing the compressed output after every ``chunk_size`` bytes of input,
+    so small chunks (e.g. CSV rows) are compressed together while the client still receives data steadily.
+    """
+    if encoding == ZSTD:
+        compressor = zstandard.ZstdCompressor().compressobj()
+        flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+    elif encoding == GZIP:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+        flush_mode = zlib.Z_SYNC_FLUSH
+    else:
+        raise ValueError(f"Content coding {encoding} not supported")
+
+    buffer = []
+    size = 0
+
+    for chunk in chunks:
+        data = chunk.encode() if isinstance(chunk, str) else chunk
+        buffer.append(data)
+        size += len(data)
+
+        if size >= chunk_size:
+            yield compressor.compress(b"".join(buffer)) + compressor.flush(flush_mode)
+            buffer = []
+            size = 0
+
+    yield compressor.compress(b"".join(buffer)) + compressor.flush()
+
+
+def decompress_gzip_stream(chunks):
+    """
+    Decompresses the bytes chunks of gzip data, made of one or more concatenated gzip members.
+    """
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+
+    for data in chunks:
+        while data:
+            output = decompressor.decompress(data)
+
+            if output:
+                yield output
+
+            if decompressor.eof:
+                data = decompressor.unused_data
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+            else:
+                data = b""
@@ -0,0 +1,175 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Max
+
+from .models import Question, Option, Response, Answer, FormCounter, QuestionCounter, OptionCounter
+
+
+def record_response(form_id: int, question_ids: list, option_ids: list):
+    """
+    Increments the counters for a saved response, given the IDs of the answered questions and chosen options.
+    Issues a fixed number of statements, creating the missing counter rows on the fly.
+    """
+    _increment(FormCounter, "form_id", [form_id], "responses", 1)
+    _increment(QuestionCounter, "question_id", question_ids, "answers", 1)
+    _increment(OptionCounter, "option_id", option_ids, "selections", 1)
+
+
+def get_response_watermark(form_id: int):
+    """
+    Last response ID and number of responses of the form, read in a single aggregate so they are consistent
+    with each other.
+
+    Counted from the responses themselves (an index-only scan of the form's responses) rather than read from
+    the denormalized counter, so deletions that bypass the counters (admin, cascades) are still detected.
+    """
+    watermark = Response.objects.filter(form_id=form_id).aggregate(last_response_id=Max("id"), responses=Count("id"))
+    return watermark["last_response_id"] or 0, watermark["responses"]
+
+
+def forget_responses(response_ids: list):
+    """
+    Decrements the counters for responses about to be deleted, with grouped aggregates over their answer rows
+    and choices, and the compact answers of the others.
+    """
+    responses = Response.objects.filter(id__in=response_ids)
+
+    form_counts = Counter(dict(
+        responses.values("form_id").annotate(count=Count("id")).values_list("form_id", "count")
+    ))
+    question_counts = Counter(dict(
+        Answer.objects.filter(response_id__in=response_ids).values("question_id").annotate(
+            count=Count("id")).values_list("question_id", "count")
+    ))
+    option_counts = Counter(dict(
+        Answer.choices.through.objects.filter(answer__response_id__in=response_ids).values("option_id").annotate(
+            count=Count("id")).values_list("option_id", "count")
+    ))
+
+    _count_compact_answers(responses, question_counts, option_counts)
+
+    for model, key_field, count_field, counts in [
+        (FormCounter, "form_id", "responses", form_counts),
+        (QuestionCounter, "question_id", "answers", question_counts),
+        (OptionCounter, "option_id", "selections", option_counts),
+    ]:
+        keys_by_count = defaultdict(list)
+
+        for key, count in counts.items():
+            keys_by_count[count].append(key)
+
+        for count, keys in keys_by_count.items():
+            _increment(model, key_field, keys, count_field, -count)
+
+
+def _count_compact_answers(responses, question_counts: Counter, option_counts: Counter):
+    """
+    Adds the answered questions and chosen options of the compact answers of the responses to the counts.
+    """
+    answers_data = responses.filter(answers_data__isnull=False).values_list("answers_data", flat=True)
+
+    for answers in answers_data.iterator(chunk_size=2000):
+        for question_id, value in Response.unpack_answers(answers).items():
+            question_counts[question_id] += 1
+
+            if not isinstance(value, str):
+                option_counts.update(value if isinstance(value, list) else [value])
+
+
+def _increment(model, key_field: str, keys: list, count_field: str, delta: int):
+    if not keys:
+        return
+
+    if delta > 0:
+        model.objects.bulk_create([model(**{key_field: key}) for key in keys], ignore_conflicts=True)
+
+    model.objects.filter(**{f"{key_field}__in": keys, f"{count_field}__gte": -delta}).update(
+        **{count_field: F(count_field) + delta}
+    )
+
+
+def count_actual(form_ids: list = None):
+    """
+    Computes the counters from the responses, answers and choices with grouped aggregates,
+    and the compact answers of the responses (the ones of deleted questions and options being left out).
+    Returns three dicts of counts by form ID, question ID and option ID, optionally limited to some forms.
+    """
+    responses = Response.objects.all()
+    answers = Answer.objects.all()
+    choices = Answer.choices.through.objects.all()
+
+    if form_ids is not None:
+        responses = responses.filter(form_id__in=form_ids)
+        answers = answers.filter(question__form_id__in=form_ids)
+        choices = choices.filter(option__question__form_id__in=form_ids)
+
+    question_counts = Counter(dict(
+        answers.values("question_id").annotate(count=Count("id")).values_list("question_id", "count")
+    ))
+    option_counts = Counter(dict(
+        choices.values("option_id").annotate(count=Count("id")).values_list("option_id", "count")
+    ))
+    compact_question_counts = Counter()
+    compact_option_counts = Counter()
+    _count_compact_answers(responses, compact_question_counts, compact_option_counts)
+
+    if compact_question_counts:
+        # compact answers keep referring to the questions and options deleted since
+        question_ids = set(Question.objects.filter(id__in=compact_question_counts).values_list("id", flat=True))
+        option_ids = set(Option.objects.filter(id__in=compact_option_counts).values_list("id", flat=True))
+        question_counts.update({key: count for key, count in compact_question_counts.items() if key in question_ids})
+        option_counts.update({key: count for key, count in compact_option_counts.items() if key in option_ids})
+
+    return (
+        dict(responses.values("form_id").annotate(count=Count("id")).values_list("form_id", "count")),
+        dict(question_counts),
+        dict(option_counts),
+    )
+
+
+def count_stored(form_ids: list = None):
+    """
+    Reads the stored counters, in the same format as ``count_actual``, leaving out zeros.
+    """
+    form_counters = FormCounter.objects.filter(responses__gt=0)
+    question_counters = QuestionCounter.objects.filter(answers__gt=0)
+    option_counters = OptionCounter.objects.filter(selections__gt=0)
+
+    if form_ids is not None:
+        form_counters = form_counters.filter(form_id__in=form_ids)
+        question_counters = question_counters.filter(question__form_id__in=form_ids)
+        option_counters = option_counters.filter(option__question__form_id__in=form_ids)
+
+    return (
+        dict(form_counters.values_list("form_id", "responses")),
+        dict(question_counters.values_list("question_id", "answers")),
+        dict(option_counters.values_list("option_id", "selections")),
+    )
+
+
+def rebuild_counters(form_ids: list = None):
+    """
+    Replaces the stored counters by the actual counts, optionally limited to some forms.
+    """
+    with transaction.atomic():
+        form_counts, question_counts, option_counts = count_actual(form_ids)
+
+        if form_ids is None:
+            FormCounter.objects.all().delete()
+            QuestionCounter.objects.all().delete()
+            OptionCounter.objects.all().delete()
+        else:
+            FormCounter.objects.filter(form_id__in=form_ids).delete()
+            QuestionCounter.objects.filter(question__form_id__in=form_ids).delete()
+            OptionCounter.objects.filter(option__question__form_id__in=form_ids).delete()
+
+        FormCounter.objects.bulk_create(
+            [FormCounter(form_id=key, responses=count) for key, count in form_counts.items()]
+        )
+        QuestionCounter.objects.bulk_create(
+            [QuestionCounter(question_id=key, answers=count) for key, count in question_counts.items()]
+        )
+        OptionCounter.objects.bulk_create(
+            [OptionCounter(option_id=key, selections=count) for key, count in option_counts.items()]
+        )
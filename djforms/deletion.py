@@ -0,0 +1,90 @@
+import shutil
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .counters import forget_responses
+from .jobs import THREAD, get_export_directory, get_export_worker, run_in_background
+from .models import Form, Response, Answer
+from .schema import invalidate_compiled_form
+from .search import unindex_responses, unindex_forms
+
+DELETE_CHUNK_SIZE = 500
+
+
+def delete_responses(response_ids: list, chunk_size: int = DELETE_CHUNK_SIZE, forget: bool = True):
+    """
+    Deletes the responses with their answers and chosen options, by chunks of responses in their own transactions,
+    with set-based DELETE statements instead of the deletion collector of Django (which loads all the related rows).
+
+    Decrements the counters (unless ``forget`` is False) and removes the answers from the search index.
+    Returns the number of deleted responses.
+    """
+    deleted = 0
+
+    for start in range(0, len(response_ids), chunk_size):
+        chunk = list(response_ids[start:start + chunk_size])
+
+        with transaction.atomic():
+            if forget:
+                forget_responses(chunk)
+
+            unindex_responses(chunk)
+            deleted += _delete_chunk(chunk)
+
+    return deleted
+
+
+def _delete_chunk(response_ids: list):
+    placeholders = ", ".join(["%s"] * len(response_ids))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {Answer.choices.through._meta.db_table} WHERE answer_id IN "
+            f"(SELECT id FROM {Answer._meta.db_table} WHERE response_id IN ({placeholders}))",
+            response_ids,
+        )
+        cursor.execute(f"DELETE FROM {Answer._meta.db_table} WHERE response_id IN ({placeholders})", response_ids)
+        cursor.execute(f"DELETE FROM {Response._meta.db_table} WHERE id IN ({placeholders})", response_ids)
+        return cursor.rowcount
+
+
+def delete_form(form_id: int):
+    """
+    Marks the form as deleted, so it is no longer served, then purges it in the background:
+    in the thread pool of the export jobs, or by the ``purge_deleted_forms`` command
+    when ``DJFORMS_EXPORT_WORKER`` is ``command``.
+    """
+    Form.objects.filter(pk=form_id).update(deleted_at=timezone.now())
+    invalidate_compiled_form(form_id)
+
+    if get_export_worker() == THREAD:
+        run_in_background(purge_form, form_id)
+
+
+def purge_form(form_id: int, chunk_size: int = DELETE_CHUNK_SIZE):
+    """
+    Deletes a form marked as deleted: its responses by chunks, then its export files,
+    and finally the form with its remaining rows (settings, questions, options, counters and export jobs),
+    bounded by the size of the form and not by its number of responses.
+    """
+    response_ids = Response.objects.filter(form_id=form_id).order_by("id").values_list("id", flat=True)
+
+    while chunk := list(response_ids[:chunk_size]):
+        delete_responses(chunk, chunk_size, forget=False)
+
+    unindex_forms([form_id])
+    shutil.rmtree(get_export_directory(form_id), ignore_errors=True)
+    Form.objects.filter(pk=form_id, deleted_at__isnull=False).delete()
+
+
+def purge_deleted_forms():
+    """
+    Purges all the forms marked as deleted, returning their number.
+    """
+    form_ids = list(Form.objects.filter(deleted_at__isnull=False).order_by("id").values_list("id", flat=True))
+
+    for form_id in form_ids:
+        purge_form(form_id)
+
+    return len(form_ids)
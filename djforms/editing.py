@@ -0,0 +1,306 @@
+from django.core.exceptions import ValidationError
+
+from .models import Form, Question, Option
+
+CHOICE_QUESTION_TYPES = [Question.QuestionType.RADIO, Question.QuestionType.CHECKBOX]
+QUESTION_FIELDS = ["text", "type", "is_required", "order"]
+QUESTION_UNIQUE_FIELDS = ["order"]
+OPTION_FIELDS = ["text", "order"]
+OPTION_UNIQUE_FIELDS = ["text", "order"]
+
+
+class Changes:
+    """
+    Rows to delete, create and update for one model, computed by diffing the payload against the database.
+    ``moved`` holds the updated rows whose unique values change, which must be moved out of the way first.
+    The primary keys of the updated and moved rows are kept in sets, to add each row once in constant time.
+    """
+    __slots__ = ("deleted_ids", "created", "updated", "moved", "updated_ids", "moved_ids")
+
+    def __init__(self):
+        self.deleted_ids = []
+        self.created = []
+        self.updated = []
+        self.moved = []
+        self.updated_ids = set()
+        self.moved_ids = set()
+
+
+def update_questions(form: Form, questions_data: list):
+    """
+    Applies the questions (and their options) of the edited form, as sent by the edit SPA.
+    Loads the current questions and options once, validates the payload in memory,
+    then saves only the differences with bulk statements, so the number of statements
+    depends on the kinds of changes instead of the size of the form.
+    """
+    if not questions_data:
+        raise ValidationError("Form must have at least one question", code="question_required")
+
+    current_questions = {question.id: question for question in Question.objects.filter(form=form)}
+    current_options = {}
+
+    for option in Option.objects.filter(question__form=form):
+        current_options.setdefault(option.question_id, {})[option.id] = option
+
+    question_changes, option_changes = diff_questions(form, questions_data, current_questions, current_options)
+    apply_changes(Question, question_changes, QUESTION_FIELDS, QUESTION_UNIQUE_FIELDS)
+    apply_changes(Option, option_changes, OPTION_FIELDS, OPTION_UNIQUE_FIELDS)
+
+
+def diff_questions(form: Form, questions_data: list, current_questions: dict, current_options: dict):
+    """
+    Computes the question and option changes of the payload, validating it with the model field validators.
+    ``current_options`` maps question IDs to dicts of their current options by ID.
+    """
+    question_ids = [question_data["id"] for question_data in questions_data if question_data.get("id") is not None]
+
+    if set(question_ids) - set(current_questions) or len(set(question_ids)) != len(question_ids):
+        raise ValidationError("Attempt to change question not belonging to the form")
+
+    question_changes = Changes()
+    option_changes = Changes()
+
+    question_changes.deleted_ids = [question_id for question_id in current_questions if question_id not in question_ids]
+    orders = set()
+
+    for question_data in questions_data:
+        values = _clean(Question, question_data, QUESTION_FIELDS)
+        question = current_questions.get(question_data.get("id"))
+
+        if question is None:
+            question = Question(form=form, **values)
+            question_changes.created.append(question)
+        else:
+            _diff_row(question_changes, question, values, QUESTION_UNIQUE_FIELDS)
+
+        orders.add(question.order)
+
+        if values["type"] in CHOICE_QUESTION_TYPES:
+            _diff_options(option_changes, question, question_data.get("options", []),
+                          current_options.get(question.id, {}))
+        else:
+            # remove all options for changed question type to non-radio and non-checkbox
+            option_changes.deleted_ids.extend(current_options.get(question.id, {}))
+
+    if len(orders) != len(questions_data):
+        raise ValidationError("Question order must be unique in the form", code="question_not_unique")
+
+    return question_changes, option_changes
+
+
+def _diff_options(option_changes: Changes, question: Question, options_data: list, current_options: dict):
+    if not options_data:
+        raise ValidationError(
+            message=f"Question ID {question.id} of {question.type} type must have at least one option",
+            code="option_required",
+        )
+
+    option_ids = [option_data["id"] for option_data in options_data if option_data.get("id") is not None]
+
+    if set(option_ids) - set(current_options) or len(set(option_ids)) != len(option_ids):
+        raise ValidationError("Attempt to change option of question not belonging to the form")
+
+    option_changes.deleted_ids.extend(option_id for option_id in current_options if option_id not in option_ids)
+    options = []
+
+    for option_data in options_data:
+        values = _clean(Option, option_data, OPTION_FIELDS)
+        option = current_options.get(option_data.get("id"))
+
+        if option is None:
+            option = Option(question=question, **values)
+            option_changes.created.append(option)
+        else:
+            _diff_row(option_changes, option, values, OPTION_UNIQUE_FIELDS)
+
+        options.append(option)
+
+    for field in OPTION_UNIQUE_FIELDS:
+        if len({getattr(option, field) for option in options}) != len(options):
+            raise ValidationError(f"Option {field} must be unique in the question", code="option_not_unique")
+
+
+def _diff_row(changes: Changes, obj, values: dict, unique_fields: list):
+    changed_fields = [field for field, value in values.items() if getattr(obj, field) != value]
+
+    if not changed_fields:
+        return
+
+    if any(field in unique_fields for field in changed_fields) and obj.pk not in changes.moved_ids:
+        changes.moved.append(obj)
+        changes.moved_ids.add(obj.pk)
+
+    for field in changed_fields:
+        setattr(obj, field, values[field])
+
+    if obj.pk not in changes.updated_ids:
+        changes.updated.append(obj)
+        changes.updated_ids.add(obj.pk)
+
+
+def _clean(model, data: dict, fields: list):
+    """
+    Validates and converts the values of the fields like a model form would, without database queries.
+    """
+    values = {}
+
+    for field_name in fields:
+        field = model._meta.get_field(field_name)
+        value = data.get(field_name)
+
+        if field.get_internal_type() == "BooleanField":
+            value = bool(value)
+        elif isinstance(value, str):
+            value = value.strip()
+
+        try:
+            values[field_name] = field.clean(value, None)
+        except ValidationError as e:
+            raise ValidationError(f"{model._meta.verbose_name.capitalize()} {field_name}: {' '.join(e.messages)}",
+                                  code=f"invalid_{model._meta.model_name}")
+
+    return values
+
+
+def apply_changes(model, changes: Changes, fields: list, unique_fields: list):
+    """
+    Deletes, creates and updates the rows of the changes with one statement each.
+    Rows whose unique values change are first given temporary values derived from their primary keys,
+    so that swapping orders (or texts) between rows never violates the unique constraints midway.
+    """
+    if changes.deleted_ids:
+        model.objects.filter(pk__in=changes.deleted_ids).delete()
+
+    if changes.moved:
+        # texts are stripped when cleaned, so the padded placeholders never collide with the submitted ones,
+        # and they have no NUL byte (rejected in the text columns of PostgreSQL)
+        temporary_values = {"order": lambda pk: -pk, "text": lambda pk: f"__djforms_tmp_{pk}__ "}
+        model.objects.bulk_update([
+            model(pk=obj.pk, **{field: temporary_values[field](obj.pk) for field in unique_fields})
+            for obj in changes.moved
+        ], unique_fields)
+
+    if changes.created:
+        model.objects.bulk_create(changes.created)
+
+    if changes.updated:
+        model.objects.bulk_update(changes.updated, fields)
+
+
+OPERATIONS = ["update_form", "add_question", "update_question", "delete_question",
+              "add_option", "update_option", "delete_option"]
+
+
+def apply_operations(form: Form, operations: list):
+    """
+    Applies operations on single questions and options of the form, sent by the edit SPA instead of the whole form:
+
+    - ``{"op": "update_form", "title": ..., "description": ...}``
+    - ``{"op": "add_question", "question": {"text": ..., "type": ..., "is_required": ..., "order": ..., "options": [...]}}``
+    - ``{"op": "update_question", "id": ..., "text": ..., "type": ..., "is_required": ..., "order": ...}``
+    - ``{"op": "delete_question", "id": ...}``
+    - ``{"op": "add_option", "question_id": ..., "option": {"text": ..., "order": ...}}``
+    - ``{"op": "update_option", "id": ..., "text": ..., "order": ...}``
+    - ``{"op": "delete_option", "id": ...}``
+
+    Update operations may leave out unchanged fields. Only the rows touched by the operations are loaded,
+    and the changes are saved like ``update_questions`` does, whatever the size of the form.
+    Returns, for each operation, the IDs of the created question (with its options) or option, otherwise None.
+    """
+    if not isinstance(operations, list) or not all(
+            isinstance(operation, dict) and operation.get("op") in OPERATIONS for operation in operations):
+        raise ValidationError("Operations must be a list of supported operations", code="invalid_operation")
+
+    questions = Question.objects.filter(form=form).in_bulk([
+        operation.get("id") if operation["op"] != "add_option" else operation.get("question_id")
+        for operation in operations if operation["op"] in ["update_question", "delete_question", "add_option"]
+    ])
+    options = Option.objects.filter(question__form=form).in_bulk([
+        operation.get("id") for operation in operations if operation["op"] in ["update_option", "delete_option"]
+    ])
+
+    question_changes = Changes()
+    option_changes = Changes()
+    form_values = {}
+    created = []
+
+    for operation in operations:
+        op = operation["op"]
+        result = None
+
+        if op == "update_form":
+            form_values.update(_clean(Form, dict({"title": form.title, "description": form.description},
+                                                 **operation), ["title", "description"]))
+        elif op == "add_question":
+            question_data = operation.get("question") or {}
+            question = Question(form=form, **_clean(Question, question_data, QUESTION_FIELDS))
+            question_changes.created.append(question)
+            first_option = len(option_changes.created)
+
+            if question.type in CHOICE_QUESTION_TYPES:
+                _diff_options(option_changes, question, question_data.get("options", []), {})
+
+            result = (question, option_changes.created[first_option:])
+        elif op == "add_option":
+            question = _get_row(questions, operation.get("question_id"), "question")
+            option = Option(question=question, **_clean(Option, operation.get("option") or {}, OPTION_FIELDS))
+            option_changes.created.append(option)
+            result = option
+        elif op in ["update_question", "update_option"]:
+            model, fields, unique_fields, changes, rows = (
+                (Question, QUESTION_FIELDS, QUESTION_UNIQUE_FIELDS, question_changes, questions)
+                if op == "update_question" else (Option, OPTION_FIELDS, OPTION_UNIQUE_FIELDS, option_changes, options)
+            )
+            obj = _get_row(rows, operation.get("id"), model._meta.model_name)
+            values = _clean(model, {field: operation.get(field, getattr(obj, field)) for field in fields}, fields)
+            _diff_row(changes, obj, values, unique_fields)
+        else:
+            changes, rows, name = ((question_changes, questions, "question") if op == "delete_question"
+                                   else (option_changes, options, "option"))
+            changes.deleted_ids.append(_get_row(rows, operation.get("id"), name).id)
+
+        created.append(result)
+
+    # remove all options for changed question type to non-radio and non-checkbox
+    untyped_question_ids = [question.id for question in question_changes.updated
+                            if question.type not in CHOICE_QUESTION_TYPES]
+
+    if form_values:
+        Form.objects.filter(pk=form.id).update(**form_values)
+
+    apply_changes(Question, question_changes, QUESTION_FIELDS, QUESTION_UNIQUE_FIELDS)
+
+    if untyped_question_ids:
+        Option.objects.filter(question_id__in=untyped_question_ids).delete()
+
+    apply_changes(Option, option_changes, OPTION_FIELDS, OPTION_UNIQUE_FIELDS)
+
+    if question_changes.deleted_ids and not Question.objects.filter(form=form).exists():
+        raise ValidationError("Form must have at least one question", code="question_required")
+
+    checked_question_ids = ([question.id for question in question_changes.updated] +
+                            [option.question_id for option in options.values()])
+
+    if checked_question_ids and Question.objects.filter(
+            id__in=checked_question_ids, type__in=CHOICE_QUESTION_TYPES, options__isnull=True).exists():
+        raise ValidationError("Radio and checkbox questions must have at least one option", code="option_required")
+
+    return [_serialize_created(result) for result in created]
+
+
+def _get_row(rows: dict, pk, name: str):
+    if pk not in rows:
+        raise ValidationError(f"Attempt to change {name} not belonging to the form")
+
+    return rows[pk]
+
+
+def _serialize_created(result):
+    if result is None:
+        return None
+
+    if isinstance(result, Option):
+        return {"id": result.id}
+
+    question, options = result
+    return {"id": question.id, "option_ids": [option.id for option in options]}
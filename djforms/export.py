@@ -0,0 +1,119 @@
+from django.db.models import QuerySet
+
+from .metrics import EXPORTED_ROWS
+from .models import Question, Response
+from .schema import CompiledForm
+from .storage import read_normalized_answers
+
+EXPORT_CHUNK_SIZE = 500
+
+TEXT_QUESTION_TYPES = (Question.QuestionType.SHORT_TEXT, Question.QuestionType.LONG_TEXT)
+
+
+class ExportPlan:
+    """
+    Column plan of a form export, computed once per export instead of once per row.
+
+    Holds the ordered questions (one column each, after the user, email and timestamp columns),
+    only the given ones when ``question_ids`` is not empty, and the text and order of every option of the form.
+    """
+
+    __slots__ = ("questions", "option_texts", "option_orders", "checkbox_columns")
+
+    def __init__(self, form: CompiledForm, question_ids=()):
+        self.questions = [(q.id, q.type, q.text) for q in form.questions if not question_ids or q.id in question_ids]
+        self.checkbox_columns = [index for index, (_, question_type, _) in enumerate(self.questions, start=3)
+                                 if question_type == Question.QuestionType.CHECKBOX]
+
+        self.option_texts = {option.id: option.text for option in form.options_by_id.values()}
+        self.option_orders = {option.id: option.order for option in form.options_by_id.values()}
+
+    @property
+    def header(self):
+        return ["User", "Email", "Timestamp"] + [text for _, _, text in self.questions]
+
+
+def iter_response_chunks(objects: QuerySet, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Iterates over the responses of the queryset in chunks of ``(id, created_at, username, email, answers_data)``
+    tuples.
+
+    Uses keyset pagination on the primary key (oldest first, so newer responses can be appended to an export),
+    so every chunk costs the same no matter how deep into the result set it is.
+    """
+    objects = objects.order_by("id")
+    last_id = None
+
+    while True:
+        chunk_objects = objects if last_id is None else objects.filter(id__gt=last_id)
+        chunk = list(chunk_objects.values_list(
+            "id", "created_at", "user__username", "user__email", "answers_data"
+        )[:chunk_size])
+
+        if not chunk:
+            return
+
+        yield chunk
+
+        if len(chunk) < chunk_size:
+            return
+
+        last_id = chunk[-1][0]
+
+
+def iter_plan_values(plan: ExportPlan, objects: QuerySet, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Yields one export row (a list) of structured values per response of the queryset, header excluded:
+    user, email, creation datetime, then one value per question (text, option text for radio questions,
+    or list of option texts for checkbox questions, None when unanswered).
+
+    Each chunk of responses issues a fixed number of queries: one for the responses,
+    and, for the responses with normalized answers, one for their answers and one for the chosen options.
+    """
+    for chunk in iter_response_chunks(objects, chunk_size):
+        EXPORTED_ROWS.inc(len(chunk))
+        normalized_ids = [response_id for response_id, _, _, _, answers_data in chunk if answers_data is None]
+        normalized_answers = read_normalized_answers(normalized_ids) if normalized_ids else {}
+
+        for response_id, created_at, username, email, answers_data in chunk:
+            if answers_data is None:
+                answers = normalized_answers.get(response_id, {})
+            else:
+                answers = Response.unpack_answers(answers_data)
+
+            user = username if username is not None else "Anonymous"
+            email = email if username is not None else ""
+
+            yield [user, email, created_at] + [
+                _render_cell(plan, question_type, answers[question_id]) if question_id in answers else None
+                for question_id, question_type, _ in plan.questions
+            ]
+
+
+def iter_plan_rows(plan: ExportPlan, objects: QuerySet, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Yields the rows of ``iter_plan_values`` flattened for spreadsheets: the creation datetime as a string,
+    and the options of checkbox answers joined by ``'; '``.
+    """
+    for row in iter_plan_values(plan, objects, chunk_size):
+        row[2] = str(row[2])
+
+        for index in plan.checkbox_columns:
+            if row[index] is not None:
+                row[index] = '; '.join(row[index])
+
+        yield row
+
+
+def _render_cell(plan: ExportPlan, question_type: str, value):
+    if question_type in TEXT_QUESTION_TYPES:
+        return value if isinstance(value, str) else None
+    elif question_type == Question.QuestionType.RADIO:
+        return plan.option_texts.get(value)
+    elif question_type == Question.QuestionType.CHECKBOX:
+        if not isinstance(value, list):
+            return None
+        option_ids = sorted(value, key=lambda option_id: plan.option_orders.get(option_id, 0))
+        return [plan.option_texts.get(option_id, "") for option_id in option_ids]
+    else:
+        raise ValueError(f"Question type {question_type} not supported")
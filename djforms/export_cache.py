@@ -0,0 +1,171 @@
+import csv
+import gzip
+import io
+import os
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .compression import GZIP_LEVEL
+from .counters import get_response_watermark
+from .export import ExportPlan, iter_plan_rows
+from .jobs import EXPORT_STALE_TIMEOUT, THREAD, get_export_cache_path, get_export_worker, run_in_background
+from .models import Response, ExportCache
+from .schema import CompiledForm, get_compiled_form
+
+
+def is_export_cache_enabled():
+    """
+    Whether ``download`` serves the materialized export of the form, set by ``DJFORMS_EXPORT_CACHE``.
+    """
+    return getattr(settings, "DJFORMS_EXPORT_CACHE", True)
+
+
+def get_current_export_cache(form: CompiledForm):
+    """
+    Returns the cache entry of the form if its file is up to date (same form version and responses),
+    otherwise None, without rendering anything.
+    """
+    export_cache = ExportCache.objects.filter(pk=form.id).first()
+
+    if (not export_cache or export_cache.version != form.version or
+            (export_cache.last_response_id, export_cache.rows) != get_response_watermark(form.id)):
+        return None
+
+    path = get_export_cache_path(form.id)
+
+    if not os.path.exists(path) or os.path.getsize(path) < export_cache.file_size:
+        return None
+
+    return export_cache
+
+
+def request_export_cache_refresh(form_id: int):
+    """
+    Brings the materialized export of the form up to date in the background: in the thread pool of the export jobs,
+    or by the ``run_export_jobs`` command when ``DJFORMS_EXPORT_WORKER`` is ``command``.
+    """
+    if get_export_worker() == THREAD:
+        run_in_background(refresh_form_export_cache, form_id)
+    elif not ExportCache.objects.filter(pk=form_id).update(refresh_requested_at=timezone.now()):
+        ExportCache.objects.get_or_create(form_id=form_id, defaults={"refresh_requested_at": timezone.now()})
+
+
+def claim_export_cache_refresh():
+    """
+    Returns the ID of a form whose export cache refresh was requested, clearing the request,
+    or None if there is no request.
+    """
+    for form_id in ExportCache.objects.filter(refresh_requested_at__isnull=False).order_by(
+            "refresh_requested_at").values_list("form_id", flat=True)[:10]:
+        if ExportCache.objects.filter(pk=form_id, refresh_requested_at__isnull=False).update(
+                refresh_requested_at=None):
+            return form_id
+
+    return None
+
+
+def refresh_form_export_cache(form_id: int):
+    form = get_compiled_form(form_id)
+
+    if form:
+        refresh_export_cache(form)
+
+
+def refresh_export_cache(form: CompiledForm):
+    """
+    Brings the materialized CSV export of the form up to date, and returns its cache entry.
+    Returns None if another worker is already doing it.
+
+    The file is gzip-compressed, so it is served as is to the clients accepting gzip.
+    Only the responses newer than the last exported one are rendered and appended to the file (as a new gzip member).
+    The file is rebuilt when the form version changed (questions or options edited) or responses were deleted,
+    detected when the exported rows no longer match the number of responses up to the last exported one.
+    Changes of the usernames and emails of respondents are not detected until the next rebuild.
+    """
+    ExportCache.objects.get_or_create(form_id=form.id)
+
+    now = timezone.now()
+
+    if not ExportCache.objects.filter(
+        Q(locked_at__isnull=True) | Q(locked_at__lt=now - EXPORT_STALE_TIMEOUT), pk=form.id
+    ).update(locked_at=now):
+        return None
+
+    export_cache = ExportCache.objects.get(pk=form.id)
+
+    try:
+        objects = Response.objects.filter(form_id=form.id)
+        last_response_id, responses = get_response_watermark(form.id)
+        path = get_export_cache_path(form.id)
+
+        rebuild = (export_cache.version != form.version or
+                   not os.path.exists(path) or
+                   os.path.getsize(path) < export_cache.file_size)
+
+        if not rebuild:
+            rows = export_cache.rows
+
+            if last_response_id > export_cache.last_response_id:
+                rows += _append(form, objects.filter(
+                    id__gt=export_cache.last_response_id, id__lte=last_response_id
+                ), path, export_cache.file_size)
+
+            rebuild = rows != responses
+
+        if rebuild:
+            rows = _write(form, objects.filter(id__lte=last_response_id), path)
+
+        export_cache.version = form.version
+        export_cache.last_response_id = last_response_id
+        export_cache.rows = rows
+        export_cache.file_size = os.path.getsize(path)
+        export_cache.updated_at = timezone.now()
+    finally:
+        export_cache.locked_at = None
+        export_cache.save()
+
+    return export_cache
+
+
+def _write(form: CompiledForm, objects, path: str):
+    """
+    Writes the export file from scratch next to its path, then moves it in place.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial_path = f"{path}.part"
+
+    with gzip.open(partial_path, "wt", compresslevel=GZIP_LEVEL, newline="", encoding="utf-8") as file:
+        writer = csv.writer(file, delimiter=",", quoting=csv.QUOTE_ALL)
+        plan = ExportPlan(form)
+        writer.writerow(plan.header)
+        rows = _write_rows(writer, plan, objects)
+
+    os.replace(partial_path, path)
+    return rows
+
+
+def _append(form: CompiledForm, objects, path: str, file_size: int):
+    """
+    Appends the rows to the export file as a new gzip member,
+    first cutting anything past the recorded size (left by a failed append).
+    """
+    with open(path, "r+b") as binary_file:
+        binary_file.truncate(file_size)
+        binary_file.seek(file_size)
+
+        with io.TextIOWrapper(gzip.GzipFile(fileobj=binary_file, mode="wb", compresslevel=GZIP_LEVEL),
+                              encoding="utf-8", newline="") as file:
+            writer = csv.writer(file, delimiter=",", quoting=csv.QUOTE_ALL)
+            return _write_rows(writer, ExportPlan(form), objects)
+
+
+def _write_rows(writer, plan: ExportPlan, objects):
+    rows = 0
+
+    for row in iter_plan_rows(plan, objects):
+        writer.writerow(row)
+        rows += 1
+
+    return rows
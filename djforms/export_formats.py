@@ -0,0 +1,243 @@
+import csv
+import json
+import re
+import zipfile
+from itertools import islice
+from typing import Callable, NamedTuple
+from xml.sax.saxutils import escape
+
+from django.db.models import QuerySet
+
+from .export import EXPORT_CHUNK_SIZE, ExportPlan, iter_plan_rows, iter_plan_values
+from .models import Question
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # optional dependency, the columnar export falls back to typed column chunks in JSON
+    pyarrow = None
+
+
+class ExportFormat(NamedTuple):
+    content_type: str
+    extension: str
+    stream: Callable[[ExportPlan, QuerySet], object]  # iterator of str or bytes chunks
+    compressible: bool = True  # False for formats compressed already
+
+
+class Echo:
+    """
+    Pseudo-buffer returning what is written, to stream the output of writers.
+    """
+    def write(self, value):
+        return value
+
+
+def stream_csv(plan: ExportPlan, objects: QuerySet):
+    """
+    Quoted CSV, with the options of checkbox answers joined by ``'; '``.
+    """
+    writer = csv.writer(Echo(), delimiter=",", quoting=csv.QUOTE_ALL)
+
+    yield writer.writerow(plan.header)
+
+    for row in iter_plan_rows(plan, objects):
+        yield writer.writerow(row)
+
+
+def stream_ndjson(plan: ExportPlan, objects: QuerySet):
+    """
+    One JSON object per line and response, with the answers by question ID (as a string):
+    texts, option texts for radio questions, arrays of option texts for checkbox questions, or null.
+    """
+    question_keys = [str(question_id) for question_id, _, _ in plan.questions]
+
+    for rows in _batched(iter_plan_values(plan, objects), EXPORT_CHUNK_SIZE):
+        yield "".join(json.dumps({
+            "user": row[0],
+            "email": row[1],
+            "timestamp": row[2].isoformat(),
+            "answers": dict(zip(question_keys, row[3:])),
+        }, ensure_ascii=False) + "\n" for row in rows)
+
+
+# characters not allowed in XML 1.0 documents
+XML_ILLEGAL_CHARACTERS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Responses" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+class ChunkBuffer:
+    """
+    Write-only, unseekable buffer, emptied by the caller after every chunk (``zipfile`` supports such streams).
+    """
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_xlsx(plan: ExportPlan, objects: QuerySet):
+    """
+    Spreadsheet with one sheet of inline strings, in the layout of the CSV export.
+    The sheet is compressed as it is written, so memory use does not grow with the number of responses.
+    """
+    buffer = ChunkBuffer()
+    columns = [_xlsx_column(index) for index in range(len(plan.header))]
+
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            sheet.write(_xlsx_row(1, columns, plan.header))
+
+            rows = iter_plan_rows(plan, objects)
+            for number, chunk in enumerate(_batched(rows, EXPORT_CHUNK_SIZE)):
+                first_row = 2 + number * EXPORT_CHUNK_SIZE
+                sheet.write(b"".join(_xlsx_row(row_number, columns, row)
+                                     for row_number, row in enumerate(chunk, start=first_row)))
+                yield buffer.pop()
+
+            sheet.write(b"</sheetData></worksheet>")
+
+    yield buffer.pop()
+
+
+def _xlsx_column(index: int):
+    name = ""
+    index += 1
+
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(ord("A") + remainder) + name
+
+    return name
+
+
+def _xlsx_row(row_number: int, columns: list, values: list):
+    cells = "".join(
+        f'<c r="{column}{row_number}" t="inlineStr"><is><t xml:space="preserve">'
+        f'{escape(XML_ILLEGAL_CHARACTERS.sub("", value))}</t></is></c>'
+        for column, value in zip(columns, values) if value is not None
+    )
+    return f'<row r="{row_number}">{cells}</row>'.encode()
+
+
+def stream_columns(plan: ExportPlan, objects: QuerySet):
+    """
+    Columnar export, in chunks of responses: an Arrow IPC stream of record batches when ``pyarrow`` is installed,
+    otherwise JSON lines of typed column chunks (a schema line, then one line of column arrays per chunk).
+    """
+    if pyarrow is not None:
+        return _stream_arrow(plan, objects)
+
+    return _stream_column_chunks(plan, objects)
+
+
+def _column_types(plan: ExportPlan):
+    return ["string", "string", "timestamp"] + [
+        "list<string>" if question_type == Question.QuestionType.CHECKBOX else "string"
+        for _, question_type, _ in plan.questions
+    ]
+
+
+def _stream_column_chunks(plan: ExportPlan, objects: QuerySet):
+    yield json.dumps({"schema": [{"name": name, "type": column_type}
+                                 for name, column_type in zip(plan.header, _column_types(plan))]},
+                     ensure_ascii=False) + "\n"
+
+    for rows in _batched(iter_plan_values(plan, objects), EXPORT_CHUNK_SIZE):
+        columns = [list(column) for column in zip(*rows)]
+        columns[2] = [created_at.isoformat() for created_at in columns[2]]
+        yield json.dumps({"rows": len(rows), "columns": columns}, ensure_ascii=False) + "\n"
+
+
+def _stream_arrow(plan: ExportPlan, objects: QuerySet):
+    arrow_types = {
+        "string": pyarrow.string(),
+        "timestamp": pyarrow.timestamp("us", tz="UTC"),
+        "list<string>": pyarrow.list_(pyarrow.string()),
+    }
+    schema = pyarrow.schema([(name, arrow_types[column_type])
+                             for name, column_type in zip(plan.header, _column_types(plan))])
+    buffer = ChunkBuffer()
+
+    with pyarrow.ipc.new_stream(pyarrow.PythonFile(buffer, mode="w"), schema) as writer:
+        for rows in _batched(iter_plan_values(plan, objects), EXPORT_CHUNK_SIZE):
+            writer.write_batch(pyarrow.RecordBatch.from_arrays(
+                [pyarrow.array(column, type=field.type) for column, field in zip(zip(*rows), schema)],
+                schema=schema,
+            ))
+            yield buffer.pop()
+
+    yield buffer.pop()
+
+
+def _batched(iterable, size: int):
+    iterator = iter(iterable)
+
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+EXPORT_FORMATS = {
+    "csv": ExportFormat("text/csv", "csv", stream_csv),
+    "ndjson": ExportFormat("application/x-ndjson", "ndjson", stream_ndjson),
+    "xlsx": ExportFormat("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx", stream_xlsx,
+                         compressible=False),
+    "columns": ExportFormat("application/vnd.apache.arrow.stream" if pyarrow else "application/x-ndjson",
+                            "arrows" if pyarrow else "columns.ndjson", stream_columns),
+}
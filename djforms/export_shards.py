@@ -0,0 +1,105 @@
+import csv
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import django
+from django.conf import settings
+from django.db.models import QuerySet
+
+from .export import ExportPlan, iter_plan_rows
+from .models import Response
+
+
+def get_export_processes():
+    """
+    Number of worker processes rendering the shards of the export files, set by ``DJFORMS_EXPORT_PROCESSES``.
+    With 1, the export is rendered in the current process.
+    """
+    return getattr(settings, "DJFORMS_EXPORT_PROCESSES", 1)
+
+
+def split_id_ranges(objects: QuerySet, shards: int):
+    """
+    Splits the responses of the queryset into at most ``shards`` ranges of IDs ``(first, last)``
+    of about the same number of responses, with one query per shard boundary.
+    """
+    ids = objects.order_by("id").values_list("id", flat=True)
+    count = ids.count()
+
+    if not count:
+        return []
+
+    shards = max(1, min(shards, count))
+    starts = [ids[count * shard // shards] for shard in range(shards)]
+    last_id = ids.reverse()[0]
+
+    return [(start, next_start - 1) for start, next_start in zip(starts, starts[1:])] + [(starts[-1], last_id)]
+
+
+def write_csv_shards(plan: ExportPlan, form_id: int, last_response_id: int, file, processes: int = None,
+                     shards: int = None, on_shard=None):
+    """
+    Writes the CSV rows (header excluded) of the responses of the form up to ``last_response_id`` to the text file,
+    rendering ranges of responses in parallel in a pool of processes, each with its own database connection.
+    Shards are written to temporary files next to the file, then appended to it in order.
+
+    The worker processes are spawned (not forked, so they do not share the connections of this process)
+    and only see committed responses. ``on_shard`` is called with the number of rows written after every shard.
+    Returns the number of rows.
+    """
+    processes = processes or get_export_processes()
+    objects = Response.objects.filter(form_id=form_id, id__lte=last_response_id or 0)
+    shard_args = [(plan, form_id, first, last) for first, last in split_id_ranges(objects, shards or processes * 2)]
+    rows = 0
+
+    if processes <= 1 or len(shard_args) <= 1:
+        writer = csv.writer(file, delimiter=",", quoting=csv.QUOTE_ALL)
+
+        for args in shard_args:
+            rows += _write_rows(writer, *args)
+
+            if on_shard:
+                on_shard(rows)
+
+        return rows
+
+    directory = tempfile.mkdtemp(dir=os.path.dirname(getattr(file, "name", "")) or None)
+
+    try:
+        with ProcessPoolExecutor(max_workers=processes, mp_context=get_context("spawn"),
+                                 initializer=django.setup) as executor:
+            paths = [os.path.join(directory, f"shard-{index}.csv") for index in range(len(shard_args))]
+
+            for shard_rows, path in zip(executor.map(_render_shard, paths, shard_args), paths):
+                file.flush()
+
+                with open(path, "r", newline="", encoding="utf-8") as shard_file:
+                    shutil.copyfileobj(shard_file, file)
+
+                os.remove(path)
+                rows += shard_rows
+
+                if on_shard:
+                    on_shard(rows)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return rows
+
+
+def _render_shard(path: str, args: tuple):
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        return _write_rows(csv.writer(file, delimiter=",", quoting=csv.QUOTE_ALL), *args)
+
+
+def _write_rows(writer, plan: ExportPlan, form_id: int, first_id: int, last_id: int):
+    rows = 0
+
+    for row in iter_plan_rows(plan, Response.objects.filter(form_id=form_id, id__gte=first_id, id__lte=last_id)):
+        writer.writerow(row)
+        rows += 1
+
+    return rows
@@ -0,0 +1,173 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import QuerySet, Q, Exists, OuterRef, BooleanField
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import urlencode
+
+from .export import TEXT_QUESTION_TYPES
+from .models import Response, Answer
+from .schema import CompiledForm
+
+ANONYMOUS = "anonymous"
+AUTHENTICATED = "authenticated"
+
+
+class ResponseFilter:
+    """
+    Filters of the responses of a form, and the question columns of their export.
+
+    Every filter is compiled into a predicate of the response query (with ``EXISTS`` subqueries on the answers
+    and chosen options), so only the matching responses are read. Filters are combined with AND:
+
+    - ``since`` and ``until``: creation dates, both included.
+    - ``respondent``: ``anonymous``, ``authenticated`` or a username.
+    - ``option_ids``: options chosen in the response (all of them).
+    - ``text``: text contained in a text answer of the response, ignoring case.
+    """
+
+    __slots__ = ("since", "until", "respondent", "option_ids", "text", "question_ids")
+
+    def __init__(self, since=None, until=None, respondent="", option_ids=(), text="", question_ids=()):
+        self.since = since
+        self.until = until
+        self.respondent = respondent
+        self.option_ids = list(option_ids)
+        self.text = text
+        self.question_ids = list(question_ids)
+
+    @property
+    def is_filtering(self):
+        return bool(self.since or self.until or self.respondent or self.option_ids or self.text)
+
+    @property
+    def is_active(self):
+        return self.is_filtering or bool(self.question_ids)
+
+    def apply(self, form: CompiledForm, objects: QuerySet):
+        if self.since:
+            objects = objects.filter(created_at__gte=_start_of_day(self.since))
+
+        if self.until:
+            objects = objects.filter(created_at__lt=_start_of_day(self.until + timedelta(days=1)))
+
+        if self.respondent == ANONYMOUS:
+            objects = objects.filter(user__isnull=True)
+        elif self.respondent == AUTHENTICATED:
+            objects = objects.filter(user__isnull=False)
+        elif self.respondent:
+            objects = objects.filter(user__username=self.respondent)
+
+        for option_id in self.option_ids:
+            objects = objects.filter(_chose_option(form.options_by_id[option_id].question_id, option_id))
+
+        if self.text:
+            objects = objects.filter(_contains_text(form, self.text))
+
+        return objects
+
+    def to_query(self):
+        """
+        Query string of the filters, to keep them in pagination and download links.
+        """
+        params = [
+            ("since", self.since.isoformat() if self.since else ""),
+            ("until", self.until.isoformat() if self.until else ""),
+            ("respondent", self.respondent),
+            ("text", self.text),
+        ] + [("option", option_id) for option_id in self.option_ids] + [
+            ("column", question_id) for question_id in self.question_ids
+        ]
+        return urlencode([(name, value) for name, value in params if value != ""])
+
+
+def parse_response_filter(form: CompiledForm, params):
+    """
+    Parses the filters from query parameters (``since``, ``until``, ``respondent``, ``option`` and ``text``)
+    and the question columns to export (``column``, repeatable). Empty parameters are ignored.
+    Raises ValueError if a parameter is invalid, or an option or question is not of the form.
+    """
+    since = _parse_date(params.get("since", ""), "since")
+    until = _parse_date(params.get("until", ""), "until")
+
+    option_ids = [_parse_id(value, form.options_by_id, "option") for value in params.getlist("option") if value]
+    question_ids = [_parse_id(value, form.questions_by_id, "column") for value in params.getlist("column") if value]
+
+    return ResponseFilter(
+        since=since,
+        until=until,
+        respondent=params.get("respondent", "").strip(),
+        option_ids=dict.fromkeys(option_ids),
+        text=params.get("text", "").strip(),
+        question_ids=dict.fromkeys(question_ids),
+    )
+
+
+def _parse_date(value: str, name: str):
+    if not value:
+        return None
+
+    try:
+        date = parse_date(value)
+    except ValueError:
+        date = None
+
+    if date is None:
+        raise ValueError(f"Invalid date for {name}, expected YYYY-MM-DD")
+
+    return date
+
+
+def _parse_id(value: str, ids, name: str):
+    try:
+        object_id = int(value)
+    except ValueError:
+        object_id = None
+
+    if object_id not in ids:
+        raise ValueError(f"Invalid {name}, not of the form")
+
+    return object_id
+
+
+def _start_of_day(date):
+    start = datetime.combine(date, time.min)
+    return timezone.make_aware(start) if settings.USE_TZ else start
+
+
+def _chose_option(question_id: int, option_id: int):
+    """
+    Predicate of the responses with the option chosen, in their answer rows or in their compact answers.
+    """
+    normalized = Exists(Answer.choices.through.objects.filter(
+        option_id=option_id, answer__response_id=OuterRef("pk")
+    ))
+    key = Response.answer_key(question_id)
+
+    if connection.vendor == "sqlite":
+        # the compact answer is an option ID (radio) or a list of them (checkbox), both iterated by json_each
+        compact = RawSQL(
+            f"EXISTS (SELECT 1 FROM json_each({Response._meta.db_table}.answers_data, %s) WHERE value = %s)",
+            (f"$.{key}", option_id),
+            output_field=BooleanField(),
+        )
+    else:
+        compact = Q(**{f"answers_data__{key}__contains": option_id})
+
+    return normalized | compact
+
+
+def _contains_text(form: CompiledForm, text: str):
+    """
+    Predicate of the responses with a text answer containing the text, in their answer rows or compact answers.
+    """
+    predicate = Q(Exists(Answer.objects.filter(response_id=OuterRef("pk"), text__icontains=text)))
+
+    for question in form.questions:
+        if question.type in TEXT_QUESTION_TYPES:
+            predicate |= Q(**{f"answers_data__{Response.answer_key(question.id)}__icontains": text})
+
+    return predicate
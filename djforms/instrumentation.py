@@ -0,0 +1,176 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.http import FileResponse
+
+logger = logging.getLogger("djforms.instrumentation")
+
+# duplicate query fingerprints reported per request, most repeated first
+DUPLICATES_REPORTED = 5
+
+# lists of placeholders (of IN lookups), quoted strings and numbers, replaced to fingerprint the queries
+PLACEHOLDER_LIST_PATTERN = re.compile(r"\((?:%s|\?)(?:, ?(?:%s|\?))*\)")
+LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def is_instrumentation_enabled():
+    """
+    Whether ``InstrumentationMiddleware`` measures the requests, set by ``DJFORMS_INSTRUMENTATION``.
+    """
+    return getattr(settings, "DJFORMS_INSTRUMENTATION", False)
+
+
+def is_query_budget_strict():
+    """
+    Whether an exceeded query budget raises ``QueryBudgetExceeded`` (in tests) instead of logging a warning,
+    set by ``DJFORMS_QUERY_BUDGET_RAISE``.
+    """
+    return getattr(settings, "DJFORMS_QUERY_BUDGET_RAISE", False)
+
+
+def query_budget(queries: int):
+    """
+    Declares the maximum number of queries of a view, including the ones of the session and the user,
+    checked by ``InstrumentationMiddleware``. Kept by ``login_required`` when applied below it.
+    """
+    def decorator(view):
+        view.query_budget = queries
+        return view
+
+    return decorator
+
+
+def fingerprint(sql: str):
+    """
+    Fingerprint of a query, the same whatever its parameters, literals and number of values of its IN lists.
+    """
+    normalized = LITERAL_PATTERN.sub("?", PLACEHOLDER_LIST_PATTERN.sub("(...)", sql))
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized
+
+
+class RequestMetrics:
+    """
+    Execute wrapper of the database connection recording the queries of a request: their number,
+    their total duration and their fingerprints.
+    """
+
+    __slots__ = ("start", "view", "budget", "queries", "db_time", "fingerprints", "statements")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.view = None
+        self.budget = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            key, normalized = fingerprint(sql)
+            self.fingerprints[key] += 1
+            self.statements.setdefault(key, normalized)
+
+    def duplicates(self):
+        return [
+            {"fingerprint": key, "count": count, "sql": self.statements[key][:200]}
+            for key, count in self.fingerprints.most_common(DUPLICATES_REPORTED) if count > 1
+        ]
+
+    def server_timing(self):
+        return (f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries", '
+                f"app;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+
+
+class InstrumentationMiddleware:
+    """
+    Measures the number of queries, their total duration, the repeated queries and the wall time of every request
+    when ``DJFORMS_INSTRUMENTATION`` is enabled. They are sent in the ``Server-Timing`` header (up to the start of
+    streamed contents), and logged as JSON by the ``djforms.instrumentation`` logger once the response is complete.
+
+    Checks the query budget of the view, see ``query_budget``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_instrumentation_enabled():
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        request.djforms_metrics = metrics
+        connection.execute_wrappers.append(metrics)
+
+        try:
+            response = self.get_response(request)
+        except Exception:
+            connection.execute_wrappers.remove(metrics)
+            raise
+
+        response.headers["Server-Timing"] = metrics.server_timing()
+
+        if response.streaming and not isinstance(response, FileResponse):
+            # the queries of the streamed content are made while the response is iterated
+            response.streaming_content = self._measure_stream(response.streaming_content, request, response, metrics)
+        else:
+            connection.execute_wrappers.remove(metrics)
+            self._report(request, response, metrics)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = getattr(request, "djforms_metrics", None)
+
+        if metrics:
+            metrics.view = request.resolver_match.view_name
+            metrics.budget = getattr(view_func, "query_budget", None)
+
+    def _measure_stream(self, content, request, response, metrics):
+        completed = False
+
+        try:
+            yield from content
+            completed = True
+        finally:
+            connection.execute_wrappers.remove(metrics)
+            self._report(request, response, metrics, strict=completed)
+
+    @staticmethod
+    def _report(request, response, metrics, strict=True):
+        record = {
+            "view": metrics.view,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": metrics.queries,
+            "db_ms": round(metrics.db_time * 1000, 1),
+            "duration_ms": round((time.perf_counter() - metrics.start) * 1000, 1),
+            "duplicates": metrics.duplicates(),
+            "budget": metrics.budget,
+        }
+        logger.info(json.dumps(record))
+
+        if metrics.budget is not None and metrics.queries > metrics.budget:
+            message = f"View {metrics.view} made {metrics.queries} queries, over its budget of {metrics.budget}"
+
+            if strict and is_query_budget_strict():
+                raise QueryBudgetExceeded(message)
+
+            logger.warning(message, extra={"instrumentation": record})
@@ -0,0 +1,263 @@
+import csv
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction, connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .compression import decompress_gzip_stream
+from .counters import get_response_watermark
+from .export import EXPORT_CHUNK_SIZE, ExportPlan, iter_plan_rows
+from .export_shards import get_export_processes, write_csv_shards
+from .metrics import EXPORTED_BYTES, EXPORT_DURATION
+from .models import Response, ExportJob, ExportCache, User
+from .schema import CompiledForm, compile_form
+
+THREAD = "thread"
+COMMAND = "command"
+EXPORT_WORKERS = [THREAD, COMMAND]
+
+# running jobs not updated for this long are taken as dead (e.g. killed worker) and not reused
+EXPORT_STALE_TIMEOUT = timedelta(minutes=10)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_export_root():
+    """
+    Directory of the export files, set by ``DJFORMS_EXPORT_ROOT``.
+    """
+    return str(getattr(settings, "DJFORMS_EXPORT_ROOT", os.path.join(settings.BASE_DIR, "exports")))
+
+
+def get_export_worker():
+    """
+    Worker of the export jobs, set by ``DJFORMS_EXPORT_WORKER``:
+
+    - ``thread``: a thread pool of the web process, of ``DJFORMS_EXPORT_THREADS`` threads.
+    - ``command``: the ``run_export_jobs`` management command, run separately.
+    """
+    return getattr(settings, "DJFORMS_EXPORT_WORKER", THREAD)
+
+
+def get_export_directory(form_id: int):
+    return os.path.join(get_export_root(), f"form-{form_id}")
+
+
+def get_export_path(job: ExportJob):
+    return os.path.join(get_export_directory(job.form_id), job.file_name)
+
+
+def get_export_cache_path(form_id: int):
+    """
+    Path of the materialized export of the form, maintained by ``export_cache``.
+    """
+    return os.path.join(get_export_directory(form_id), "responses.csv.gz")
+
+
+def export_fingerprint(form: CompiledForm, last_response_id: int, responses: int):
+    return f"{form.version}:{last_response_id}:{responses}"
+
+
+def request_export(form: CompiledForm, user: User):
+    """
+    Returns the export job of the current responses of the form, reusing the pending, running or done job
+    of the same form version and responses, otherwise creating a job for the worker.
+    """
+    last_response_id, responses = get_response_watermark(form.id)
+    fingerprint = export_fingerprint(form, last_response_id, responses)
+
+    jobs = ExportJob.objects.filter(form_id=form.id, fingerprint=fingerprint).filter(
+        Q(status__in=[ExportJob.Status.PENDING, ExportJob.Status.DONE]) |
+        Q(status=ExportJob.Status.RUNNING, updated_at__gte=timezone.now() - EXPORT_STALE_TIMEOUT)
+    ).order_by("-id")
+
+    for job in jobs:
+        if job.status != ExportJob.Status.DONE or os.path.exists(get_export_path(job)):
+            return job
+
+    job = ExportJob.objects.create(
+        form_id=form.id,
+        requested_by=user,
+        fingerprint=fingerprint,
+        last_response_id=last_response_id,
+    )
+
+    if get_export_worker() == THREAD:
+        run_in_background(run_export_job, job.id)
+
+    return job
+
+
+def run_in_background(function, *args):
+    """
+    Runs the function in the thread pool of the export jobs, once the current transaction is committed.
+    """
+    transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, function, *args))
+
+
+def _get_executor():
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, "DJFORMS_EXPORT_THREADS", 2),
+                                           thread_name_prefix="djforms-export")
+        return _executor
+
+
+def _run_in_thread(function, *args):
+    try:
+        function(*args)
+    finally:
+        connections.close_all()  # connections of the pool threads are not closed by request handling
+
+
+def claim_next_job():
+    """
+    Returns the ID of the oldest pending job, marked as running, or None if there is no pending job.
+    """
+    for job_id in ExportJob.objects.filter(status=ExportJob.Status.PENDING).order_by("id").values_list(
+            "id", flat=True)[:10]:
+        if _claim(job_id):
+            return job_id
+
+    return None
+
+
+def _claim(job_id: int):
+    return ExportJob.objects.filter(pk=job_id, status=ExportJob.Status.PENDING).update(
+        status=ExportJob.Status.RUNNING, updated_at=timezone.now()
+    ) == 1
+
+
+def run_export_job(job_id: int, claimed: bool = False):
+    """
+    Writes the export file of the job, updating its progress after every chunk of responses
+    (after every shard when rendered by several processes, see ``DJFORMS_EXPORT_PROCESSES``).
+    The file is written next to its final path, then moved in place once complete.
+    Returns False if the job was not pending (already taken by another worker).
+    """
+    if not claimed and not _claim(job_id):
+        return False
+
+    start = time.perf_counter()
+    job = ExportJob.objects.get(pk=job_id)
+    job.file_name = f"job-{job.id}.csv"
+    path = get_export_path(job)
+    partial_path = f"{path}.part"
+
+    try:
+        form = compile_form(job.form_id)
+        objects = Response.objects.filter(form_id=job.form_id, id__lte=job.last_response_id or 0)
+        total = objects.count()
+        ExportJob.objects.filter(pk=job.id).update(total=total, updated_at=timezone.now())
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if not _copy_export_cache(form, job.last_response_id or 0, total, partial_path):
+            with open(partial_path, "w", newline="", encoding="utf-8") as file:
+                writer = csv.writer(file, delimiter=",", quoting=csv.QUOTE_ALL)
+                plan = ExportPlan(form)
+                writer.writerow(plan.header)
+
+                if get_export_processes() > 1:
+                    write_csv_shards(plan, job.form_id, job.last_response_id, file, on_shard=lambda processed: (
+                        ExportJob.objects.filter(pk=job.id).update(processed=processed, updated_at=timezone.now())
+                    ))
+                else:
+                    for processed, row in enumerate(iter_plan_rows(plan, objects), start=1):
+                        writer.writerow(row)
+
+                        if processed % EXPORT_CHUNK_SIZE == 0:
+                            ExportJob.objects.filter(pk=job.id).update(processed=processed, updated_at=timezone.now())
+
+        os.replace(partial_path, path)
+        file_size = os.path.getsize(path)
+
+        ExportJob.objects.filter(pk=job.id).update(
+            status=ExportJob.Status.DONE,
+            processed=total,
+            file_name=job.file_name,
+            file_size=file_size,
+            updated_at=timezone.now(),
+        )
+        EXPORTED_BYTES.inc(file_size, source="job", format="csv")
+        EXPORT_DURATION.observe(time.perf_counter() - start, source="job", format="csv")
+        _purge_older_jobs(job)
+    except Exception as e:
+        traceback.print_exc()
+
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+        ExportJob.objects.filter(pk=job.id).update(status=ExportJob.Status.FAILED, error=str(e),
+                                                   updated_at=timezone.now())
+
+    return True
+
+
+def _copy_export_cache(form: CompiledForm, last_response_id: int, rows: int, path: str):
+    """
+    Writes the export file by decompressing the materialized export of the form, when it holds the same form
+    version and responses, instead of rendering the rows again. Returns False if it does not.
+
+    The cache entry is read again once its file is opened: a refresh started or finished meanwhile
+    (locked, or updated) may have replaced the file, which is then not used.
+    """
+    fields = ("version", "last_response_id", "rows", "file_size", "locked_at", "updated_at")
+    export_cache = ExportCache.objects.filter(pk=form.id).values_list(*fields).first()
+
+    if not export_cache or export_cache[0:3] != (form.version, last_response_id, rows) or export_cache[4]:
+        return False
+
+    cache_path = get_export_cache_path(form.id)
+
+    if not os.path.exists(cache_path):
+        return False
+
+    file_size = export_cache[3]
+
+    with open(cache_path, "rb") as cache_file:
+        if (os.fstat(cache_file.fileno()).st_size < file_size or
+                ExportCache.objects.filter(pk=form.id).values_list(*fields).first() != export_cache):
+            return False
+
+        with open(path, "wb") as file:
+            for data in decompress_gzip_stream(_read_blocks(cache_file, file_size)):
+                file.write(data)
+
+    return True
+
+
+def _read_blocks(file, length: int, block_size: int = 64 * 1024):
+    while length > 0:
+        block = file.read(min(block_size, length))
+
+        if not block:
+            return
+
+        length -= len(block)
+        yield block
+
+
+def _purge_older_jobs(job: ExportJob):
+    """
+    Deletes the finished jobs of the form older than the given one, with their files.
+    """
+    older_jobs = ExportJob.objects.filter(
+        form_id=job.form_id, id__lt=job.id, status__in=[ExportJob.Status.DONE, ExportJob.Status.FAILED]
+    )
+
+    for older_job in older_jobs.only("id", "form_id", "file_name"):
+        if older_job.file_name and os.path.exists(get_export_path(older_job)):
+            os.remove(get_export_path(older_job))
+
+    older_jobs.delete()
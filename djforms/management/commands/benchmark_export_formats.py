@@ -0,0 +1,69 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from djforms.benchmark import create_benchmark_form, random_answers
+from djforms.export import ExportPlan
+from djforms.export_formats import EXPORT_FORMATS
+from djforms.models import Response
+from djforms.storage import save_response
+
+
+class Command(BaseCommand):
+    help = ("Compares the throughput and peak memory of the export formats. "
+            "Runs in a transaction that is rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--responses", type=int, default=5000)
+        parser.add_argument("--questions", type=int, default=30)
+        parser.add_argument("--options", type=int, default=5, help="Options per radio or checkbox question")
+        parser.add_argument("--format", dest="formats", choices=list(EXPORT_FORMATS), action="append",
+                            help="Only the given format (repeatable)")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, responses=5000, questions=30, options=5, formats=None, seed=0, **kwargs):
+        formats = formats or list(EXPORT_FORMATS)
+
+        if responses < 1:
+            raise CommandError("At least one response is required.")
+
+        with transaction.atomic():
+            form = create_benchmark_form("export", questions, options)
+            rnd = random.Random(seed)
+
+            for _ in range(responses):
+                save_response(form, Response(form_id=form.id), random_answers(form, rnd))
+
+            self.stdout.write(f"{responses} responses to a form of {questions} questions")
+            self.stdout.write(f"{'format':<10}{'rows/s':>12}{'MB':>10}{'MB/s':>10}{'peak MB':>10}")
+
+            for export_format in formats:
+                rate, size, peak = self._benchmark(EXPORT_FORMATS[export_format], form, responses)
+                self.stdout.write(f"{export_format:<10}{rate:>12.0f}{size / 2 ** 20:>10.1f}"
+                                  f"{size / 2 ** 20 * rate / responses:>10.1f}{peak / 2 ** 20:>10.1f}")
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _benchmark(export_format, form, responses):
+        """
+        Exports twice: once timed, once traced for the peak memory (tracing slows the export down).
+        """
+        objects = Response.objects.filter(form_id=form.id)
+        size = 0
+
+        start = time.perf_counter()
+        for chunk in export_format.stream(ExportPlan(form), objects):
+            size += len(chunk.encode() if isinstance(chunk, str) else chunk)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        for _ in export_format.stream(ExportPlan(form), objects):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return responses / elapsed, size, peak
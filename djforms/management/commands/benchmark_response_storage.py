@@ -0,0 +1,61 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from djforms.benchmark import create_benchmark_form, random_answers
+from djforms.export import ExportPlan, iter_plan_rows
+from djforms.models import Response, Answer
+from djforms.storage import STORAGES, save_response
+
+
+class Command(BaseCommand):
+    help = ("Compares the write and read throughput of the normalized and compact storages of responses. "
+            "Runs in a transaction that is rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--responses", type=int, default=1000)
+        parser.add_argument("--questions", type=int, default=30)
+        parser.add_argument("--options", type=int, default=5, help="Options per radio or checkbox question")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, responses=1000, questions=30, options=5, seed=0, **kwargs):
+        self.stdout.write(f"{responses} responses to a form of {questions} questions")
+        self.stdout.write(f"{'storage':<12}{'rows':>10}{'write/s':>12}{'read/s':>12}{'export/s':>12}")
+
+        with transaction.atomic():
+            for storage in STORAGES:
+                rows, write_rate, read_rate, export_rate = self._benchmark(
+                    storage, responses, questions, options, random.Random(seed)
+                )
+                self.stdout.write(f"{storage:<12}{rows:>10}{write_rate:>12.0f}{read_rate:>12.0f}{export_rate:>12.0f}")
+
+            transaction.set_rollback(True)
+
+    def _benchmark(self, storage, responses, questions, options, rnd):
+        form = create_benchmark_form(storage, questions, options)
+        answers_data = [random_answers(form, rnd) for _ in range(responses)]
+
+        start = time.perf_counter()
+        for data in answers_data:
+            save_response(form, Response(form_id=form.id), data, storage=storage)
+        write_time = time.perf_counter() - start
+
+        objects = Response.objects.filter(form_id=form.id)
+
+        start = time.perf_counter()
+        for form_response in objects.prefetch_related("answers__choices", "answers__question").iterator(
+                chunk_size=500):
+            form_response.answers_as_dict()
+        read_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in iter_plan_rows(ExportPlan(form), objects):
+            pass
+        export_time = time.perf_counter() - start
+
+        rows = (objects.count() + Answer.objects.filter(response__form_id=form.id).count() +
+                Answer.choices.through.objects.filter(answer__response__form_id=form.id).count())
+
+        return rows, responses / write_time, responses / read_time, responses / export_time
@@ -0,0 +1,68 @@
+import csv
+import io
+import os
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from djforms.benchmark import create_benchmark_form, random_answers
+from djforms.export import ExportPlan
+from djforms.export_formats import stream_csv
+from djforms.export_shards import write_csv_shards
+from djforms.models import Response, User
+from djforms.storage import save_response
+
+
+class Command(BaseCommand):
+    help = ("Compares the sharded CSV export with several worker processes against the single-process CSV stream. "
+            "The responses are committed (worker processes only see committed data), then deleted at the end.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--responses", type=int, default=20000)
+        parser.add_argument("--questions", type=int, default=30)
+        parser.add_argument("--options", type=int, default=5, help="Options per radio or checkbox question")
+        parser.add_argument("--processes", type=int, action="append",
+                            help="Worker processes to benchmark (repeatable, defaults to 1, 2, 4 up to the CPUs)")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, responses=20000, questions=30, options=5, processes=None, seed=0, **kwargs):
+        processes = processes or [count for count in (1, 2, 4, 8) if count <= (os.cpu_count() or 1)]
+
+        if responses < 1:
+            raise CommandError("At least one response is required.")
+
+        form = create_benchmark_form("shards", questions, options)
+
+        try:
+            rnd = random.Random(seed)
+
+            for _ in range(responses):
+                save_response(form, Response(form_id=form.id), random_answers(form, rnd))
+
+            last_response_id = Response.objects.filter(form_id=form.id).order_by("-id").values_list(
+                "id", flat=True).first()
+
+            self.stdout.write(f"{responses} responses to a form of {questions} questions, {os.cpu_count()} CPUs")
+            self.stdout.write(f"{'export':<20}{'seconds':>10}{'rows/s':>12}{'speedup':>10}")
+
+            start = time.perf_counter()
+            expected = "".join(stream_csv(ExportPlan(form), Response.objects.filter(form_id=form.id)))
+            baseline = time.perf_counter() - start
+            self.stdout.write(f"{'stream_csv':<20}{baseline:>10.2f}{responses / baseline:>12.0f}{1:>10.2f}")
+
+            for count in processes:
+                file = io.StringIO()
+                start = time.perf_counter()
+                plan = ExportPlan(form)
+                csv.writer(file, delimiter=",", quoting=csv.QUOTE_ALL).writerow(plan.header)
+                write_csv_shards(plan, form.id, last_response_id, file, processes=count)
+                elapsed = time.perf_counter() - start
+
+                if file.getvalue() != expected:
+                    raise CommandError(f"The export with {count} processes differs from the CSV stream.")
+
+                self.stdout.write(f"{f'{count} processes':<20}{elapsed:>10.2f}{responses / elapsed:>12.0f}"
+                                  f"{baseline / elapsed:>10.2f}")
+        finally:
+            User.objects.filter(pk=form.created_by_id).delete()
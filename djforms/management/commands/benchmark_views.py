@@ -0,0 +1,109 @@
+import json
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from djforms.benchmark import VIEW_BENCHMARKS, seed_benchmark_dataset, run_view_benchmark, \
+    load_benchmark_results, compare_benchmark_results
+
+
+class Command(BaseCommand):
+    help = ("Measures the latency, number of queries and peak memory of the hot views on a seeded dataset. "
+            "Runs in a transaction that is rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--forms", type=int, default=10)
+        parser.add_argument("--questions", type=int, default=30)
+        parser.add_argument("--options", type=int, default=5, help="Options per radio or checkbox question")
+        parser.add_argument("--responses", type=int, default=1000, help="Responses per form")
+        parser.add_argument("--repeat", type=int, default=10, help="Timed requests per view")
+        parser.add_argument("--view", dest="views", choices=[benchmark.name for benchmark in VIEW_BENCHMARKS],
+                            action="append", help="Only the given view (repeatable)")
+        parser.add_argument("--output", help="JSON file to write the results to")
+        parser.add_argument("--compare", help="JSON file of a previous run to compare the results with")
+        parser.add_argument("--threshold", type=float,
+                            help="Fails on a regression from the compared run, e.g. 0.2 for 20 %% slower")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, forms=10, questions=30, options=5, responses=1000, repeat=10, views=None, output=None,
+               compare=None, threshold=None, seed=0, **kwargs):
+        if forms < 1 or responses < 1 or repeat < 1:
+            raise CommandError("At least one form, one response and one repeat are required.")
+
+        if threshold is not None and not compare:
+            raise CommandError("--threshold requires --compare.")
+
+        previous = load_benchmark_results(compare) if compare else None
+        benchmarks = [benchmark for benchmark in VIEW_BENCHMARKS if not views or benchmark.name in views]
+        results = self._run(benchmarks, forms, questions, options, responses, repeat, seed)
+
+        if output:
+            with open(output, "w") as file:
+                json.dump(results, file, indent=2)
+
+        if previous:
+            self._compare(previous, results, threshold)
+
+    def _run(self, benchmarks, forms, questions, options, responses, repeat, seed):
+        export_root = tempfile.mkdtemp()
+
+        try:
+            # the test client is served as "testserver", and the download writes the export cache file
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+                                   DJFORMS_EXPORT_ROOT=export_root), transaction.atomic():
+                dataset = seed_benchmark_dataset(forms, questions, options, responses, seed)
+                client = Client()
+                client.force_login(dataset.owner)
+
+                self.stdout.write(f"{forms} forms of {questions} questions, {responses} responses per form")
+                self.stdout.write(f"{'view':<16}{'median ms':>12}{'min ms':>10}{'max ms':>10}"
+                                  f"{'queries':>10}{'peak KiB':>12}")
+
+                results = {}
+
+                for benchmark in benchmarks:
+                    result = run_view_benchmark(benchmark, client, dataset, repeat, seed)
+
+                    if result["status"] >= 400:
+                        raise CommandError(f"{benchmark.name} answered with status {result['status']}.")
+
+                    results[benchmark.name] = result
+                    self.stdout.write(f"{benchmark.name:<16}{result['median_ms']:>12.2f}{result['min_ms']:>10.2f}"
+                                      f"{result['max_ms']:>10.2f}{result['queries']:>10}{result['peak_kb']:>12.1f}")
+
+                transaction.set_rollback(True)
+        finally:
+            shutil.rmtree(export_root, ignore_errors=True)
+
+        return {
+            "created_at": timezone.now().isoformat(),
+            "dataset": {"forms": forms, "questions": questions, "options": options, "responses": responses,
+                        "repeat": repeat, "seed": seed},
+            "results": results,
+        }
+
+    def _compare(self, previous, results, threshold):
+        if previous.get("dataset") != results["dataset"]:
+            self.stdout.write(self.style.WARNING("The compared run was made on a different dataset."))
+
+        for name, result in results["results"].items():
+            before = previous["results"].get(name)
+
+            if before:
+                self.stdout.write(f"{name:<16}{before['median_ms']:>10.2f} -> {result['median_ms']:<10.2f}ms"
+                                  f"{before['queries']:>6} -> {result['queries']:<6}queries")
+
+        if threshold is None:
+            return
+
+        regressions = compare_benchmark_results(previous, results, threshold)
+
+        if regressions:
+            raise CommandError("Regressions:\n" + "\n".join(regressions))
+
+        self.stdout.write(self.style.SUCCESS(f"No regression above {threshold:.0%}."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from djforms.models import Response
+from djforms.storage import STORAGES, convert_responses
+
+
+class Command(BaseCommand):
+    help = "Converts the answers of existing responses between the normalized and compact storages."
+
+    def add_arguments(self, parser):
+        parser.add_argument("storage", choices=STORAGES, help="Target storage")
+        parser.add_argument("--form", dest="form_ids", type=int, action="append",
+                            help="Only the responses of the form with the given ID (repeatable)")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Responses converted per transaction")
+
+    def handle(self, *args, storage=None, form_ids=None, chunk_size=500, **options):
+        objects = Response.objects.all()
+
+        if form_ids:
+            objects = objects.filter(form_id__in=form_ids)
+
+        converted = convert_responses(objects, storage, chunk_size)
+
+        self.stdout.write(self.style.SUCCESS(f"{converted} response(s) converted to {storage} storage."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from djforms.deletion import purge_deleted_forms
+
+
+class Command(BaseCommand):
+    help = ("Purges the forms marked as deleted, with their responses in chunks. "
+            "Needed when DJFORMS_EXPORT_WORKER is \"command\", or to finish purges interrupted by a restart.")
+
+    def handle(self, *args, **options):
+        purged = purge_deleted_forms()
+        self.stdout.write(self.style.SUCCESS(f"{purged} form(s) purged."))
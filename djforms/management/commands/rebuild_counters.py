@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from djforms.counters import count_actual, count_stored, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuilds (or verifies) the denormalized response, answer and selection counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--form", dest="form_ids", type=int, action="append",
+                            help="Only the form with the given ID (repeatable)")
+        parser.add_argument("--verify", action="store_true",
+                            help="Only compare the stored counters with the actual counts, without changing them")
+
+    def handle(self, *args, form_ids=None, verify=False, **options):
+        if not verify:
+            rebuild_counters(form_ids)
+            self.stdout.write(self.style.SUCCESS("Counters rebuilt."))
+            return
+
+        labels = ["responses of form", "answers of question", "selections of option"]
+        mismatches = 0
+
+        for label, actual, stored in zip(labels, count_actual(form_ids), count_stored(form_ids)):
+            for key in sorted(actual.keys() | stored.keys()):
+                if actual.get(key, 0) != stored.get(key, 0):
+                    mismatches += 1
+                    self.stdout.write(f"Mismatch in {label} {key}: "
+                                      f"stored {stored.get(key, 0)}, actual {actual.get(key, 0)}")
+
+        if mismatches:
+            raise CommandError(f"{mismatches} counter(s) out of sync, run the command without --verify to rebuild.")
+
+        self.stdout.write(self.style.SUCCESS("Counters are in sync."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import NotSupportedError, transaction
+
+from djforms.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the search index of the text answers, e.g. for the responses saved before it existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--form", dest="form_ids", type=int, action="append",
+                            help="Only the form with the given ID (repeatable)")
+
+    def handle(self, *args, form_ids=None, **options):
+        try:
+            with transaction.atomic():
+                indexed = rebuild_search_index(form_ids)
+        except NotSupportedError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"{indexed} answer(s) indexed."))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from djforms.export_cache import claim_export_cache_refresh, refresh_form_export_cache
+from djforms.jobs import claim_next_job, run_export_job
+from djforms.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = ("Runs the pending export jobs and export cache refreshes, as a worker when DJFORMS_EXPORT_WORKER is "
+            "\"command\".")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="Exit once there is no pending job, instead of waiting for new jobs")
+        parser.add_argument("--interval", type=float, default=2.0,
+                            help="Seconds between checks for new jobs (default 2)")
+
+    def handle(self, *args, once=False, interval=2.0, **options):
+        while True:
+            job_id = claim_next_job()
+
+            if job_id is None:
+                form_id = claim_export_cache_refresh()
+
+                if form_id is not None:
+                    refresh_form_export_cache(form_id)
+                    self.stdout.write(f"Export cache of form {form_id} refreshed")
+                    continue
+
+                if once:
+                    return
+                time.sleep(interval)
+                continue
+
+            run_export_job(job_id, claimed=True)
+            status = ExportJob.objects.filter(pk=job_id).values_list("status", flat=True).first()
+            self.stdout.write(f"Export job {job_id}: {status}")
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from djforms.seeding import SEED_BATCH_SIZE, seed_djforms
+from djforms.storage import STORAGES, get_response_storage
+
+
+class Command(BaseCommand):
+    help = ("Seeds synthetic users, forms with all the question types, and responses with realistic distributions, "
+            "with batched multi-row inserts. Counters and the search index are filled along.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--forms", type=int, default=10)
+        parser.add_argument("--questions", type=int, default=20, help="Questions per form")
+        parser.add_argument("--options", type=int, default=5, help="Options per radio or checkbox question")
+        parser.add_argument("--responses", type=int, default=100000, help="Responses of all the forms")
+        parser.add_argument("--storage", choices=STORAGES, help="Defaults to DJFORMS_RESPONSE_STORAGE")
+        parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE, help="Responses per transaction")
+        parser.add_argument("--processes", type=int, default=1, help="Worker processes generating the responses")
+        parser.add_argument("--days", type=int, default=365, help="Days the responses are spread over")
+        parser.add_argument("--no-search-index", dest="search_index", action="store_false",
+                            help="Do not index the text answers (run rebuild_search_index later)")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, users=100, forms=10, questions=20, options=5, responses=100000, storage=None,
+               batch_size=SEED_BATCH_SIZE, processes=1, days=365, search_index=True, seed=0, **kwargs):
+        if users < 1 or forms < 1 or questions < 1 or options < 1 or batch_size < 1 or processes < 1:
+            raise CommandError("Users, forms, questions, options, batch size and processes must be at least 1.")
+
+        storage = storage or get_response_storage()
+        start = time.perf_counter()
+
+        def on_batch(written_responses, written_answers):
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{written_responses} responses, {written_answers} answers "
+                              f"({written_answers / elapsed:.0f} answers/s)")
+
+        written_responses, written_answers = seed_djforms(
+            users, forms, questions, options, responses, storage=storage, batch_size=batch_size,
+            processes=processes, days=days, search_index=search_index, seed_value=seed, on_batch=on_batch,
+        )
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {users} users, {forms} forms, {written_responses} responses and {written_answers} answers "
+            f"({storage}) in {elapsed:.1f} s, {written_answers / elapsed:.0f} answers/s."
+        ))
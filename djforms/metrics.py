@@ -0,0 +1,339 @@
+import glob
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+from django.http import FileResponse
+
+# content type of the text exposition format of Prometheus
+EXPOSITION_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# upper bounds (in seconds) of the buckets of the latency histograms
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+# initial size of the file of the values of a process, doubled when full
+VALUES_FILE_SIZE = 64 * 1024
+
+
+def is_metrics_enabled():
+    """
+    Whether the views and the submissions and exports are measured, set by ``DJFORMS_METRICS``.
+    """
+    return getattr(settings, "DJFORMS_METRICS", True)
+
+
+def get_metrics_directory():
+    """
+    Directory shared by the processes of the server (e.g. gunicorn workers) for their values, set by
+    ``DJFORMS_METRICS_DIR``: each process writes its own memory-mapped file, and ``/metrics`` sums them all.
+    Without it, the values are kept in the memory of each process.
+    """
+    return getattr(settings, "DJFORMS_METRICS_DIR", None)
+
+
+def get_metrics_token():
+    """
+    Bearer token of the scrapers of ``/metrics`` (staff users are always allowed), set by ``DJFORMS_METRICS_TOKEN``.
+    """
+    return getattr(settings, "DJFORMS_METRICS_TOKEN", None)
+
+
+class MemoryValues:
+    """
+    Values of the samples of the current process, by sample key.
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    def increment(self, key: str, amount: float):
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def read_all(self):
+        return dict(self.values)
+
+
+class FileValues:
+    """
+    Values of the samples of the current process in a memory-mapped file of the directory, read back with the
+    files of the other processes (as the multiprocess mode of the Prometheus client). Only this process writes
+    its file, so no file locking is needed.
+
+    The file starts with the number of used bytes, followed by entries of the key length, the key (padded to
+    8 bytes) and the value as a double. An entry is written before the used length is updated, so readers
+    never see partial entries.
+    """
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.file = open(os.path.join(directory, f"metrics-{os.getpid()}.db"), "a+b")
+
+        if os.fstat(self.file.fileno()).st_size == 0:
+            self.file.truncate(VALUES_FILE_SIZE)
+
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.used = struct.unpack_from("i", self.map, 0)[0] or 8
+        self.positions = {key: position for key, position, _ in _read_entries(self.map, self.used)}
+
+    def increment(self, key: str, amount: float):
+        position = self.positions.get(key)
+
+        if position is None:
+            position = self._add(key)
+
+        struct.pack_into("d", self.map, position, struct.unpack_from("d", self.map, position)[0] + amount)
+
+    def _add(self, key: str):
+        encoded = key.encode()
+        padded = encoded + b" " * (-(4 + len(encoded)) % 8)
+        size = 4 + len(padded) + 8
+
+        while self.used + size > len(self.map):
+            self.map.close()
+            self.file.truncate(os.fstat(self.file.fileno()).st_size * 2)
+            self.map = mmap.mmap(self.file.fileno(), 0)
+
+        struct.pack_into(f"i{len(padded)}sd", self.map, self.used, len(encoded), padded, 0.0)
+        position = self.used + 4 + len(padded)
+        self.used += size
+        struct.pack_into("i", self.map, 0, self.used)
+        self.positions[key] = position
+
+        return position
+
+    def read_all(self):
+        """
+        Sums the values of the files of all the processes, dead ones included, as counters must not decrease.
+        """
+        values = {}
+
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.db")):
+            with open(path, "rb") as file:
+                data = file.read()
+
+            used = struct.unpack_from("i", data, 0)[0] if len(data) >= 8 else 0
+
+            for key, _, value in _read_entries(data, used):
+                values[key] = values.get(key, 0.0) + value
+
+        return values
+
+
+def _read_entries(data, used: int):
+    position = 8
+
+    while position < used:
+        length = struct.unpack_from("i", data, position)[0]
+        padded_length = length + (-(4 + length) % 8)
+        key = bytes(data[position + 4:position + 4 + length]).decode()
+        value_position = position + 4 + padded_length
+        yield key, value_position, struct.unpack_from("d", data, value_position)[0]
+        position = value_position + 8
+
+
+class MetricsRegistry:
+    """
+    Registry of the counters and histograms of the application, rendered in the text exposition format.
+    The values are kept by ``MemoryValues``, or ``FileValues`` when ``DJFORMS_METRICS_DIR`` is set,
+    opened again in forked processes.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.values = None
+        self.pid = None
+
+    def counter(self, name: str, documentation: str, labels=()):
+        return self._register(Counter(self, name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labels, buckets))
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def increment(self, increments: list):
+        """
+        Adds the amounts to the values of the ``(sample key, amount)`` pairs, unless the metrics are disabled.
+        """
+        if not is_metrics_enabled():
+            return
+
+        with self.lock:
+            values = self._get_values()
+
+            for key, amount in increments:
+                values.increment(key, amount)
+
+    def _get_values(self):
+        directory = get_metrics_directory()
+
+        if self.pid != os.getpid() or getattr(self.values, "directory", None) != directory:
+            self.values = FileValues(directory) if directory else MemoryValues()
+            self.pid = os.getpid()
+
+        return self.values
+
+    def render(self):
+        with self.lock:
+            values = self._get_values().read_all()
+
+        lines = []
+
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            # in the order the samples were created, so the buckets of a histogram follow each other
+            lines.extend(f"{key} {_format_value(value)}" for key, value in values.items() if metric.owns(key))
+
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self.lock:
+            self.values = None
+            self.pid = None
+
+
+def _format_value(value: float):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _labels_text(names, values: dict, extra=()):
+    pairs = [(name, values[name]) for name in names] + list(extra)
+
+    if not pairs:
+        return ""
+
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, registry: MetricsRegistry, name: str, documentation: str, labels):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def owns(self, key: str):
+        return key.startswith(self.name) and key[len(self.name):len(self.name) + 1] in ("{", "")
+
+    def inc(self, amount: float = 1, **labels):
+        self.registry.increment([(self.name + _labels_text(self.labels, labels), amount)])
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, registry: MetricsRegistry, name: str, documentation: str, labels, buckets):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+
+    def owns(self, key: str):
+        return any(key.startswith(self.name + suffix) for suffix in ("_bucket{", "_sum", "_count"))
+
+    def observe(self, value: float, **labels):
+        """
+        Counts the value in every bucket with an upper bound above it (buckets are cumulative).
+        All the buckets are incremented (by 0 when below the value), so they are created together, in order.
+        """
+        labels_text = _labels_text(self.labels, labels)
+        self.registry.increment([
+            (self.name + "_bucket" + _labels_text(self.labels, labels, [("le", _format_bound(bound))]),
+             1 if value <= bound else 0)
+            for bound in self.buckets
+        ] + [(self.name + "_sum" + labels_text, value), (self.name + "_count" + labels_text, 1)])
+
+
+def _format_bound(bound: float):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.counter(
+    "djforms_requests_total", "Requests by view, method and status.", ["view", "method", "status"])
+REQUEST_DURATION = registry.histogram(
+    "djforms_request_duration_seconds", "Duration of the requests by view, streamed contents included.",
+    ["view", "method"])
+SUBMISSIONS = registry.counter(
+    "djforms_submissions_total", "Submitted responses by form and outcome (saved or failed).", ["form", "outcome"])
+FORM_UPDATE_DURATION = registry.histogram(
+    "djforms_form_update_duration_seconds", "Duration of the saves of edited forms by outcome.", ["outcome"])
+EXPORTED_ROWS = registry.counter(
+    "djforms_export_rows_total", "Responses read by the exports (downloads, export cache and jobs).")
+EXPORTED_BYTES = registry.counter(
+    "djforms_export_bytes_total",
+    "Bytes of the exports by source (download, cache or job) and format, gzip-compressed for the export cache.",
+    ["source", "format"])
+EXPORT_DURATION = registry.histogram(
+    "djforms_export_duration_seconds", "Duration of the exports by source and format.", ["source", "format"])
+
+
+def measure_export(chunks, source: str, export_format: str):
+    """
+    Counts the bytes of the streamed export chunks (str or bytes), and observes the duration of the download
+    once the stream is over.
+    """
+    start = time.perf_counter()
+    size = 0
+
+    try:
+        for chunk in chunks:
+            size += len(chunk.encode() if isinstance(chunk, str) else chunk)
+            yield chunk
+    finally:
+        EXPORTED_BYTES.inc(size, source=source, format=export_format)
+        EXPORT_DURATION.observe(time.perf_counter() - start, source=source, format=export_format)
+
+
+class MetricsMiddleware:
+    """
+    Counts the requests and observes their duration by view (the URL pattern name), until the end of the streamed
+    contents, when ``DJFORMS_METRICS`` is enabled.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_metrics_enabled():
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        response = self.get_response(request)
+
+        if response.streaming and not isinstance(response, FileResponse):
+            response.streaming_content = self._measure_stream(response.streaming_content, request, response, start)
+        else:
+            self._observe(request, response, start)
+
+        return response
+
+    def _measure_stream(self, content, request, response, start):
+        try:
+            yield from content
+        finally:
+            self._observe(request, response, start)
+
+    @staticmethod
+    def _observe(request, response, start):
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "unmatched"
+
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        REQUEST_DURATION.observe(time.perf_counter() - start, view=view, method=request.method)
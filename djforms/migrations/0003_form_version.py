@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-17 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djforms', '0002_initial_domain'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='settings',
+            options={'verbose_name_plural': 'settings'},
+        ),
+        migrations.AddField(
+            model_name='form',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
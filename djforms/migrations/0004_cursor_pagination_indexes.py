@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-17 20:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djforms', '0003_form_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='form',
+            index=models.Index(fields=['created_by', 'created_at', 'id'], name='form_created_by_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['form', 'created_at', 'id'], name='response_form_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='response_user_created_idx'),
+        ),
+    ]
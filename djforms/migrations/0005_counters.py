@@ -0,0 +1,62 @@
+# Generated by Django 4.2.30 on 2026-10-17 20:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def populate_counters(apps, schema_editor):
+    Response = apps.get_model("djforms", "Response")
+    Answer = apps.get_model("djforms", "Answer")
+    FormCounter = apps.get_model("djforms", "FormCounter")
+    QuestionCounter = apps.get_model("djforms", "QuestionCounter")
+    OptionCounter = apps.get_model("djforms", "OptionCounter")
+
+    FormCounter.objects.bulk_create([
+        FormCounter(form_id=form_id, responses=count)
+        for form_id, count in Response.objects.values("form_id").annotate(c=Count("id")).values_list("form_id", "c")
+    ])
+    QuestionCounter.objects.bulk_create([
+        QuestionCounter(question_id=question_id, answers=count)
+        for question_id, count in Answer.objects.values("question_id").annotate(c=Count("id")).values_list(
+            "question_id", "c"
+        )
+    ])
+    OptionCounter.objects.bulk_create([
+        OptionCounter(option_id=option_id, selections=count)
+        for option_id, count in Answer.choices.through.objects.values("option_id").annotate(c=Count("id")).values_list(
+            "option_id", "c"
+        )
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djforms', '0004_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormCounter',
+            fields=[
+                ('form', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counter', serialize=False, to='djforms.form')),
+                ('responses', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OptionCounter',
+            fields=[
+                ('option', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counter', serialize=False, to='djforms.option')),
+                ('selections', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionCounter',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counter', serialize=False, to='djforms.question')),
+                ('answers', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
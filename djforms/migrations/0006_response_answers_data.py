@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 20:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djforms', '0005_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='response',
+            name='answers_data',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-17 20:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djforms', '0007_export_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportCache',
+            fields=[
+                ('form', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='export_cache', serialize=False, to='djforms.form')),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('last_response_id', models.BigIntegerField(default=0)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('file_size', models.PositiveBigIntegerField(default=0)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 20:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djforms', '0008_export_cache'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(condition=models.Q(('user__isnull', True)), fields=['form', 'created_at', 'id'], name='response_form_anonymous_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-17 21:02
+
+from django.db import migrations
+
+SCHEMA = {
+    "sqlite": [
+        # the scope column holds the f<form ID>, q<question ID> and r<response ID> tokens,
+        # so searches are scoped and answers are deleted through the full-text index itself
+        "CREATE VIRTUAL TABLE djforms_answer_search USING fts5("
+        "text, scope, response_id UNINDEXED, question_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')",
+    ],
+    "postgresql": [
+        "CREATE TABLE djforms_answer_search ("
+        "id bigserial PRIMARY KEY, form_id bigint NOT NULL, question_id bigint NOT NULL, "
+        "response_id bigint NOT NULL, text text NOT NULL, "
+        "document tsvector GENERATED ALWAYS AS (to_tsvector('simple', text)) STORED)",
+        "CREATE INDEX djforms_answer_search_document_idx ON djforms_answer_search USING GIN (document)",
+        "CREATE INDEX djforms_answer_search_form_idx ON djforms_answer_search (form_id)",
+        "CREATE INDEX djforms_answer_search_response_idx ON djforms_answer_search (response_id)",
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    for statement in SCHEMA.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in SCHEMA:
+        schema_editor.execute("DROP TABLE djforms_answer_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djforms', '0009_response_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 21:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djforms', '0010_answer_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 21:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djforms', '0011_form_deleted_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportcache',
+            name='refresh_requested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -16,6 +16,14 @@ class Form(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(blank=True, null=True)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # set when the form is deleted, until its rows are purged in the background
+    deleted_at = models.DateTimeField(blank=True, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_by", "created_at", "id"], name="form_created_by_created_idx"),
+        ]
 
     def serialize(self):
         """
@@ -28,6 +36,7 @@ class Form(models.Model):
             "created_by": self.created_by.username,
             "created_at": self.created_at.strftime("%b %d %Y, %I:%M %p"),
             "updated_at": self.updated_at.strftime("%b %d %Y, %I:%M %p") if self.updated_at else None,
+            "version": self.version,
             "settings": self.settings.serialize(),
             "questions": [question.serialize() for question in self.questions.all()],
         }
@@ -133,6 +142,17 @@ class Response(models.Model):
     form = models.ForeignKey(Form, on_delete=models.CASCADE)
     user = models.ForeignKey(User, blank=True, null=True, on_delete=models.CASCADE)
     created_at = models.DateTimeField(default=timezone.now)
+    # compact storage of all the answers, used instead of the answer rows when not null
+    answers_data = models.JSONField(blank=True, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["form", "created_at", "id"], name="response_form_created_idx"),
+            models.Index(fields=["user", "created_at", "id"], name="response_user_created_idx"),
+            # anonymous responses of a form, for the respondent filter
+            models.Index(fields=["form", "created_at", "id"], condition=models.Q(user__isnull=True),
+                         name="response_form_anonymous_idx"),
+        ]
 
     def clean(self):
         super().clean()
@@ -147,7 +167,12 @@ class Response(models.Model):
         - In case of short and long text question type, the text is used as the answer value.
         - In case of radio question type, the chosen option ID is used as the answer value.
         - In case of checkbox question type, the list of the chosen option IDs is used as the answer value.
+
+        Reads the compact storage of the answers when the response has it.
         """
+        if self.answers_data is not None:
+            return self.unpack_answers(self.answers_data)
+
         answers = {}
 
         for answer in self.answers.all():
@@ -162,6 +187,22 @@ class Response(models.Model):
 
         return answers
 
+    @staticmethod
+    def pack_answers(answers: dict):
+        """
+        Converts a dict in the format of ``answers_as_dict`` to the compact storage format.
+        Keys are prefixed, as numeric keys would be taken as array indexes in JSON lookups.
+        """
+        return {Response.answer_key(question_id): value for question_id, value in answers.items()}
+
+    @staticmethod
+    def unpack_answers(answers_data: dict):
+        return {int(key[1:]): value for key, value in answers_data.items()}
+
+    @staticmethod
+    def answer_key(question_id):
+        return f"q{question_id}"
+
     def __str__(self):
         return f"{self.form.title} ({self.form.id}) - {self.id}"
 
@@ -197,3 +238,108 @@ class Answer(models.Model):
 
     def __str__(self):
         return f"Answer ({self.id}) for {self.question}"
+
+
+class FormCounter(models.Model):
+    """
+    Denormalized number of responses of a form, maintained when responses are saved or deleted
+    """
+    form = models.OneToOneField(Form, on_delete=models.CASCADE, primary_key=True, related_name="counter")
+    responses = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Counter for {self.form_id}"
+
+
+class QuestionCounter(models.Model):
+    """
+    Denormalized number of answers of a question, maintained when responses are saved or deleted
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name="counter")
+    answers = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Counter for {self.question_id}"
+
+
+class OptionCounter(models.Model):
+    """
+    Denormalized number of selections of an option, maintained when responses are saved or deleted
+    """
+    option = models.OneToOneField(Option, on_delete=models.CASCADE, primary_key=True, related_name="counter")
+    selections = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Counter for {self.option_id}"
+
+
+class ExportJob(models.Model):
+    """
+    Export of the responses of a form to a file, written by a background worker
+    """
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        RUNNING = "RUNNING", "Running"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+
+    id = models.BigAutoField(auto_created=True, primary_key=True, verbose_name="ID")
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name="export_jobs")
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    # form version, last response ID and number of responses the export is made of, to reuse jobs
+    fingerprint = models.CharField(max_length=64)
+    last_response_id = models.BigIntegerField(blank=True, null=True)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    file_name = models.CharField(max_length=256, blank=True)
+    file_size = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["form", "fingerprint"], name="export_job_fingerprint_idx"),
+            models.Index(fields=["status", "id"], name="export_job_status_idx"),
+        ]
+
+    def serialize(self):
+        """
+        Custom serialization (instead of Django’s serialization framework) for custom properties
+        """
+        return {
+            "id": self.id,
+            "form_id": self.form_id,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "progress": round(100 * self.processed / self.total, 1) if self.total else
+            (100.0 if self.status == ExportJob.Status.DONE else 0.0),
+            "file_size": self.file_size,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+    def __str__(self):
+        return f"Export ({self.id}) of {self.form_id}: {self.status}"
+
+
+class ExportCache(models.Model):
+    """
+    Materialized CSV export of the responses of a form, appended with the newer responses on download
+    """
+    form = models.OneToOneField(Form, on_delete=models.CASCADE, primary_key=True, related_name="export_cache")
+    version = models.PositiveIntegerField(default=0)
+    last_response_id = models.BigIntegerField(default=0)
+    rows = models.PositiveIntegerField(default=0)
+    file_size = models.PositiveBigIntegerField(default=0)
+    # set while a request brings the file up to date, so only one request writes it at a time
+    locked_at = models.DateTimeField(blank=True, null=True)
+    # set by downloads finding the file out of date, for the run_export_jobs command to bring it up to date
+    refresh_requested_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Export cache for {self.form_id}"
@@ -0,0 +1,98 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q, QuerySet
+
+
+def encode_cursor(created_at: datetime, pk: int):
+    """
+    Encodes the position of an object into an opaque URL-safe token.
+    """
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{pk}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    """
+    Decodes a token created by ``encode_cursor``, returning None for malformed tokens.
+    """
+    try:
+        decoded = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        created_at, pk = decoded.split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class CursorPage:
+    """
+    Page of a ``CursorPaginator``, usable in templates in place of Django's ``Page``.
+    """
+
+    paginator = None
+
+    def __init__(self, object_list: list, has_next: bool, has_previous: bool):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        if not self.has_next or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[-1].created_at, self.object_list[-1].pk)
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[0].created_at, self.object_list[0].pk)
+
+
+class CursorPaginator:
+    """
+    Keyset pagination over ``(created_at, id)``, newest first.
+
+    Unlike Django's ``Paginator``, it neither counts the objects nor uses OFFSET,
+    so any page costs the same as the first one, given an index on the filtered
+    columns followed by ``created_at`` and ``id``.
+    """
+
+    def __init__(self, object_list: QuerySet, per_page: int):
+        self.object_list = object_list
+        self.per_page = per_page
+
+    def get_page(self, after: str = None, before: str = None):
+        """
+        Returns the page of objects older than the ``after`` cursor, or newer than the ``before`` cursor.
+        Returns the first page when no valid cursor is given.
+        """
+        after = decode_cursor(after) if after else None
+        before = decode_cursor(before) if before else None
+
+        if before:  # falls back to the first page when the newer objects fit in it
+            created_at, pk = before
+            objects = self.object_list.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+            ).order_by("created_at", "pk")
+            object_list = list(objects[:self.per_page + 1])
+
+            if len(object_list) > self.per_page:
+                return CursorPage(object_list[:self.per_page][::-1], has_next=True, has_previous=True)
+
+        objects = self.object_list.order_by("-created_at", "-pk")
+
+        if after:
+            created_at, pk = after
+            objects = objects.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+        object_list = list(objects[:self.per_page + 1])
+        has_next = len(object_list) > self.per_page
+
+        return CursorPage(object_list[:self.per_page], has_next=has_next, has_previous=after is not None)
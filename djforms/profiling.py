@@ -0,0 +1,245 @@
+import cProfile
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse
+from django.utils import timezone
+
+# header or query parameter carrying a profiling token made by a staff user, see make_profile_token
+PROFILE_HEADER = "X-Djforms-Profile"
+PROFILE_PARAMETER = "djforms_profile"
+PROFILE_SALT = "djforms.profiling"
+PROFILE_TOKEN_MAX_AGE = 24 * 60 * 60
+
+SAMPLED = "sampled"
+REQUESTED = "requested"
+
+PROFILE_NAME_PATTERN = re.compile(r"^[\w-]+$")
+
+# held by the profiled request: a single profiler can be active in the process (with sys.monitoring on Python 3.12),
+# and the calls of concurrent threads would be mixed anyway
+profile_lock = threading.Lock()
+
+
+def is_profiling_enabled():
+    """
+    Whether ``ProfilingMiddleware`` may profile requests, set by ``DJFORMS_PROFILING``.
+    """
+    return getattr(settings, "DJFORMS_PROFILING", False)
+
+
+def get_profile_sample_rate():
+    """
+    One request out of how many is profiled, set by ``DJFORMS_PROFILE_SAMPLE_RATE`` (0 for none:
+    only the requests with a profiling token are profiled).
+    """
+    return getattr(settings, "DJFORMS_PROFILE_SAMPLE_RATE", 0)
+
+
+def get_profile_root():
+    """
+    Directory of the collected profiles, set by ``DJFORMS_PROFILE_ROOT``.
+    """
+    return str(getattr(settings, "DJFORMS_PROFILE_ROOT", os.path.join(settings.BASE_DIR, "profiles")))
+
+
+def get_profile_limit():
+    """
+    Number of profiles kept, the oldest ones being deleted, set by ``DJFORMS_PROFILE_LIMIT``.
+    """
+    return getattr(settings, "DJFORMS_PROFILE_LIMIT", 200)
+
+
+def make_profile_token(user):
+    """
+    Token of a staff user requesting profiles, sent in the ``X-Djforms-Profile`` header
+    or the ``djforms_profile`` query parameter, valid for a day.
+    """
+    return signing.dumps({"user": user.id}, salt=PROFILE_SALT)
+
+
+def _is_profile_requested(request):
+    token = request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAMETER)
+
+    if not token:
+        return False
+
+    try:
+        signing.loads(token, salt=PROFILE_SALT, max_age=PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+
+    return True
+
+
+def _get_profile_reason(request):
+    if _is_profile_requested(request):
+        return REQUESTED
+
+    rate = get_profile_sample_rate()
+
+    if rate and random.randrange(rate) == 0:
+        return SAMPLED
+
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    Profiles with cProfile the requests sampled (one out of ``DJFORMS_PROFILE_SAMPLE_RATE``) or requested with
+    a profiling token, streamed contents included, when ``DJFORMS_PROFILING`` is enabled. Profiles are stored in
+    ``DJFORMS_PROFILE_ROOT`` with the URL and timings, listed in the admin site.
+
+    A single request is profiled at a time in the process: the others are served without profiling meanwhile.
+
+    When disabled, a request only costs a setting lookup.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_profiling_enabled():
+            return self.get_response(request)
+
+        reason = _get_profile_reason(request)
+
+        # skipped while another request is profiled
+        if not reason or not profile_lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiling tool is active (e.g. a debugger or coverage)
+            profile_lock.release()
+            return self.get_response(request)
+
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            profiler.disable()
+            profile_lock.release()
+            raise
+
+        if response.streaming and not isinstance(response, FileResponse):
+            response.streaming_content = self._profile_stream(response.streaming_content, profiler, request,
+                                                              response, start, reason)
+        else:
+            self._finish(profiler, request, response, start, reason)
+
+        return response
+
+    def _profile_stream(self, content, profiler, request, response, start, reason):
+        try:
+            yield from content
+        finally:
+            self._finish(profiler, request, response, start, reason)
+
+    @staticmethod
+    def _finish(profiler, request, response, start, reason):
+        try:
+            profiler.disable()
+            save_profile(profiler, request, response, time.perf_counter() - start, reason)
+        finally:
+            profile_lock.release()
+
+
+def save_profile(profiler: cProfile.Profile, request, response, duration: float, reason: str):
+    """
+    Writes the stats of the profiler (loadable with ``pstats``) and their metadata, then deletes the oldest
+    profiles beyond ``DJFORMS_PROFILE_LIMIT``. Returns the name of the profile.
+    """
+    root = get_profile_root()
+    os.makedirs(root, exist_ok=True)
+
+    now = timezone.now()
+    name = f"{now:%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+    match = getattr(request, "resolver_match", None)
+
+    profiler.dump_stats(os.path.join(root, f"{name}.prof"))
+
+    with open(os.path.join(root, f"{name}.json"), "w") as file:
+        json.dump({
+            "name": name,
+            "created_at": now.isoformat(),
+            "reason": reason,
+            "method": request.method,
+            "url": request.path,  # without the query string, which may hold the profiling token
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "user": request.user.username if getattr(request, "user", None) and request.user.is_authenticated
+            else None,
+            "duration_ms": round(duration * 1000, 1),
+        }, file)
+
+    for profile in list_profiles()[get_profile_limit():]:
+        delete_profile(profile["name"])
+
+    return name
+
+
+def list_profiles():
+    """
+    Metadata of the collected profiles, newest first, with the size of their stats.
+    """
+    root = get_profile_root()
+
+    if not os.path.isdir(root):
+        return []
+
+    profiles = []
+
+    for file_name in os.listdir(root):
+        if not file_name.endswith(".json"):
+            continue
+
+        path = get_profile_path(file_name[:-len(".json")])
+
+        if not path:
+            continue
+
+        try:
+            with open(os.path.join(root, file_name)) as file:
+                profile = json.load(file)
+
+            profile["size"] = os.path.getsize(path)
+        except (OSError, ValueError):
+            continue  # being written or deleted
+
+        profiles.append(profile)
+
+    return sorted(profiles, key=lambda profile: profile["name"], reverse=True)
+
+
+def get_profile_path(name: str):
+    """
+    Path of the stats of the profile, or None if the name is not a profile name.
+    """
+    if not PROFILE_NAME_PATTERN.match(name):
+        return None
+
+    return os.path.join(get_profile_root(), f"{name}.prof")
+
+
+def delete_profile(name: str):
+    path = get_profile_path(name)
+
+    if not path:
+        return
+
+    for profile_path in [path, path[:-len(".prof")] + ".json"]:
+        try:
+            os.remove(profile_path)
+        except FileNotFoundError:
+            pass  # deleted by another request
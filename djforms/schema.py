@@ -0,0 +1,268 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from types import MappingProxyType
+from typing import NamedTuple, Mapping
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Form
+
+FORM_CACHE_SIZE = getattr(settings, "DJFORMS_FORM_CACHE_SIZE", 256)
+FORM_CACHE_TIMEOUT = getattr(settings, "DJFORMS_FORM_CACHE_TIMEOUT", 30)
+
+
+class CompiledOption(NamedTuple):
+    id: int
+    question_id: int
+    text: str
+    order: int
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "text": self.text,
+            "order": self.order,
+        }
+
+
+class CompiledQuestion(NamedTuple):
+    id: int
+    text: str
+    type: str
+    is_required: bool
+    order: int
+    options: tuple[CompiledOption, ...]
+    options_by_id: Mapping[int, CompiledOption]
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "text": self.text,
+            "type": self.type,
+            "is_required": self.is_required,
+            "order": self.order,
+            "options": [option.serialize() for option in self.options]
+        }
+
+
+class CompiledSettings(NamedTuple):
+    is_open: bool
+    authenticated_response: bool
+    multiple_response: bool
+
+    def serialize(self):
+        return {
+            "is_open": self.is_open,
+            "authenticated_response": self.authenticated_response,
+            "multiple_response": self.multiple_response,
+        }
+
+    @property
+    def is_another_response_allowed(self):
+        return (self.is_open and
+                (not self.authenticated_response or (self.authenticated_response and self.multiple_response)))
+
+
+class CompiledForm(NamedTuple):
+    """
+    Immutable snapshot of a form with its settings, questions and options.
+
+    Questions and options are sorted by their order, and indexed by ID in read-only mappings.
+    """
+    id: int
+    title: str
+    description: str
+    created_by_id: int
+    created_by_username: str
+    created_at: datetime
+    updated_at: datetime | None
+    version: int
+    settings: CompiledSettings
+    questions: tuple[CompiledQuestion, ...]
+    questions_by_id: Mapping[int, CompiledQuestion]
+    options_by_id: Mapping[int, CompiledOption]
+
+    def serialize(self):
+        """
+        Same output as ``Form.serialize``
+        """
+        return {
+            "id": self.id,
+            "title": self.title,
+            "description": self.description,
+            "created_by": self.created_by_username,
+            "created_at": self.created_at.strftime("%b %d %Y, %I:%M %p"),
+            "updated_at": self.updated_at.strftime("%b %d %Y, %I:%M %p") if self.updated_at else None,
+            "version": self.version,
+            "settings": self.settings.serialize(),
+            "questions": [question.serialize() for question in self.questions],
+        }
+
+    @property
+    def last_modified(self):
+        return self.updated_at or self.created_at
+
+
+def compile_form(form_id) -> CompiledForm | None:
+    """
+    Loads the form graph from the database (three queries) and compiles it.
+    """
+    form = Form.objects.select_related("created_by", "settings").prefetch_related(
+        "questions__options"
+    ).filter(pk=form_id, deleted_at__isnull=True).first()
+
+    if not form:
+        return None
+
+    questions = []
+    options_by_id = {}
+
+    for question in form.questions.all():
+        options = tuple(
+            CompiledOption(option.id, question.id, option.text, option.order) for option in question.options.all()
+        )
+        options_by_id.update((option.id, option) for option in options)
+
+        questions.append(CompiledQuestion(
+            question.id,
+            question.text,
+            question.type,
+            question.is_required,
+            question.order,
+            options,
+            MappingProxyType({option.id: option for option in options}),
+        ))
+
+    return CompiledForm(
+        form.id,
+        form.title,
+        form.description,
+        form.created_by_id,
+        form.created_by.username,
+        form.created_at,
+        form.updated_at,
+        form.version,
+        CompiledSettings(
+            form.settings.is_open,
+            form.settings.authenticated_response,
+            form.settings.multiple_response,
+        ),
+        tuple(questions),
+        MappingProxyType({question.id: question for question in questions}),
+        MappingProxyType(options_by_id),
+    )
+
+
+class CompiledFormCache:
+    """
+    Process-local LRU cache of compiled forms.
+
+    Entries are only served for the version they were compiled from (see ``get_compiled_form``), as the forms may be
+    changed by other processes. Entries also expire after ``timeout`` seconds, so unused forms are released.
+    """
+
+    def __init__(self, max_size: int, timeout: float):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, form_id: int, version: int) -> CompiledForm | None:
+        """
+        Returns the cached form if it was compiled from the given version.
+        """
+        with self._lock:
+            entry = self._entries.get(form_id)
+
+            if entry is None:
+                return None
+
+            compiled_form, expires_at = entry
+
+            if expires_at < time.monotonic() or compiled_form.version != version:
+                del self._entries[form_id]
+                return None
+
+            self._entries.move_to_end(form_id)
+            return compiled_form
+
+    def set(self, compiled_form: CompiledForm):
+        """
+        Caches the compiled form, unless a newer version of it is cached (compiled by another request meanwhile).
+        """
+        with self._lock:
+            entry = self._entries.get(compiled_form.id)
+
+            if entry is not None and entry[0].version > compiled_form.version:
+                return
+
+            self._entries[compiled_form.id] = (compiled_form, time.monotonic() + self.timeout)
+            self._entries.move_to_end(compiled_form.id)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, form_id: int):
+        with self._lock:
+            self._entries.pop(form_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+form_cache = CompiledFormCache(FORM_CACHE_SIZE, FORM_CACHE_TIMEOUT)
+
+
+def get_form_version(form_id) -> int | None:
+    """
+    Current version of the form (one single-column query), or None for IDs of forms that do not exist.
+    """
+    try:
+        form_id = int(form_id)
+    except (TypeError, ValueError):
+        return None
+
+    return Form.objects.filter(pk=form_id, deleted_at__isnull=True).values_list("version", flat=True).first()
+
+
+def get_compiled_form(form_id, version: int | None = None) -> CompiledForm | None:
+    """
+    Returns the compiled form from the cache if it is the current version (read with ``get_form_version``
+    unless given), compiling and caching it otherwise. Returns None for IDs of forms that do not exist.
+
+    Every form change increments ``Form.version``, so changes made by other processes are never served from the
+    cache, and neither are forms compiled before a change but cached after its invalidation.
+    """
+    try:
+        form_id = int(form_id)
+    except (TypeError, ValueError):
+        return None
+
+    if version is None:
+        version = get_form_version(form_id)
+
+        if version is None:
+            form_cache.invalidate(form_id)
+            return None
+
+    compiled_form = form_cache.get(form_id, version)
+
+    if compiled_form is None:
+        compiled_form = compile_form(form_id)
+
+        if compiled_form is not None:
+            form_cache.set(compiled_form)
+
+    return compiled_form
+
+
+def invalidate_compiled_form(form_id):
+    """
+    Drops the compiled form from the cache once the current transaction commits,
+    or right away when called outside a transaction, to release it sooner than the version check would.
+    """
+    transaction.on_commit(lambda: form_cache.invalidate(int(form_id)))
@@ -0,0 +1,181 @@
+import re
+
+from django.db import connection, NotSupportedError
+from django.utils.html import escape
+
+from .models import Response, Answer
+from .schema import CompiledForm
+
+SEARCH_TABLE = "djforms_answer_search"
+
+# answer matches read per search, grouped by response
+SEARCH_LIMIT = 100
+
+# delimiters of the matched terms in the snippets, replaced by <mark> tags once the snippets are escaped
+SNIPPET_START = "\x02"
+SNIPPET_END = "\x03"
+
+
+def is_search_supported():
+    """
+    Whether the database has the search index of the text answers (created by the migrations):
+    an FTS5 table on SQLite, a table with a GIN-indexed ``tsvector`` on PostgreSQL.
+    """
+    return connection.vendor in ("sqlite", "postgresql")
+
+
+def index_answers(form_id: int, response_id: int, texts: list):
+    """
+    Adds the text answers of a response to the search index, given as ``(question_id, text)`` tuples.
+    """
+    index_answer_rows([(form_id, response_id, question_id, text) for question_id, text in texts])
+
+
+def index_answer_rows(rows: list):
+    """
+    Inserts ``(form_id, response_id, question_id, text)`` rows in the search index, skipping the empty texts.
+    """
+    rows = [row for row in rows if row[3]]
+
+    if not rows or not is_search_supported():
+        return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (text, scope, response_id, question_id) VALUES (%s, %s, %s, %s)",
+                [(text, f"f{form_id} q{question_id} r{response_id}", response_id, question_id)
+                 for form_id, response_id, question_id, text in rows],
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (form_id, response_id, question_id, text) VALUES (%s, %s, %s, %s)",
+                rows,
+            )
+
+
+def unindex_responses(response_ids: list):
+    """
+    Removes the answers of the responses from the search index.
+    """
+    _unindex("r", "response_id", response_ids)
+
+
+def unindex_forms(form_ids: list):
+    """
+    Removes the answers of all the responses of the forms from the search index.
+    """
+    _unindex("f", "form_id", form_ids)
+
+
+def _unindex(prefix: str, column: str, ids: list):
+    if not ids or not is_search_supported():
+        return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN "
+                f"(SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s)",
+                [" OR ".join(f'scope:"{prefix}{int(object_id)}"' for object_id in ids)],
+            )
+        else:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE {column} = ANY(%s)", [list(ids)])
+
+
+def search_responses(form: CompiledForm, query: str, question_id: int = None, limit: int = SEARCH_LIMIT):
+    """
+    Searches the text answers of the form (of one of its questions when ``question_id`` is given)
+    containing all the words of the query.
+
+    Returns the matching responses, best match first, as dicts of the response ID, the rank of its best answer
+    (higher is better), and the snippets of its matching answers, HTML-escaped with the words in ``<mark>`` tags.
+    """
+    if not is_search_supported():
+        raise NotSupportedError("Searching answers requires SQLite or PostgreSQL")
+
+    words = re.findall(r"\w+", query)
+
+    if not words:
+        return []
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            scope = f'scope:"f{form.id}"' + (f' AND scope:"q{int(question_id)}"' if question_id else "")
+            terms = " ".join(f'"{word}"' for word in words)
+            cursor.execute(
+                f"SELECT response_id, question_id, -bm25({SEARCH_TABLE}, 1.0, 0.0), "
+                f"snippet({SEARCH_TABLE}, 0, char(2), char(3), '…', 16) "
+                f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s ORDER BY bm25({SEARCH_TABLE}, 1.0, 0.0) LIMIT %s",
+                [f"{scope} AND text:({terms})", limit],
+            )
+        else:
+            cursor.execute(
+                f"SELECT response_id, question_id, ts_rank(document, query), "
+                f"ts_headline('simple', text, query, 'StartSel=\x02, StopSel=\x03, MaxWords=24, MinWords=8') "
+                f"FROM {SEARCH_TABLE}, plainto_tsquery('simple', %s) query "
+                f"WHERE form_id = %s AND (%s::bigint IS NULL OR question_id = %s) AND document @@ query "
+                f"ORDER BY 3 DESC LIMIT %s",
+                [" ".join(words), form.id, question_id, question_id, limit],
+            )
+
+        rows = cursor.fetchall()
+
+    results = {}
+
+    for response_id, answer_question_id, rank, snippet in rows:
+        if answer_question_id not in form.questions_by_id:
+            continue  # answer of a deleted question
+
+        result = results.setdefault(response_id, {"response_id": response_id, "rank": rank, "snippets": []})
+        result["snippets"].append({"question_id": answer_question_id, "snippet": _mark(snippet)})
+
+    return list(results.values())
+
+
+def _mark(snippet: str):
+    return escape(snippet).replace(SNIPPET_START, "<mark>").replace(SNIPPET_END, "</mark>")
+
+
+def rebuild_search_index(form_ids: list = None, chunk_size: int = 500):
+    """
+    Rebuilds the search index from the answers of both storages, of the given forms or of all of them.
+    Returns the number of indexed answers.
+    """
+    if not is_search_supported():
+        raise NotSupportedError("Searching answers requires SQLite or PostgreSQL")
+
+    if form_ids is None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+    else:
+        unindex_forms(form_ids)
+
+    objects = Response.objects.order_by("id")
+
+    if form_ids is not None:
+        objects = objects.filter(form_id__in=form_ids)
+
+    indexed = 0
+    last_id = 0
+
+    while chunk := list(objects.filter(id__gt=last_id).values_list("id", "form_id", "answers_data")[:chunk_size]):
+        last_id = chunk[-1][0]
+        form_ids_by_response = {response_id: form_id for response_id, form_id, _ in chunk}
+
+        rows = [
+            (form_ids_by_response[response_id], response_id, question_id, text)
+            for response_id, question_id, text in Answer.objects.filter(
+                response_id__in=[response_id for response_id, _, answers_data in chunk if answers_data is None]
+            ).exclude(text="").values_list("response_id", "question_id", "text")
+        ]
+        rows += [
+            (form_id, response_id, question_id, value)
+            for response_id, form_id, answers_data in chunk if answers_data is not None
+            for question_id, value in Response.unpack_answers(answers_data).items() if isinstance(value, str)
+        ]
+
+        index_answer_rows(rows)
+        indexed += len([row for row in rows if row[3]])
+
+    return indexed
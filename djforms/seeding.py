@@ -0,0 +1,384 @@
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from multiprocessing import get_context
+from typing import NamedTuple
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import User, Form, Question, Option, Settings, Response, Answer, FormCounter, QuestionCounter, \
+    OptionCounter
+from .search import index_answer_rows
+from .storage import NORMALIZED, COMPACT, get_response_storage
+
+# responses generated and inserted per transaction
+SEED_BATCH_SIZE = 5000
+
+# share of the responses made by authenticated users, and of the optional questions left unanswered
+AUTHENTICATED_SHARE = 0.3
+SKIPPED_SHARE = 0.15
+
+VOCABULARY = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et dolore "
+    "magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo "
+    "consequat duis aute irure in reprehenderit voluptate velit esse cillum fugiat nulla pariatur excepteur sint "
+    "occaecat cupidatat non proident sunt culpa qui officia deserunt mollit anim id est laborum"
+).split()
+
+# words of the answers to short and long text questions
+TEXT_LENGTHS = {
+    Question.QuestionType.SHORT_TEXT: (1, 8),
+    Question.QuestionType.LONG_TEXT: (10, 80),
+}
+
+
+class SeedQuestion(NamedTuple):
+    id: int
+    type: str
+    is_required: bool
+    option_ids: tuple
+    option_weights: tuple  # skewed popularity of the options
+    option_cum_weights: tuple
+    key: str  # of the answer in the compact storage
+
+
+class SeedForm(NamedTuple):
+    id: int
+    questions: tuple
+
+
+class SeedBatch(NamedTuple):
+    # arguments of the generation of a batch, picklable for the worker processes
+    forms: tuple
+    form_weights: tuple
+    user_ids: tuple
+    first_response_id: int
+    first_answer_id: int
+    count: int
+    start: float  # creation timestamps of the first and last response of the batch
+    end: float
+    storage: str
+    seed: int
+
+
+def seed_djforms(users: int, forms: int, questions: int, options: int, responses: int, storage: str = None,
+                 batch_size: int = SEED_BATCH_SIZE, processes: int = 1, days: int = 365, search_index: bool = True,
+                 seed_value: int = 0, on_batch=None):
+    """
+    Generates users, forms cycling through all the question types, and responses with skewed distributions:
+    popular forms and options, optional questions sometimes skipped, texts of various lengths, creation dates
+    spread over the last ``days`` in the order of the IDs.
+
+    Responses are generated by batches, by a pool of ``processes`` when above 1, and written with multi-row
+    INSERT statements with their IDs allocated upfront, one transaction per batch. The counters are
+    computed along, and the text answers are added to the search index unless ``search_index`` is False.
+    ``on_batch`` is called with the number of responses and answers written after every batch.
+    Returns the numbers of responses and answers.
+    """
+    storage = storage or get_response_storage()
+
+    if storage not in [NORMALIZED, COMPACT]:
+        raise ValueError(f"Response storage {storage} not supported")
+
+    rnd = random.Random(seed_value)
+
+    with transaction.atomic():
+        user_ids = _create_users(users, rnd)
+        seed_forms = _create_forms(user_ids, forms, questions, options, rnd)
+
+    form_weights = _skewed_weights(len(seed_forms), rnd)
+    first_response_id = _next_id(Response)
+    first_answer_id = _next_id(Answer)
+    end = timezone.now().timestamp()
+    start = end - timedelta(days=days).total_seconds()
+    batches = []
+
+    for index, offset in enumerate(range(0, responses, batch_size)):
+        count = min(batch_size, responses - offset)
+        batches.append(SeedBatch(
+            tuple(seed_forms), form_weights, tuple(user_ids),
+            first_response_id + offset, first_answer_id + offset * questions, count,
+            start + (end - start) * offset / responses, start + (end - start) * (offset + count) / responses,
+            storage, seed_value * 1_000_003 + index,
+        ))
+
+    counts = (Counter(), Counter(), Counter())
+    written_responses = written_answers = 0
+
+    with _fast_writes():
+        for rows in _generate(batches, processes):
+            with transaction.atomic():
+                _insert_rows(rows, search_index)
+
+            for total, batch_counts in zip(counts, rows["counts"]):
+                total.update(batch_counts)
+
+            written_responses += len(rows["responses"])
+            written_answers += rows["answers_count"]
+
+            if on_batch:
+                on_batch(written_responses, written_answers)
+
+    with transaction.atomic():
+        _reset_sequences()
+        _write_counters(*counts)
+
+    return written_responses, written_answers
+
+
+def _create_users(count: int, rnd: random.Random):
+    """
+    Creates users with an unusable password (hashed once), returning their IDs.
+    """
+    password = make_password(None)
+    prefix = f"seed-{time.time_ns()}-{rnd.randrange(10 ** 6)}"
+
+    return [user.id for user in User.objects.bulk_create(
+        [User(username=f"{prefix}-{index}", password=password) for index in range(count)], batch_size=1000,
+    )]
+
+
+def _create_forms(user_ids: list, forms: int, questions: int, options: int, rnd: random.Random):
+    """
+    Creates forms of random users among the given ones, with all the question types in turn,
+    a share of optional questions, and the options of the radio and checkbox questions.
+    """
+    created_forms = Form.objects.bulk_create([
+        Form(title=f"Seeded form {index}", description="Synthetic form", created_by_id=rnd.choice(user_ids))
+        for index in range(1, forms + 1)
+    ], batch_size=1000)
+    Settings.objects.bulk_create([Settings(form=form) for form in created_forms], batch_size=1000)
+
+    question_types = Question.QuestionType.values
+    created_questions = Question.objects.bulk_create([
+        Question(form=form, text=f"Question {order}", type=question_types[(order - 1) % len(question_types)],
+                 is_required=rnd.random() < 0.8, order=order)
+        for form in created_forms
+        for order in range(1, questions + 1)
+    ], batch_size=1000)
+    created_options = Option.objects.bulk_create([
+        Option(question=question, text=f"Option {order}", order=order)
+        for question in created_questions
+        if question.type in [Question.QuestionType.RADIO, Question.QuestionType.CHECKBOX]
+        for order in range(1, options + 1)
+    ], batch_size=1000)
+
+    option_ids = {}
+    for option in created_options:
+        option_ids.setdefault(option.question_id, []).append(option.id)
+
+    questions_by_form = {}
+    for question in created_questions:
+        question_option_ids = tuple(option_ids.get(question.id, ()))
+        weights = _skewed_weights(len(question_option_ids), rnd)
+        questions_by_form.setdefault(question.form_id, []).append(SeedQuestion(
+            question.id, question.type, question.is_required, question_option_ids, weights,
+            tuple(itertools.accumulate(weights)), Response.answer_key(question.id),
+        ))
+
+    return [SeedForm(form.id, tuple(questions_by_form.get(form.id, ()))) for form in created_forms]
+
+
+def _skewed_weights(count: int, rnd: random.Random):
+    """
+    Zipf-like weights in random order, so a few items are much more popular than the others.
+    """
+    weights = [1 / rank for rank in range(1, count + 1)]
+    rnd.shuffle(weights)
+    return tuple(weights)
+
+
+def _next_id(model):
+    last = model.objects.order_by("-id").values_list("id", flat=True).first()
+    return (last or 0) + 1
+
+
+def _generate(batches: list, processes: int):
+    if processes <= 1 or len(batches) <= 1:
+        return map(generate_batch, batches)
+
+    executor = ProcessPoolExecutor(max_workers=processes, mp_context=get_context("spawn"), initializer=django.setup)
+    return _shutdown_after(executor, executor.map(generate_batch, batches))
+
+
+def _shutdown_after(executor: ProcessPoolExecutor, results):
+    with executor:
+        yield from results
+
+
+def generate_batch(batch: SeedBatch):
+    """
+    Generates the rows of a batch of responses, without database access: the rows of the responses, answers,
+    chosen options and search index, and the counts of responses by form, answers by question and selections
+    by option.
+    """
+    rnd = random.Random(batch.seed)
+    texts = {question_type: _text_pool(rnd, *lengths) for question_type, lengths in TEXT_LENGTHS.items()}
+    forms = rnd.choices(batch.forms, weights=batch.form_weights, k=batch.count)
+    step = (batch.end - batch.start) / batch.count
+    normalized = batch.storage == NORMALIZED
+
+    responses, answers, choices, search = [], [], [], []
+    # counted once per batch, much faster than a counter update per answer
+    answered_question_ids, chosen_option_ids = [], []
+    answer_id = batch.first_answer_id
+
+    for index, form in enumerate(forms):
+        response_id = batch.first_response_id + index
+        user_id = rnd.choice(batch.user_ids) if rnd.random() < AUTHENTICATED_SHARE else None
+        compact = {}
+
+        for question in form.questions:
+            if not question.is_required and rnd.random() < SKIPPED_SHARE:
+                continue
+
+            text = ""
+            option_ids = ()
+
+            if question.type == Question.QuestionType.RADIO:
+                option_ids = rnd.choices(question.option_ids, cum_weights=question.option_cum_weights)
+                compact[question.key] = option_ids[0]
+            elif question.type == Question.QuestionType.CHECKBOX:
+                option_ids = [option_id for option_id, weight in zip(question.option_ids, question.option_weights)
+                              if rnd.random() < weight * 0.6]
+                option_ids = option_ids or rnd.choices(question.option_ids, cum_weights=question.option_cum_weights)
+                compact[question.key] = option_ids
+            else:
+                text = rnd.choice(texts[question.type])
+                compact[question.key] = text
+                search.append((form.id, response_id, question.id, text))
+
+            answered_question_ids.append(question.id)
+            chosen_option_ids.extend(option_ids)
+
+            if normalized:
+                answers.append((answer_id, response_id, question.id, text))
+                choices.extend((answer_id, option_id) for option_id in option_ids)
+                answer_id += 1
+
+        responses.append((
+            response_id, form.id, user_id, batch.start + step * index, None if normalized else json.dumps(compact),
+        ))
+
+    return {
+        "responses": responses,
+        "answers": answers,
+        "choices": choices,
+        "search": search,
+        "answers_count": len(answered_question_ids),
+        "counts": (Counter(form.id for form in forms), Counter(answered_question_ids), Counter(chosen_option_ids)),
+    }
+
+
+def _text_pool(rnd: random.Random, minimum: int, maximum: int, size: int = 500):
+    """
+    Texts answered in a batch, drawn from a pool of random texts, which is much faster than a text per answer.
+    """
+    return [" ".join(rnd.choices(VOCABULARY, k=rnd.randint(minimum, maximum))).capitalize() for _ in range(size)]
+
+
+def _insert_rows(rows: dict, search_index: bool):
+    adapt = connection.ops.adapt_datetimefield_value
+    through = Answer.choices.through._meta
+
+    with connection.cursor() as cursor:
+        _insert_many(cursor, Response._meta.db_table, ["id", "form_id", "user_id", "created_at", "answers_data"], [
+            (response_id, form_id, user_id, adapt(_datetime(created_at)), answers_data)
+            for response_id, form_id, user_id, created_at, answers_data in rows["responses"]
+        ])
+        _insert_many(cursor, Answer._meta.db_table, ["id", "response_id", "question_id", "text"], rows["answers"])
+        _insert_many(cursor, through.db_table, [through.get_field("answer").column, through.get_field("option").column],
+                     rows["choices"])
+
+    if search_index:
+        index_answer_rows(rows["search"])
+
+
+def _insert_many(cursor, table: str, columns: list, rows: list):
+    """
+    Inserts the rows with multi-row INSERT statements, as many rows per statement as the parameters allow,
+    which is faster than ``executemany`` (a statement per row).
+    """
+    rows_per_statement = min(1000, (connection.features.max_query_params or 10 ** 6) // len(columns))
+    values = f"({', '.join(['%s'] * len(columns))})"
+    # cursor of the database backend, as the debug cursor (with DEBUG) quotes all the parameters for its log
+    database_cursor = cursor.cursor
+
+    for start in range(0, len(rows), rows_per_statement):
+        chunk = rows[start:start + rows_per_statement]
+        database_cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([values] * len(chunk))}",
+            [value for row in chunk for value in row],
+        )
+
+
+def _datetime(timestamp: float):
+    value = datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+    return value if settings.USE_TZ else timezone.make_naive(value)
+
+
+def _reset_sequences():
+    """
+    Moves the ID sequences past the IDs inserted explicitly (no statements on SQLite).
+    """
+    with connection.cursor() as cursor:
+        for statement in connection.ops.sequence_reset_sql(no_style(), [Response, Answer]):
+            cursor.execute(statement)
+
+
+def _write_counters(form_counts: Counter, question_counts: Counter, option_counts: Counter):
+    # the forms are new, so are their counters
+    FormCounter.objects.bulk_create(
+        [FormCounter(form_id=key, responses=count) for key, count in form_counts.items()], batch_size=1000,
+    )
+    QuestionCounter.objects.bulk_create(
+        [QuestionCounter(question_id=key, answers=count) for key, count in question_counts.items()], batch_size=1000,
+    )
+    OptionCounter.objects.bulk_create(
+        [OptionCounter(option_id=key, selections=count) for key, count in option_counts.items()], batch_size=1000,
+    )
+
+
+# SQLite settings of the connection while seeding, see _fast_writes
+SQLITE_SEED_PRAGMAS = {
+    "synchronous": "OFF",
+    "cache_size": "-262144",  # 256 MiB of pages, for the updates of the indexes
+    "foreign_keys": "OFF",  # the generated IDs are consistent, their checks at commit are skipped
+}
+
+
+@contextmanager
+def _fast_writes():
+    """
+    On SQLite, does not wait for the writes to reach the disk while seeding (the database may be corrupted
+    if the system crashes meanwhile, which is acceptable for a synthetic dataset), and caches more pages.
+    The settings of the connection are restored afterwards.
+    """
+    if connection.vendor != "sqlite" or connection.in_atomic_block:
+        yield
+        return
+
+    previous = {}
+
+    with connection.cursor() as cursor:
+        for pragma, value in SQLITE_SEED_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma}")
+            previous[pragma] = cursor.fetchone()[0]
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for pragma, value in previous.items():
+                cursor.execute(f"PRAGMA {pragma} = {int(value)}")
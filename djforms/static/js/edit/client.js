@@ -28,6 +28,23 @@ export default class Client {
     saveForm = form =>
         this._request(new URL(`/api/forms/${form.id}`, this.baseUrl), HTTPMethod.PUT, form);
 
+    /**
+     * @typedef FormPatchResponse
+     * @type {object}
+     * @property {number} version
+     * @property {[?object]} results
+     */
+
+    /**
+     * Sends only the changed questions and options, based on the given version of the form.
+     * @param {number} formId
+     * @param {number} version
+     * @param {[object]} operations
+     * @return {Promise<*>}
+     */
+    patchForm = (formId, version, operations) =>
+        this._request(new URL(`/api/forms/${formId}`, this.baseUrl), HTTPMethod.PATCH, {version, operations});
+
     /**
      * @param {number} formId
      * @param {SettingsResponse} settings
@@ -66,7 +83,11 @@ export default class Client {
 
         return fetch(url, init)
             .then(response => {
-                if (!response.ok) throw new Error(response.statusText)
+                if (!response.ok) {
+                    const error = new Error(response.statusText);
+                    error.status = response.status;
+                    throw error;
+                }
                 return response;
             });
     }
@@ -83,12 +83,27 @@ export default class Controller {
      * @callback submitFormFormHandlerCallback
      */
     handleSubmitFormForm = () => {
-        this.client.saveForm(this.model.form.toJSON())
-            .then(_ => {
+        const form = this.model.form;
+        const changes = form.diff();
+
+        if (changes.length === 0) {
+            this.view.notifySuccess('Form saved');
+            return;
+        }
+
+        this.client.patchForm(form.id, form.version, changes.map(change => change.operation))
+            .then(response => response.json())
+            .then(response => {
+                form.markSaved(changes, response);
                 this.view.notifySuccess('Form saved');
             }).catch(error => {
                 console.error(error);
-                this.view.notifyError('Error saving form');
+
+                if (error.status === 409) {
+                    this.view.notifyError('Form changed in the meantime, please reload the page');
+                } else {
+                    this.view.notifyError('Error saving form');
+                }
             });
     }
 
@@ -125,7 +140,10 @@ export default class Controller {
             const settings = this.model.settings.toJSON();
 
             this.client.saveSettings(formId, settings)
-                .then(_ => {
+                .then(response => response.json())
+                .then(response => {
+                    // the settings are part of the form version, the next patch must be based on the new one
+                    this.model.form.version = response.version;
                     this.view.notifySuccess('Settings saved');
                 });
         } catch (error) {
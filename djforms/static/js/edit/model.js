@@ -27,8 +27,9 @@ export class Form {
      * @param {string} title
      * @param {string} description
      * @param {[Question]} questions
+     * @param {number} version
      */
-    constructor(id, title, description, questions) {
+    constructor(id, title, description, questions, version) {
         /**
          * @type {number}
          */
@@ -44,6 +45,18 @@ export class Form {
          */
         this.description = description;
 
+        /**
+         * Version of the saved form the changes are based on.
+         * @type {number}
+         */
+        this.version = version;
+
+        /**
+         * Form as last saved, to compute the changes to send.
+         * @type {?FormResponse}
+         */
+        this.savedState = null;
+
         /**
          * @type {boolean}
          */
@@ -57,6 +70,8 @@ export class Form {
         questions.forEach(question => {
             this.appendQuestion(question);
         });
+
+        this.savedState = this.toJSON();
     }
 
     /**
@@ -68,6 +83,7 @@ export class Form {
      * @property {string} created_by
      * @property {string} created_at
      * @property {string} updated_at
+     * @property {number} version
      * @property {QuestionResponse} questions
      * @property {SettingsResponse} settings
      */
@@ -119,7 +135,7 @@ export class Form {
             );
         });
 
-        return new Form(obj.id, obj.title, obj.description, questions);
+        return new Form(obj.id, obj.title, obj.description, questions, obj.version);
     }
 
     /**
@@ -137,6 +153,83 @@ export class Form {
         return obj;
     }
 
+    /**
+     * @typedef Change
+     * @type {object}
+     * @property {object} operation sent to the API
+     * @property {Question|QuestionOption|null} target created by the operation
+     */
+
+    /**
+     * Lists the operations turning the form as last saved into the current one.
+     * @return {[Change]}
+     */
+    diff = () => {
+        const saved = this.savedState;
+        const current = this.toJSON();
+        const changes = [];
+
+        if (current.title !== saved.title || current.description !== saved.description) {
+            changes.push({
+                operation: {op: 'update_form', title: current.title, description: current.description},
+                target: null,
+            });
+        }
+
+        const savedQuestions = new Map(saved.questions.map(question => [question.id, question]));
+        const questionIds = new Set(current.questions.map(question => question.id));
+
+        saved.questions.filter(question => !questionIds.has(question.id)).forEach(question => {
+            changes.push({operation: {op: 'delete_question', id: question.id}, target: null});
+        });
+
+        this.questions.forEach((question, index) => {
+            const obj = current.questions[index];
+            const savedQuestion = savedQuestions.get(obj.id);
+
+            if (!savedQuestion) {
+                changes.push({operation: {op: 'add_question', question: obj}, target: question});
+                return;
+            }
+
+            const operation = diffFields({op: 'update_question', id: obj.id}, obj, savedQuestion,
+                ['text', 'type', 'is_required', 'order']);
+
+            if (operation) {
+                changes.push({operation: operation, target: null});
+            }
+
+            if (obj.options) {
+                changes.push(...question.diffOptions(obj.options, savedQuestion.options || []));
+            }
+        });
+
+        return changes;
+    }
+
+    /**
+     * Records the saved changes: IDs of the created questions and options, and new version.
+     * @param {[Change]} changes
+     * @param {FormPatchResponse} response
+     */
+    markSaved = (changes, response) => {
+        changes.forEach((change, index) => {
+            const result = response.results[index];
+
+            if (change.target instanceof Question) {
+                change.target.id = result.id;
+                change.target.options.forEach((option, optionIndex) => {
+                    option.id = result.option_ids[optionIndex] || null;
+                });
+            } else if (change.target instanceof QuestionOption) {
+                change.target.id = result.id;
+            }
+        });
+
+        this.version = response.version;
+        this.savedState = this.toJSON();
+    }
+
     /**
      * @param {number} questionOrder
      * @return {Question}
@@ -366,6 +459,44 @@ export class Question {
         return obj;
     }
 
+    /**
+     * Lists the operations turning the options as last saved into the current ones.
+     * Options unknown to the saved question are added, even with an ID (from before a change of type).
+     * @param {[QuestionOptionResponse]} options
+     * @param {[QuestionOptionResponse]} savedOptions
+     * @return {[Change]}
+     */
+    diffOptions = (options, savedOptions) => {
+        const savedOptionsById = new Map(savedOptions.map(option => [option.id, option]));
+        const optionIds = new Set(options.map(option => option.id));
+        const changes = [];
+
+        savedOptions.filter(option => !optionIds.has(option.id)).forEach(option => {
+            changes.push({operation: {op: 'delete_option', id: option.id}, target: null});
+        });
+
+        this.options.forEach((option, index) => {
+            const obj = options[index];
+            const savedOption = savedOptionsById.get(obj.id);
+
+            if (!savedOption) {
+                changes.push({
+                    operation: {op: 'add_option', question_id: this.id, option: {text: obj.text, order: obj.order}},
+                    target: option,
+                });
+                return;
+            }
+
+            const operation = diffFields({op: 'update_option', id: obj.id}, obj, savedOption, ['text', 'order']);
+
+            if (operation) {
+                changes.push({operation: operation, target: null});
+            }
+        });
+
+        return changes;
+    }
+
     /**
      * @param {number} order
      * @return {Question}
@@ -511,4 +642,26 @@ export class QuestionOption {
      * @return {boolean}
      */
     isValid = () => typeof this.text === 'string' && this.text.trim() !== '';
-}
\ No newline at end of file
+}
+
+/**
+ * Adds to the operation the fields whose values changed.
+ * @param {object} operation
+ * @param {object} obj
+ * @param {object} savedObj
+ * @param {[string]} fields
+ * @return {?object} operation, or null if nothing changed
+ */
+const diffFields = (operation, obj, savedObj, fields) => {
+    const changedFields = fields.filter(field => obj[field] !== savedObj[field]);
+
+    if (changedFields.length === 0) {
+        return null;
+    }
+
+    changedFields.forEach(field => {
+        operation[field] = obj[field];
+    });
+
+    return operation;
+}
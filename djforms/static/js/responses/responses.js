@@ -0,0 +1,159 @@
+const POLL_INTERVAL = 1000;
+
+document.addEventListener('DOMContentLoaded', function() {
+    const downloadButton = document.querySelector('#btn-download');
+
+    if (downloadButton) {
+        downloadButton.addEventListener('click', event => {
+            event.preventDefault();
+            requestExport(downloadButton);
+        });
+    }
+
+    const deleteButton = document.querySelector('#btn-delete-responses');
+    const selectAll = document.querySelector('#select-all-responses');
+    const checkboxes = [...document.querySelectorAll('.response-select')];
+
+    if (deleteButton) {
+        const updateDeleteButton = () => {
+            deleteButton.disabled = !checkboxes.some(checkbox => checkbox.checked);
+        };
+
+        checkboxes.forEach(checkbox => checkbox.addEventListener('change', updateDeleteButton));
+
+        selectAll.addEventListener('change', () => {
+            checkboxes.forEach(checkbox => checkbox.checked = selectAll.checked);
+            updateDeleteButton();
+        });
+
+        deleteButton.addEventListener('click', () => {
+            const responseIds = checkboxes.filter(checkbox => checkbox.checked)
+                .map(checkbox => parseInt(checkbox.value));
+
+            deleteResponses(deleteButton, responseIds);
+        });
+    }
+});
+
+/**
+ * Deletes the selected responses, then reloads the page.
+ * @param {HTMLElement} button
+ * @param {number[]} responseIds
+ */
+function deleteResponses(button, responseIds) {
+    if (!confirm(`Delete ${responseIds.length} response(s)? This cannot be undone.`)) {
+        return;
+    }
+
+    button.disabled = true;
+
+    const init = {
+        mode: 'same-origin',
+        method: 'DELETE',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': CSRF_TOKEN,
+        },
+        body: JSON.stringify({ids: responseIds}),
+    };
+
+    fetch(`/api/forms/${button.dataset.formId}/responses`, init)
+        .then(response => {
+            if (!response.ok) throw new Error(response.statusText)
+            window.location.reload();
+        })
+        .catch(error => {
+            console.error(error);
+            button.disabled = false;
+            notifyError('Error deleting responses');
+        });
+}
+
+/**
+ * Requests the export of the responses, reusing the export of unchanged responses,
+ * then follows its progress until the file can be downloaded.
+ * @param {HTMLElement} button
+ */
+function requestExport(button) {
+    const url = `/api/forms/${button.dataset.formId}/exports`;
+
+    if (button.classList.contains('disabled')) {
+        return;
+    }
+
+    button.classList.add('disabled');
+
+    fetchJob(url, 'POST')
+        .then(job => followExport(button, job))
+        .catch(error => {
+            console.error(error);
+            button.classList.remove('disabled');
+            notifyError('Error exporting responses');
+        });
+}
+
+/**
+ * @param {HTMLElement} button
+ * @param {object} job
+ */
+function followExport(button, job) {
+    const label = button.querySelector('.btn-label');
+
+    if (job.status === 'DONE') {
+        label.innerText = button.dataset.label;
+        button.classList.remove('disabled');
+        window.location.assign(job.url);
+    } else if (job.status === 'FAILED') {
+        throw new Error(job.error);
+    } else {
+        label.innerText = `Exporting... ${Math.floor(job.progress)}%`;
+
+        setTimeout(() => {
+            fetchJob(`/api/exports/${job.id}`, 'GET')
+                .then(job => followExport(button, job))
+                .catch(error => {
+                    console.error(error);
+                    label.innerText = button.dataset.label;
+                    button.classList.remove('disabled');
+                    notifyError('Error exporting responses');
+                });
+        }, POLL_INTERVAL);
+    }
+}
+
+/**
+ * @param {string} url
+ * @param {string} method
+ * @return {Promise<object>}
+ */
+function fetchJob(url, method) {
+    const init = {
+        mode: 'same-origin',
+        method: method,
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': CSRF_TOKEN,
+        },
+    };
+
+    return fetch(url, init)
+        .then(response => {
+            if (!response.ok) throw new Error(response.statusText)
+            return response.json();
+        })
+        .then(response => response.job);
+}
+
+function notifyError(message) {
+    const toastTemplate = document.querySelector('#toast-template');
+    const toastContainer = document.querySelector('#toast-container');
+
+    const toastElement = toastTemplate.content.cloneNode(true).querySelector('.toast');
+    toastElement.classList.add('text-bg-danger');
+    toastElement.querySelector('.toast-body').innerText = message;
+
+    toastContainer.appendChild(toastElement);
+
+    const toast = new bootstrap.Toast(toastElement);
+    toast.show();
+}
@@ -0,0 +1,268 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import QuerySet
+
+from .counters import record_response
+from .models import Question, Option, Response, Answer
+from .schema import CompiledForm
+from .search import index_answers
+
+NORMALIZED = "normalized"
+COMPACT = "compact"
+STORAGES = [NORMALIZED, COMPACT]
+
+
+def get_response_storage():
+    """
+    Storage of the answers of new responses, set by ``DJFORMS_RESPONSE_STORAGE``:
+
+    - ``normalized``: one answer row per question, plus one row per chosen option.
+    - ``compact``: all the answers in the ``answers_data`` JSON of the response row.
+    """
+    return getattr(settings, "DJFORMS_RESPONSE_STORAGE", NORMALIZED)
+
+
+def save_response(form: CompiledForm, response_model: Response, answers_data: dict, storage: str = None):
+    """
+    Validates all the answers in memory against the questions and options of the form,
+    then saves the response with its answers in a fixed number of statements, whatever the size of the form.
+    The text answers are added to the search index.
+    """
+    storage = storage or get_response_storage()
+
+    answers, chosen_option_ids = build_answers(form, response_model, answers_data)
+
+    if storage == COMPACT:
+        response_model.answers_data = Response.pack_answers(_answers_as_dict(form, answers, chosen_option_ids))
+        response_model.save()
+    elif storage == NORMALIZED:
+        response_model.save()
+
+        Answer.objects.bulk_create(answers)
+
+        Answer.choices.through.objects.bulk_create([
+            Answer.choices.through(answer_id=answer.id, option_id=option_id)
+            for answer, option_ids in zip(answers, chosen_option_ids)
+            for option_id in option_ids
+        ])
+    else:
+        raise ValueError(f"Response storage {storage} not supported")
+
+    record_response(
+        form.id,
+        [answer.question_id for answer in answers],
+        [option_id for option_ids in chosen_option_ids for option_id in option_ids],
+    )
+    index_answers(form.id, response_model.id, [(answer.question_id, answer.text) for answer in answers])
+
+
+def build_answers(form: CompiledForm, response_model: Response, answers_data: dict):
+    """
+    Builds unsaved answers and their chosen option IDs, applying the same rules as ``Answer.clean``.
+    """
+    text_validators = Answer._meta.get_field("text").validators
+    unanswered_questions = dict(form.questions_by_id)
+
+    answers = []
+    chosen_option_ids = []
+
+    for question_id, answer_data in answers_data.items():
+        question = unanswered_questions.pop(_parse_id(question_id), None)
+
+        if question is None:
+            raise ValidationError("Answered not found question", code="answered_question_not_found")
+
+        answer = Answer(response=response_model, question_id=question.id)
+        option_ids = []
+
+        if question.type in [Question.QuestionType.SHORT_TEXT, Question.QuestionType.LONG_TEXT]:
+            if not isinstance(answer_data, str):
+                raise ValidationError({"text": "Single text required for short or long text question"})
+
+            if answer_data:
+                for validator in text_validators:
+                    validator(answer_data)
+            elif question.is_required:
+                raise ValidationError({"text": "Text required for short or long text question"})
+
+            answer.text = answer_data
+        elif question.type in [Question.QuestionType.RADIO, Question.QuestionType.CHECKBOX]:
+            if question.type == Question.QuestionType.RADIO:
+                if not isinstance(answer_data, str):
+                    raise ValidationError({"choices": "Unique option required for radio question"})
+                answer_data = [answer_data]
+            elif isinstance(answer_data, str):
+                answer_data = [answer_data]
+
+            for option_id in dict.fromkeys(_parse_id(option_id) for option_id in answer_data):
+                if option_id not in question.options_by_id:
+                    raise ValidationError({"choices": "Option does not belong to the question"})
+                option_ids.append(option_id)
+
+            if question.is_required:
+                if question.type == Question.QuestionType.RADIO and len(option_ids) != 1:
+                    raise ValidationError({"choices": "Unique option required for radio question"})
+
+                if question.type == Question.QuestionType.CHECKBOX and len(option_ids) == 0:
+                    raise ValidationError({"choices": "At least one option required for checkbox question"})
+        else:
+            raise ValueError(f"Question type {question.type} not supported")
+
+        answers.append(answer)
+        chosen_option_ids.append(option_ids)
+
+    if any(question.is_required for question in unanswered_questions.values()):
+        raise ValidationError("Question required", code="question_required")
+
+    return answers, chosen_option_ids
+
+
+def _answers_as_dict(form: CompiledForm, answers: list, chosen_option_ids: list):
+    """
+    Converts built answers to the format of ``Response.answers_as_dict``.
+    """
+    result = {}
+
+    for answer, option_ids in zip(answers, chosen_option_ids):
+        question_type = form.questions_by_id[answer.question_id].type
+
+        if question_type == Question.QuestionType.RADIO:
+            if option_ids:
+                result[answer.question_id] = option_ids[0]
+        elif question_type == Question.QuestionType.CHECKBOX:
+            result[answer.question_id] = option_ids
+        else:
+            result[answer.question_id] = answer.text
+
+    return result
+
+
+def _parse_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_normalized_answers(response_ids: list):
+    """
+    Reads the answers of normalized responses with two queries,
+    returning, by response ID, dicts in the format of ``Response.answers_as_dict``.
+    """
+    answers = Answer.objects.filter(response_id__in=response_ids).values_list(
+        "id", "response_id", "question_id", "question__type", "text"
+    )
+    choices = Answer.choices.through.objects.filter(answer__response_id__in=response_ids).values_list(
+        "answer_id", "option_id"
+    )
+
+    chosen_options = {}
+    for answer_id, option_id in choices:
+        chosen_options.setdefault(answer_id, []).append(option_id)
+
+    result = {}
+
+    for answer_id, response_id, question_id, question_type, text in answers:
+        answers_dict = result.setdefault(response_id, {})
+
+        if question_type == Question.QuestionType.RADIO:
+            if answer_id in chosen_options:
+                answers_dict[question_id] = chosen_options[answer_id][0]
+        elif question_type == Question.QuestionType.CHECKBOX:
+            answers_dict[question_id] = chosen_options.get(answer_id, [])
+        else:
+            answers_dict[question_id] = text
+
+    return result
+
+
+def read_answer_index(form_response: Response):
+    """
+    Reads the answers of the response, with two queries at most, into an index for rendering:
+    question ID to the text, or to the frozenset of chosen option IDs for radio and checkbox questions.
+    """
+    if form_response.answers_data is not None:
+        answers = form_response.answers_as_dict()
+    else:
+        answers = read_normalized_answers([form_response.id]).get(form_response.id, {})
+
+    return {
+        question_id: value if isinstance(value, str) else frozenset(value if isinstance(value, list) else [value])
+        for question_id, value in answers.items()
+    }
+
+
+def convert_responses(objects: QuerySet, storage: str, chunk_size: int = 500):
+    """
+    Converts the answers of the responses to the given storage, in chunks of one transaction each.
+    Returns the number of converted responses.
+    """
+    objects = objects.order_by("id")
+
+    if storage == COMPACT:
+        objects = objects.filter(answers_data__isnull=True)
+    elif storage == NORMALIZED:
+        objects = objects.filter(answers_data__isnull=False)
+    else:
+        raise ValueError(f"Response storage {storage} not supported")
+
+    converted = 0
+    last_id = 0
+
+    while True:
+        chunk = list(objects.filter(id__gt=last_id).only("id", "answers_data")[:chunk_size])
+
+        if not chunk:
+            return converted
+
+        with transaction.atomic():
+            if storage == COMPACT:
+                _compact(chunk)
+            else:
+                _expand(chunk)
+
+        converted += len(chunk)
+        last_id = chunk[-1].id
+
+
+def _compact(responses: list):
+    answers = read_normalized_answers([response.id for response in responses])
+
+    for response in responses:
+        response.answers_data = Response.pack_answers(answers.get(response.id, {}))
+
+    Response.objects.bulk_update(responses, ["answers_data"])
+    Answer.objects.filter(response__in=responses).delete()
+
+
+def _expand(responses: list):
+    answers = []
+    chosen_option_ids = []
+
+    answers_by_response = {response.id: response.answers_as_dict() for response in responses}
+    question_ids = {question_id for answers_dict in answers_by_response.values() for question_id in answers_dict}
+    question_types = dict(Question.objects.filter(id__in=question_ids).values_list("id", "type"))
+    option_ids = set(Option.objects.filter(question_id__in=question_ids).values_list("id", flat=True))
+
+    for response in responses:
+        for question_id, value in answers_by_response[response.id].items():
+            question_type = question_types.get(question_id)  # None for deleted questions
+
+            if question_type in [Question.QuestionType.RADIO, Question.QuestionType.CHECKBOX]:
+                values = value if isinstance(value, list) else [value]
+                answers.append(Answer(response=response, question_id=question_id))
+                chosen_option_ids.append([option_id for option_id in values if option_id in option_ids])
+            elif question_type is not None and isinstance(value, str):
+                answers.append(Answer(response=response, question_id=question_id, text=value))
+                chosen_option_ids.append([])
+
+        response.answers_data = None
+
+    Answer.objects.bulk_create(answers)
+    Answer.choices.through.objects.bulk_create([
+        Answer.choices.through(answer_id=answer.id, option_id=option_id)
+        for answer, option_ids in zip(answers, chosen_option_ids)
+        for option_id in option_ids
+    ])
+    Response.objects.bulk_update(responses, ["answers_data"])
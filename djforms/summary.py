@@ -0,0 +1,206 @@
+import re
+from collections import Counter
+from itertools import chain
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum, Min, Max, QuerySet
+from django.db.models.fields.json import KT
+from django.db.models.functions import Length, Trunc
+
+from .counters import get_response_watermark
+from .models import Question, Response, Answer, QuestionCounter, OptionCounter
+from .schema import CompiledForm
+
+SUMMARY_CACHE_TIMEOUT = getattr(settings, "DJFORMS_SUMMARY_CACHE_TIMEOUT", 60 * 60 * 24)
+SUMMARY_BUCKETS = ["hour", "day"]
+SUMMARY_TOP_TERMS = 10
+
+TERM_PATTERN = re.compile(r"\w{3,}")
+STOP_WORDS = frozenset(["the", "and", "for", "are", "but", "not", "you", "all", "any", "can", "was", "our", "out",
+                        "has", "have", "this", "that", "with", "from", "they", "them", "there", "their", "what",
+                        "which", "when", "were", "will", "would", "been", "into", "than", "then", "very"])
+
+
+def get_summary(form: CompiledForm, bucket: str = "day"):
+    """
+    Returns the summary of the responses of the form, computed once per form version,
+    last response and number of responses, then cached.
+    """
+    watermark = get_response_watermark(form.id)
+
+    key = f"djforms:summary:{form.id}:{form.version}:{watermark[0]}:{watermark[1]}:{bucket}"
+    summary = cache.get(key)
+
+    if summary is None:
+        summary = summarize(form, bucket, watermark)
+        cache.set(key, summary, SUMMARY_CACHE_TIMEOUT)
+
+    return summary
+
+
+def summarize(form: CompiledForm, bucket: str = "day", watermark: tuple = None):
+    """
+    Computes the summary of the responses of the form with grouped aggregates.
+
+    - Radio and checkbox questions get the number of selections of each option, read from the counters.
+    - Short and long text questions get length statistics and the most frequent terms (see ``count_terms``).
+    - Responses are counted by hour or day.
+    """
+    if bucket not in SUMMARY_BUCKETS:
+        raise ValueError(f"Bucket {bucket} not supported")
+
+    question_ids = list(form.questions_by_id)
+    text_question_ids = [question.id for question in form.questions
+                         if question.type in [Question.QuestionType.SHORT_TEXT, Question.QuestionType.LONG_TEXT]]
+
+    answers = dict(QuestionCounter.objects.filter(question_id__in=question_ids).values_list("question_id", "answers"))
+    selections = dict(OptionCounter.objects.filter(option__question_id__in=question_ids).values_list(
+        "option_id", "selections"
+    ))
+    text_stats = _compute_text_stats(form, text_question_ids)
+    top_terms = count_terms(form, text_question_ids, watermark or get_response_watermark(form.id))
+
+    questions = []
+
+    for question in form.questions:
+        question_summary = {
+            "id": question.id,
+            "text": question.text,
+            "type": question.type,
+            "answers": answers.get(question.id, 0),
+        }
+
+        if question.id in text_question_ids:
+            stats = text_stats[question.id]
+            question_summary["length"] = {
+                "avg": round(stats["sum_length"] / stats["count"], 1) if stats["count"] else None,
+                "min": stats["min_length"],
+                "max": stats["max_length"],
+            }
+            question_summary["top_terms"] = [{"term": term, "count": count}
+                                             for term, count in top_terms[question.id].most_common(SUMMARY_TOP_TERMS)]
+        else:
+            question_summary["options"] = [{
+                "id": option.id,
+                "text": option.text,
+                "selections": selections.get(option.id, 0),
+                "percentage": round(100 * selections.get(option.id, 0) / answers[question.id], 1)
+                if answers.get(question.id) else 0,
+            } for option in question.options]
+
+        questions.append(question_summary)
+
+    timeline = list(Response.objects.filter(form_id=form.id).annotate(
+        bucket=Trunc("created_at", bucket)
+    ).values("bucket").annotate(count=Count("id")).order_by("bucket"))
+
+    return {
+        "responses": sum(row["count"] for row in timeline),
+        "bucket": bucket,
+        "timeline": [{"start": row["bucket"].isoformat(), "count": row["count"]} for row in timeline],
+        "questions": questions,
+    }
+
+
+def _compute_text_stats(form: CompiledForm, question_ids: list):
+    """
+    Computes the count, total, min and max length of the non-empty text answers of the questions,
+    combining a grouped aggregate over the answer rows with one aggregate per question over the compact answers.
+    """
+    stats = {question_id: {"count": 0, "sum_length": 0, "min_length": None, "max_length": None}
+             for question_id in question_ids}
+
+    rows = list(Answer.objects.filter(question_id__in=question_ids).exclude(text="").values("question_id").annotate(
+        count=Count("id"),
+        sum_length=Sum(Length("text")),
+        min_length=Min(Length("text")),
+        max_length=Max(Length("text")),
+    ))
+
+    compact_responses = Response.objects.filter(form_id=form.id, answers_data__isnull=False)
+
+    if compact_responses.exists():
+        for question_id in question_ids:
+            key = f"answers_data__{Response.answer_key(question_id)}"
+            length = Length(KT(key))
+
+            row = compact_responses.filter(**{f"{key}__isnull": False}).exclude(**{key: ""}).aggregate(
+                count=Count("id"), sum_length=Sum(length), min_length=Min(length), max_length=Max(length),
+            )
+            rows.append(dict(row, question_id=question_id))
+
+    for row in rows:
+        question_stats = stats[row["question_id"]]
+
+        if not row["count"]:
+            continue
+
+        question_stats["count"] += row["count"]
+        question_stats["sum_length"] += row["sum_length"]
+        question_stats["min_length"] = min(filter(None, [question_stats["min_length"], row["min_length"]]))
+        question_stats["max_length"] = max(filter(None, [question_stats["max_length"], row["max_length"]]))
+
+    return stats
+
+
+def count_terms(form: CompiledForm, question_ids: list, watermark: tuple):
+    """
+    Counts the terms of the text answers of the questions, up to the ``(last response ID, number of responses)``
+    watermark of ``get_response_watermark``.
+
+    The counts are cached per form version with their watermark, so only the texts of the responses added since
+    are read and counted. They are counted again from all the texts when responses were deleted since (the number
+    of responses is then below the cached one plus the added ones).
+    """
+    last_response_id, response_count = watermark
+    key = f"djforms:terms:{form.id}:{form.version}"
+    cached = cache.get(key)
+    responses = Response.objects.filter(form_id=form.id, id__lte=last_response_id)
+    terms = None
+
+    if cached and cached["last_response_id"] <= last_response_id:
+        added_responses = responses.filter(id__gt=cached["last_response_id"])
+
+        if cached["responses"] + added_responses.count() == response_count:
+            terms = _update_terms(cached["terms"], question_ids, added_responses)
+
+    if terms is None:
+        terms = _update_terms({}, question_ids, responses)
+
+    cache.set(key, {"last_response_id": last_response_id, "responses": response_count, "terms": terms},
+              SUMMARY_CACHE_TIMEOUT)
+    return terms
+
+
+def _update_terms(terms: dict, question_ids: list, responses: QuerySet):
+    """
+    Adds the terms of the text answers of the responses to the counters of the questions,
+    streaming only the texts from the database.
+    """
+    for question_id in question_ids:
+        terms.setdefault(question_id, Counter())
+
+    texts = Answer.objects.filter(response__in=responses, question_id__in=question_ids).exclude(
+        text="").values_list("question_id", "text")
+    compact_responses = responses.filter(answers_data__isnull=False)
+
+    if compact_responses.exists():
+        texts = chain(texts.iterator(chunk_size=2000), *[
+            _iter_compact_texts(compact_responses, question_id) for question_id in question_ids
+        ])
+    else:
+        texts = texts.iterator(chunk_size=2000)
+
+    for question_id, text in texts:
+        terms[question_id].update(term for term in TERM_PATTERN.findall(text.lower()) if term not in STOP_WORDS)
+
+    return terms
+
+
+def _iter_compact_texts(compact_responses: QuerySet, question_id: int):
+    texts = compact_responses.values_list(KT(f"answers_data__{Response.answer_key(question_id)}"), flat=True)
+
+    for text in texts.iterator(chunk_size=2000):
+        if text:
+            yield question_id, text
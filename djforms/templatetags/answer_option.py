@@ -5,9 +5,9 @@ register = template.Library()
 
 @register.filter(name="answer_option")
 def answer_option(question_answer, option):
-    if isinstance(question_answer, list):
-        if option.id in question_answer:
-            return option.id
-    elif question_answer == option.id:
+    """
+    Chosen option ID if the option is in the frozenset of chosen option IDs of the answer, otherwise None.
+    """
+    if isinstance(question_answer, frozenset) and option.id in question_answer:
         return option.id
     return None
@@ -5,7 +5,9 @@ register = template.Library()
 
 @register.filter(name="answer_question")
 def answer_question(answers, question):
+    """
+    Answer of the question in the answer index of the response: text, or frozenset of chosen option IDs.
+    """
     if answers:
-        if question.id in answers:
-            return answers[question.id]
+        return answers.get(question.id)
     return None
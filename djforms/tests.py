@@ -1,3 +1,1562 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .benchmark import VIEW_BENCHMARKS, compare_benchmark_results
+from .compression import accepted_encodings, get_content_encodings
+from .counters import count_actual, count_stored, record_response, get_response_watermark
+from .deletion import delete_responses
+from .export import ExportPlan
+from .export_cache import get_export_cache_path, refresh_export_cache
+from .export_formats import stream_csv
+from .export_shards import split_id_ranges, write_csv_shards
+from .instrumentation import QueryBudgetExceeded, fingerprint
+from .metrics import DEFAULT_BUCKETS, EXPOSITION_CONTENT_TYPE, SUBMISSIONS, registry
+from .models import User, Form, Question, Option, Settings, Response, Answer, FormCounter, QuestionCounter, \
+    OptionCounter, ExportCache
+from .profiling import PROFILE_HEADER, PROFILE_PARAMETER, make_profile_token, list_profiles, profile_lock
+from .schema import form_cache, get_compiled_form
+from .search import search_responses
+from .storage import save_response
+from .summary import count_terms
+from . import views
+
+
+def create_form(user, question_types=tuple(Question.QuestionType.values)):
+    form = Form.objects.create(title="Survey", created_by=user)
+    Settings.objects.create(form=form)
+
+    for order, question_type in enumerate(question_types, start=1):
+        question = Question.objects.create(form=form, text=f"Question {order}", type=question_type, order=order)
+
+        if question_type in [Question.QuestionType.RADIO, Question.QuestionType.CHECKBOX]:
+            for option_order in range(1, 4):
+                Option.objects.create(question=question, text=f"Option {option_order}", order=option_order)
+
+    return form
+
+
+def create_response(form, user=None):
+    form_response = Response.objects.create(form=form, user=user)
+
+    for question in form.questions.all():
+        answer = Answer.objects.create(response=form_response, question=question)
+
+        if question.type in [Question.QuestionType.SHORT_TEXT, Question.QuestionType.LONG_TEXT]:
+            answer.text = f"Answer to {question.text}"
+            answer.save()
+        elif question.type == Question.QuestionType.RADIO:
+            answer.choices.add(question.options.all()[0])
+        else:
+            answer.choices.add(*question.options.all()[0:2])
+
+    return form_response
+
+
+
+class DjformsTestCase(TestCase):
+    """
+    Starts every test with an empty cache of compiled forms. The ``owner`` user and their ``form``
+    (of ``question_types``, or no form when None) are created once per class, the owner being logged in
+    unless ``login`` is False.
+    """
+    question_types = tuple(Question.QuestionType.values)
+    login = True
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "password")
+        cls.form = create_form(cls.owner, cls.question_types) if cls.question_types is not None else None
+
+    def setUp(self):
+        form_cache.clear()
+
+        if self.login:
+            self.client.force_login(self.owner)
+
+    def override_export_settings(self, **kwargs):
+        """
+        Overrides the export settings for the test, with a temporary export root.
+        """
+        export_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_root)
+        settings_override = override_settings(DJFORMS_EXPORT_ROOT=export_root, **kwargs)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class DownloadTestCase(DjformsTestCase):
+    def setUp(self):
+        super().setUp()
+        get_compiled_form(self.form.id)
+        self.override_export_settings(DJFORMS_EXPORT_WORKER="command")
+
+    def _refresh_cache(self):
+        call_command("run_export_jobs", once=True, stdout=io.StringIO())
+
+    def _download(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("download", args=[self.form.id]))
+            content = b"".join(response.streaming_content).decode()
+
+        return list(csv.reader(io.StringIO(content))), len(context.captured_queries)
+
+    def test_download_rows(self):
+        create_response(self.form)
+        create_response(self.form, user=self.owner)
+
+        rows, _ = self._download()
+
+        self.assertEqual(rows[0], ["User", "Email", "Timestamp", "Question 1", "Question 2", "Question 3",
+                                   "Question 4"])
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1][0:2], ["Anonymous", ""])
+        self.assertEqual(rows[2][0:2], ["owner", "owner@example.com"])
+        self.assertEqual(rows[2][3:], ["Answer to Question 1", "Answer to Question 2", "Option 1",
+                                       "Option 1; Option 2"])
+
+    def test_download_lists_oldest_responses_first(self):
+        for _ in range(3):
+            self._create_counted_response()
+
+        rows, _ = self._download()
+        self._refresh_cache()
+
+        self.assertEqual([row[2] for row in rows[1:]], [
+            str(created_at) for created_at in Response.objects.order_by("id").values_list("created_at", flat=True)
+        ])
+        self.assertEqual(self._download()[0], rows)
+
+    def test_download_query_count_is_independent_of_responses(self):
+        create_response(self.form)
+        self._download()
+
+        create_response(self.form)
+        _, few_responses_queries = self._download()
+
+        for _ in range(20):
+            create_response(self.form)
+        rows, many_responses_queries = self._download()
+
+        self.assertEqual(len(rows), 23)
+        self.assertEqual(few_responses_queries, many_responses_queries)
+
+    @override_settings(DJFORMS_EXPORT_CACHE=False)
+    def test_download_without_cache(self):
+        create_response(self.form)
+
+        rows, _ = self._download()
+
+        self.assertEqual(len(rows), 2)
+
+    def _download_format(self, export_format):
+        response = self.client.get(reverse("download", args=[self.form.id]), {"format": export_format})
+        return response, b"".join(response.streaming_content)
+
+    def test_download_formats(self):
+        create_response(self.form)
+        create_response(self.form, user=self.owner)
+        question_ids = [str(question.id) for question in self.form.questions.all()]
+
+        _, content = self._download_format("ndjson")
+        records = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([record["user"] for record in records], ["Anonymous", "owner"])
+        self.assertEqual(records[1]["answers"][question_ids[3]], ["Option 1", "Option 2"])
+
+        response, content = self._download_format("xlsx")
+        self.assertTrue(response.headers["Content-Disposition"].endswith('.xlsx"'))
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            sheet = archive.read("xl/worksheets/sheet1.xml").decode()
+        self.assertIn('<c r="G3" t="inlineStr"><is><t xml:space="preserve">Option 1; Option 2</t></is></c>', sheet)
+
+        response, content = self._download_format("columns")
+        if response.headers["Content-Type"] == "application/x-ndjson":
+            schema, chunk = [json.loads(line) for line in content.decode().splitlines()]
+            columns = chunk["columns"]
+            self.assertEqual(schema["schema"][6], {"name": "Question 4", "type": "list<string>"})
+        else:
+            import pyarrow.ipc
+            columns = pyarrow.ipc.open_stream(content).read_all().columns
+            columns = [column.to_pylist() for column in columns]
+        self.assertEqual(columns[0], ["Anonymous", "owner"])
+        self.assertEqual(columns[6][1], ["Option 1", "Option 2"])
+
+        self.assertEqual(self.client.get(reverse("download", args=[self.form.id]), {"format": "pdf"}).status_code,
+                         400)
+
+    def _create_counted_response(self, user=None):
+        form_response = create_response(self.form, user=user)
+        record_response(self.form.id, [], [])
+        return form_response
+
+    def test_cache_miss_streams_and_requests_refresh(self):
+        self._create_counted_response()
+
+        response, content = self._download_compressed("gzip")
+
+        self.assertNotIn("Content-Length", response.headers)
+        self.assertFalse(os.path.exists(get_export_cache_path(self.form.id)))
+        self.assertIsNotNone(ExportCache.objects.get(form=self.form).refresh_requested_at)
+
+        self._refresh_cache()
+        cached_response, cached_content = self._download_compressed("gzip")
+
+        self.assertIsNone(ExportCache.objects.get(form=self.form).refresh_requested_at)
+        self.assertEqual(cached_response.headers["Content-Length"], str(len(cached_content)))
+        self.assertEqual(gzip.decompress(cached_content), gzip.decompress(content))
+
+    def test_cache_is_appended_then_rebuilt(self):
+        first_response = self._create_counted_response()
+        self._download()
+        self._refresh_cache()
+
+        self._create_counted_response(user=self.owner)
+        self._download()
+        self._refresh_cache()
+        rows, _ = self._download()
+        export_cache = ExportCache.objects.get(form=self.form)
+
+        self.assertEqual([row[0] for row in rows[1:]], ["Anonymous", "owner"])
+        self.assertEqual((export_cache.rows, export_cache.file_size),
+                         (2, os.path.getsize(get_export_cache_path(self.form.id))))
+
+        delete_responses([first_response.id])
+        rows, _ = self._download()
+        self._refresh_cache()
+
+        self.assertEqual([row[0] for row in rows[1:]], ["owner"])
+        self.assertEqual(self._download()[0], rows)
+        self.assertEqual(ExportCache.objects.get(form=self.form).rows, 1)
+
+        Question.objects.filter(form=self.form, order=1).update(text="Renamed")
+        Form.objects.filter(pk=self.form.id).update(version=2)
+        rows, _ = self._download()
+        self._refresh_cache()
+
+        self.assertEqual(rows[0][3], "Renamed")
+        self.assertEqual(self._download()[0], rows)
+        self.assertEqual(ExportCache.objects.get(form=self.form).version, 2)
+        self.assertIsNone(ExportCache.objects.get(form=self.form).locked_at)
+
+    def test_cache_detects_deletions_bypassing_counters(self):
+        first_response = self._create_counted_response()
+        self._create_counted_response(user=self.owner)
+        self._download()
+        self._refresh_cache()
+
+        # as deleted from the admin: the counters are not decremented
+        Response.objects.filter(pk=first_response.id).delete()
+        rows, _ = self._download()
+        self._refresh_cache()
+
+        self.assertEqual([row[0] for row in rows[1:]], ["owner"])
+        self.assertEqual(self._download()[0], rows)
+        self.assertEqual(ExportCache.objects.get(form=self.form).rows, 1)
+        self.assertIsNone(ExportCache.objects.get(form=self.form).refresh_requested_at)
+
+    def _download_compressed(self, accept_encoding):
+        response = self.client.get(reverse("download", args=[self.form.id]), HTTP_ACCEPT_ENCODING=accept_encoding)
+        return response, b"".join(response.streaming_content)
+
+    def test_cached_download_is_served_compressed(self):
+        self._create_counted_response()
+        self._download_compressed("gzip")
+        self._refresh_cache()
+
+        response, content = self._download_compressed("gzip, deflate")
+        plain_response, plain_content = self._download_compressed("identity")
+
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertEqual(response.headers["Content-Length"], str(os.path.getsize(get_export_cache_path(self.form.id))))
+        self.assertNotIn("Content-Encoding", plain_response.headers)
+        self.assertEqual(gzip.decompress(content), plain_content)
+        self.assertEqual(len(list(csv.reader(io.StringIO(plain_content.decode())))), 2)
+
+    @override_settings(DJFORMS_EXPORT_CACHE=False)
+    def test_streamed_download_is_compressed(self):
+        create_response(self.form)
+
+        response, content = self._download_compressed("gzip;q=0.5, br")
+        _, plain_content = self._download_compressed("")
+
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(content), plain_content)
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings(""), [])
+        self.assertEqual(accepted_encodings("gzip;q=0, identity"), [])
+        self.assertEqual(accepted_encodings("br, GZIP;q=0.8"), ["gzip"])
+        self.assertEqual(accepted_encodings("*"), get_content_encodings())
+
+
+class RespondTestCase(DjformsTestCase):
+    question_types = None
+    login = False
+
+    def _answers_data(self, form):
+        data = {}
+
+        for question in form.questions.all():
+            options = list(question.options.all())
+
+            if question.type in [Question.QuestionType.SHORT_TEXT, Question.QuestionType.LONG_TEXT]:
+                data[f"answers[{question.id}]"] = f"Answer to {question.text}"
+            elif question.type == Question.QuestionType.RADIO:
+                data[f"answers[{question.id}]"] = str(options[1].id)
+            else:
+                data[f"answers[{question.id}][]"] = [str(options[0].id), str(options[2].id)]
+
+        return data
+
+    def _respond(self, form, data):
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(reverse("respond", args=[form.id]), data)
+
+        return len(context.captured_queries)
+
+    def test_respond_saves_answers(self):
+        form = create_form(self.owner)
+
+        self._respond(form, self._answers_data(form))
+
+        form_response = Response.objects.get(form=form)
+        answers = form_response.answers_as_dict()
+        questions = list(form.questions.all())
+
+        self.assertEqual(answers[questions[0].id], "Answer to Question 1")
+        self.assertEqual(answers[questions[2].id], questions[2].options.all()[1].id)
+        self.assertEqual(sorted(answers[questions[3].id]),
+                         [questions[3].options.all()[0].id, questions[3].options.all()[2].id])
+
+    def test_respond_rejects_invalid_answers(self):
+        form = create_form(self.owner)
+        other_form = create_form(self.owner)
+
+        missing_required = self._answers_data(form)
+        missing_required.popitem()
+        foreign_option = self._answers_data(form)
+        foreign_option[f"answers[{form.questions.all()[2].id}]"] = str(Option.objects.filter(
+            question__form=other_form).first().id)
+
+        for data in [missing_required, foreign_option]:
+            self._respond(form, data)
+
+        self.assertFalse(Response.objects.filter(form=form).exists())
+        self.assertFalse(Answer.objects.exists())
+
+    def test_respond_query_count_is_independent_of_questions(self):
+        small_form = create_form(self.owner)
+        large_form = create_form(self.owner, question_types=list(Question.QuestionType.values) * 10)
+
+        small_form_queries = self._respond(small_form, self._answers_data(small_form))
+        large_form_queries = self._respond(large_form, self._answers_data(large_form))
+
+        self.assertEqual(Answer.objects.filter(response__form=large_form).count(), 40)
+        self.assertEqual(small_form_queries, large_form_queries)
+
+
+class ResponseDetailTestCase(DjformsTestCase):
+    question_types = None
+
+    def _render(self, form):
+        form_response = create_response(form, user=self.owner)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("response", args=[form_response.id]))
+
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_answers_are_rendered(self):
+        response, _ = self._render(create_form(self.owner))
+
+        self.assertContains(response, 'value="Answer to Question 1"')
+        self.assertContains(response, "Answer to Question 2</textarea>")
+        self.assertEqual(response.content.decode().count("checked"), 3)
+
+    def test_query_count_is_independent_of_questions(self):
+        _, small_form_queries = self._render(create_form(self.owner))
+        _, large_form_queries = self._render(create_form(self.owner, list(Question.QuestionType.values) * 50))
+
+        self.assertEqual(small_form_queries, large_form_queries)
+
+
+class CompiledFormCacheTestCase(DjformsTestCase):
+    login = False
+
+    def _schema_queries(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data, content_type="application/json")
+
+        tables = ["djforms_form", "djforms_settings", "djforms_question", "djforms_option"]
+        schema_queries = [query for query in context.captured_queries
+                          if query["sql"].startswith("SELECT") and any(f'FROM "{table}"' in query["sql"]
+                                                                       for table in tables)]
+        return response, schema_queries
+
+    def test_cached_form_is_served_with_a_version_query(self):
+        respond_url = reverse("respond", args=[self.form.id])
+
+        _, first_queries = self._schema_queries("get", respond_url)
+        response, second_queries = self._schema_queries("get", respond_url)
+
+        self.assertEqual(len(first_queries), 4)
+        self.assertEqual(len(second_queries), 1)
+        self.assertIn('SELECT "djforms_form"."version", "djforms_form"."created_at", "djforms_form"."updated_at" '
+                      'FROM "djforms_form"', second_queries[0]["sql"])
+        self.assertContains(response, "Question 4")
+        self.assertContains(response, "Option 3")
+
+    def test_form_changed_by_another_process_is_not_served_from_cache(self):
+        respond_url = reverse("respond", args=[self.form.id])
+        self.assertContains(self.client.get(respond_url), "Question 1")
+
+        # as saved by another process: the cache of this one is not invalidated
+        self.form.questions.filter(text="Question 1").update(text="Renamed question")
+        Form.objects.filter(pk=self.form.id).update(version=F("version") + 1)
+
+        response = self.client.get(respond_url)
+        self.assertContains(response, "Renamed question")
+        self.assertNotContains(response, "Question 1")
+
+    def test_stale_compiled_form_is_not_cached_over_a_newer_one(self):
+        stale = get_compiled_form(self.form.id)
+        Form.objects.filter(pk=self.form.id).update(version=F("version") + 1)
+        current = get_compiled_form(self.form.id)
+
+        # compiled before the change, cached after its invalidation
+        form_cache.set(stale)
+
+        self.assertIs(get_compiled_form(self.form.id), current)
+        form_cache.invalidate(self.form.id)
+        form_cache.set(stale)
+        self.assertEqual(get_compiled_form(self.form.id).version, stale.version + 1)
+
+    def test_api_serialization_matches_model(self):
+        self.client.force_login(self.owner)
+
+        response = self.client.get(reverse("api_forms", args=[self.form.id]))
+
+        self.assertEqual(response.json()["form"], Form.objects.get(pk=self.form.id).serialize())
+
+    def test_settings_update_invalidates_cached_form(self):
+        self.client.force_login(self.owner)
+        respond_url = reverse("respond", args=[self.form.id])
+
+        self.assertContains(self.client.get(respond_url), "Question 1")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(reverse("api_form_settings", args=[self.form.id]), {
+                "is_open": False, "authenticated_response": False, "multiple_response": True,
+            }, content_type="application/json")
+
+        self.assertContains(self.client.get(respond_url), "Closed form")
+
+
+class ConditionalGetTestCase(DjformsTestCase):
+    def test_api_forms_not_modified(self):
+        url = reverse("api_forms", args=[self.form.id])
+        etag = self.client.get(url).headers["ETag"]
+        form_cache.clear()
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(any('"djforms_question"' in query["sql"] or '"djforms_option"' in query["sql"]
+                             for query in context.captured_queries))
+        self.assertIsNone(form_cache.get(self.form.id, 1))
+
+    def test_form_changed_by_another_process_changes_etag(self):
+        url = reverse("api_forms", args=[self.form.id])
+        etag = self.client.get(url).headers["ETag"]
+
+        # as saved by another process: the cache of this one is not invalidated
+        Form.objects.filter(pk=self.form.id).update(title="Renamed", version=F("version") + 1)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["ETag"], f'"{self.form.id}-2"')
+        self.assertEqual(response.json()["form"]["title"], "Renamed")
+
+    def test_form_update_changes_etag(self):
+        url = reverse("api_forms", args=[self.form.id])
+        form_data = self.client.get(url).json()["form"]
+        etag = self.client.get(url).headers["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(url, dict(form_data, title="Renamed"), content_type="application/json")
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["form"]["title"], "Renamed")
+        self.assertEqual(Form.objects.get(pk=self.form.id).version, 2)
+
+    def test_respond_not_modified_until_user_responds(self):
+        url = reverse("respond", args=[self.form.id])
+        self.client.get(url)  # sets the CSRF cookie
+        etag = self.client.get(url).headers["ETag"]
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        create_response(self.form, user=self.owner)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+    def test_respond_not_modified_without_compiling_form(self):
+        url = reverse("respond", args=[self.form.id])
+        self.client.get(url)  # sets the CSRF cookie
+        etag = self.client.get(url).headers["ETag"]
+        form_cache.clear()
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(any('"djforms_question"' in query["sql"] or '"djforms_option"' in query["sql"]
+                             for query in context.captured_queries))
+        self.assertIsNone(form_cache.get(self.form.id, 1))
+        self.assertEqual(self.client.get(reverse("respond", args=["unknown"])).status_code, 404)
+
+class FormUpdateTestCase(DjformsTestCase):
+    question_types = None
+
+    def _update(self, form, change):
+        url = reverse("api_forms", args=[form.id])
+        form_data = self.client.get(url).json()["form"]
+        change(form_data["questions"])
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.put(url, form_data, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(context.captured_queries)
+
+    def test_query_count_is_independent_of_questions(self):
+        def change(questions):
+            questions[0]["text"] = "Renamed"
+
+        small_form_queries = self._update(create_form(self.owner, [Question.QuestionType.RADIO] * 2), change)
+        large_form_queries = self._update(create_form(self.owner, [Question.QuestionType.RADIO] * 50), change)
+
+        self.assertEqual(small_form_queries, large_form_queries)
+
+    def test_swaps_and_removals(self):
+        form = create_form(self.owner, [Question.QuestionType.SHORT_TEXT, Question.QuestionType.RADIO,
+                                        Question.QuestionType.CHECKBOX])
+
+        def change(questions):
+            short_text, radio, checkbox = questions
+            short_text["order"], radio["order"] = radio["order"], short_text["order"]
+            radio["options"][0]["text"], radio["options"][1]["text"] = "Option 2", "Option 1"
+            radio["options"][2]["order"] = 4
+            radio["options"].append({"text": "Option 3 again", "order": 3})
+            checkbox["type"] = Question.QuestionType.LONG_TEXT
+
+        self._update(form, change)
+
+        self.assertEqual(list(form.questions.values_list("text", "type")), [
+            ("Question 2", Question.QuestionType.RADIO),
+            ("Question 1", Question.QuestionType.SHORT_TEXT),
+            ("Question 3", Question.QuestionType.LONG_TEXT),
+        ])
+        self.assertEqual(list(form.questions.get(text="Question 2").options.values_list("text", flat=True)),
+                         ["Option 2", "Option 1", "Option 3 again", "Option 3"])
+        self.assertFalse(Option.objects.filter(question__text="Question 3", question__form=form).exists())
+
+    def test_option_text_swap_has_no_nul_placeholder(self):
+        form = create_form(self.owner, [Question.QuestionType.RADIO])
+
+        def change(questions):
+            options = questions[0]["options"]
+            options[0]["text"], options[1]["text"] = options[1]["text"], options[0]["text"]
+
+        params = []
+
+        def record(execute, sql, query_params, many, context):
+            params.extend(map(str, query_params or ()))
+            return execute(sql, query_params, many, context)
+
+        with connection.execute_wrapper(record):
+            self._update(form, change)
+
+        self.assertEqual(list(form.questions.get().options.values_list("text", flat=True)),
+                         ["Option 2", "Option 1", "Option 3"])
+        self.assertFalse(any("\x00" in param for param in params))
+
+    def test_invalid_update_changes_nothing(self):
+        form = create_form(self.owner, [Question.QuestionType.RADIO] * 2)
+        url = reverse("api_forms", args=[form.id])
+        form_data = self.client.get(url).json()["form"]
+        form_data["questions"][1]["order"] = form_data["questions"][0]["order"]
+
+        response = self.client.put(url, form_data, content_type="application/json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(form.questions.values_list("order", flat=True)), [1, 2])
+
+
+    def _patch(self, form, version, operations):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(reverse("api_forms", args=[form.id]),
+                                         {"version": version, "operations": operations},
+                                         content_type="application/json")
+
+        return response, len(context.captured_queries)
+
+    def test_patch_operations(self):
+        form = create_form(self.owner, [Question.QuestionType.RADIO, Question.QuestionType.SHORT_TEXT])
+        radio, short_text = form.questions.all()
+        first_option, second_option, _ = radio.options.all()
+
+        response, _ = self._patch(form, 1, [
+            {"op": "update_form", "title": "Renamed"},
+            {"op": "delete_question", "id": short_text.id},
+            {"op": "update_option", "id": first_option.id, "order": 2},
+            {"op": "update_option", "id": second_option.id, "order": 1},
+            {"op": "add_option", "question_id": radio.id, "option": {"text": "Option 4", "order": 4}},
+            {"op": "add_question", "question": {"text": "Question 3", "type": "CHECKBOX", "is_required": False,
+                                                "order": 2, "options": [{"text": "Yes", "order": 1}]}},
+        ])
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["version"], 2)
+        results = response.json()["results"]
+        self.assertEqual(results[0:4], [None] * 4)
+        self.assertEqual(Option.objects.get(pk=results[4]["id"]).text, "Option 4")
+        self.assertEqual(Question.objects.get(pk=results[5]["id"]).options.get().id, results[5]["option_ids"][0])
+
+        form.refresh_from_db()
+        self.assertEqual((form.title, form.version), ("Renamed", 2))
+        self.assertEqual(list(form.questions.values_list("text", flat=True)), ["Question 1", "Question 3"])
+        self.assertEqual(list(radio.options.values_list("text", flat=True)),
+                         ["Option 2", "Option 1", "Option 3", "Option 4"])
+
+    def test_patch_updates_a_row_once_per_operation(self):
+        form = create_form(self.owner, [Question.QuestionType.RADIO])
+        first_option, second_option, _ = form.questions.get().options.all()
+
+        response, _ = self._patch(form, 1, [
+            {"op": "update_option", "id": first_option.id, "order": 4},
+            {"op": "update_option", "id": second_option.id, "order": 1},
+            {"op": "update_option", "id": first_option.id, "order": 2, "text": "First"},
+        ])
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(list(form.questions.get().options.values_list("text", flat=True)),
+                         ["Option 2", "First", "Option 3"])
+
+    def test_patch_query_count_is_independent_of_questions(self):
+        def patch(question_count):
+            form = create_form(self.owner, [Question.QuestionType.RADIO] * question_count)
+            return self._patch(form, 1, [{"op": "update_question", "id": form.questions.first().id, "text": "New"}])
+
+        small_form_response, small_form_queries = patch(2)
+        large_form_response, large_form_queries = patch(50)
+
+        self.assertEqual(large_form_response.status_code, 200)
+        self.assertEqual(small_form_queries, large_form_queries)
+
+    def test_patch_rejects_stale_version(self):
+        form = create_form(self.owner, [Question.QuestionType.SHORT_TEXT])
+        question = form.questions.get()
+
+        self.assertEqual(self._patch(form, 1, [{"op": "update_question", "id": question.id, "text": "A"}])[0]
+                         .status_code, 200)
+        response, _ = self._patch(form, 1, [{"op": "update_question", "id": question.id, "text": "B"}])
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(form.questions.get().text, "A")
+
+    def test_patch_after_settings_update(self):
+        form = create_form(self.owner, [Question.QuestionType.SHORT_TEXT])
+        question = form.questions.get()
+
+        response = self.client.put(reverse("api_form_settings", args=[form.id]), {
+            "is_open": True, "authenticated_response": False, "multiple_response": True,
+        }, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["version"], 2)
+        response, _ = self._patch(form, response.json()["version"],
+                                  [{"op": "update_question", "id": question.id, "text": "A"}])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["version"], 3)
+        self.assertEqual(form.questions.get().text, "A")
+
+    def test_patch_keeps_choice_questions_with_options(self):
+        form = create_form(self.owner, [Question.QuestionType.RADIO])
+        question = form.questions.get()
+
+        response, _ = self._patch(form, 1, [{"op": "delete_option", "id": option.id}
+                                            for option in question.options.all()])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(question.options.count(), 3)
+        self.assertEqual(Form.objects.get(pk=form.id).version, 1)
+
+
+@override_settings(DJFORMS_CURSOR_PAGINATION=True)
+class CursorPaginationTestCase(DjformsTestCase):
+    question_types = [Question.QuestionType.SHORT_TEXT]
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        created_at = timezone.now()
+        cls.responses = [Response.objects.create(form=cls.form, created_at=created_at) for _ in range(25)]
+
+    def _page_ids(self, query=""):
+        response = self.client.get(reverse("form_responses", args=[self.form.id]) + query)
+        return [form_response.id for form_response in response.context["page_obj"]], response.context["page_obj"]
+
+    def test_pages_follow_cursors_in_both_directions(self):
+        expected_ids = [form_response.id for form_response in reversed(self.responses)]
+
+        first_ids, first_page = self._page_ids()
+        second_ids, second_page = self._page_ids(f"?after={first_page.next_cursor}")
+        third_ids, third_page = self._page_ids(f"?after={second_page.next_cursor}")
+        back_ids, _ = self._page_ids(f"?before={third_page.previous_cursor}")
+
+        self.assertEqual(first_ids + second_ids + third_ids, expected_ids)
+        self.assertFalse(third_page.has_next)
+        self.assertEqual(back_ids, second_ids)
+
+    def test_deep_page_does_not_count_or_offset(self):
+        _, first_page = self._page_ids()
+
+        with CaptureQueriesContext(connection) as context:
+            self._page_ids(f"?after={first_page.next_cursor}")
+
+        self.assertFalse(any("COUNT(" in query["sql"] or "OFFSET" in query["sql"]
+                             for query in context.captured_queries))
+
+
+class CountersTestCase(DjformsTestCase):
+    def _respond(self):
+        data = {}
+
+        for question in self.form.questions.all():
+            if question.type in [Question.QuestionType.SHORT_TEXT, Question.QuestionType.LONG_TEXT]:
+                data[f"answers[{question.id}]"] = "Answer"
+            elif question.type == Question.QuestionType.RADIO:
+                data[f"answers[{question.id}]"] = str(question.options.all()[0].id)
+            else:
+                data[f"answers[{question.id}][]"] = [str(option.id) for option in question.options.all()]
+
+        self.client.post(reverse("respond", args=[self.form.id]), data)
+
+    def test_counters_follow_submissions_and_deletions(self):
+        self._respond()
+        self._respond()
+
+        radio, checkbox = self.form.questions.all()[2:4]
+        self.assertEqual(FormCounter.objects.get(form=self.form).responses, 2)
+        self.assertEqual(QuestionCounter.objects.get(question=radio).answers, 2)
+        self.assertEqual(OptionCounter.objects.get(option=radio.options.all()[0]).selections, 2)
+        self.assertFalse(OptionCounter.objects.filter(option=radio.options.all()[1]).exists())
+        self.assertEqual(OptionCounter.objects.get(option=checkbox.options.all()[2]).selections, 2)
+
+        form_response = Response.objects.filter(form=self.form).first()
+        self.client.delete(reverse("api_form_responses", args=[self.form.id, form_response.id]))
+
+        self.assertEqual(FormCounter.objects.get(form=self.form).responses, 1)
+        self.assertEqual(OptionCounter.objects.get(option=checkbox.options.all()[2]).selections, 1)
+        self.assertContains(self.client.get(reverse("index")), '<span class="badge bg-primary">1</span>')
+
+    def test_command_verifies_and_rebuilds_counters(self):
+        self._respond()
+        create_response(self.form)  # bypasses the counters
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_counters", verify=True, stdout=io.StringIO())
+
+        call_command("rebuild_counters", stdout=io.StringIO())
+        call_command("rebuild_counters", verify=True, stdout=io.StringIO())
+
+        self.assertEqual(FormCounter.objects.get(form=self.form).responses, 2)
+
+
+class SummaryTestCase(DjformsTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        for _ in range(3):
+            create_response(cls.form)
+        call_command("rebuild_counters", stdout=io.StringIO())
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_summary(self):
+        summary = self.client.get(reverse("api_form_summary", args=[self.form.id]) + "?bucket=hour").json()["summary"]
+        short_text, _, radio, checkbox = summary["questions"]
+
+        self.assertEqual(summary["responses"], 3)
+        self.assertEqual(sum(row["count"] for row in summary["timeline"]), 3)
+        self.assertEqual(short_text["length"]["max"], len("Answer to Question 1"))
+        self.assertEqual(short_text["top_terms"][0], {"term": "answer", "count": 3})
+        self.assertEqual([option["selections"] for option in radio["options"]], [3, 0, 0])
+        self.assertEqual([option["percentage"] for option in checkbox["options"]], [100, 100, 0])
+        self.assertContains(self.client.get(reverse("summary", args=[self.form.id])), "3 responses")
+
+    def test_summary_is_cached_until_responses_change(self):
+        url = reverse("api_form_summary", args=[self.form.id])
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+
+        self.assertFalse(any('"djforms_answer"' in query["sql"] for query in context.captured_queries))
+
+        self.client.delete(reverse("api_form_responses", args=[self.form.id, Response.objects.first().id]))
+
+        self.assertEqual(self.client.get(url).json()["summary"]["responses"], 2)
+
+    def _count_terms(self):
+        compiled_form = get_compiled_form(self.form.id)
+        question_id = compiled_form.questions[0].id
+        return count_terms(compiled_form, [question_id], get_response_watermark(self.form.id))[question_id]
+
+    def test_terms_of_added_responses_only_are_counted(self):
+        self.assertEqual(self._count_terms()["answer"], 3)
+
+        # not read again: only the texts of the added responses are
+        Answer.objects.filter(response=Response.objects.order_by("id").first()).update(text="Changed words")
+        compiled_form = get_compiled_form(self.form.id)
+        save_response(compiled_form, Response(form_id=self.form.id), {
+            str(question.id): ("Added answer" if not question.options else
+                               str(question.options[0].id) if question.type == Question.QuestionType.RADIO else
+                               [str(question.options[0].id)])
+            for question in compiled_form.questions
+        })
+
+        terms = self._count_terms()
+        self.assertEqual((terms["answer"], terms["added"], terms["changed"]), (4, 1, 0))
+
+        # counted again from all the texts after a deletion
+        delete_responses([Response.objects.order_by("id").last().id])
+
+        terms = self._count_terms()
+        self.assertEqual((terms["answer"], terms["added"], terms["changed"]), (2, 0, 1))
+
+
+class CompactStorageTestCase(DjformsTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def _respond(self):
+        data = {}
+
+        for question in self.form.questions.all():
+            if question.type in [Question.QuestionType.SHORT_TEXT, Question.QuestionType.LONG_TEXT]:
+                data[f"answers[{question.id}]"] = f"Answer to {question.text}"
+            elif question.type == Question.QuestionType.RADIO:
+                data[f"answers[{question.id}]"] = str(question.options.all()[0].id)
+            else:
+                data[f"answers[{question.id}][]"] = [str(option.id) for option in question.options.all()[0:2]]
+
+        self.client.post(reverse("respond", args=[self.form.id]), data)
+
+    def _download(self):
+        response = self.client.get(reverse("download", args=[self.form.id]))
+        return list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+
+    @override_settings(DJFORMS_RESPONSE_STORAGE="compact")
+    def test_compact_responses_read_like_normalized_ones(self):
+        create_response(self.form)
+        self._respond()
+
+        normalized, compact = Response.objects.filter(form=self.form).order_by("id")
+
+        self.assertIsNone(normalized.answers_data)
+        self.assertIsNotNone(compact.answers_data)
+        self.assertFalse(Answer.objects.filter(response=compact).exists())
+        self.assertEqual(compact.answers_as_dict(), normalized.answers_as_dict())
+
+        rows = self._download()
+        self.assertEqual(rows[1][3:], rows[2][3:])
+
+        summary = self.client.get(reverse("api_form_summary", args=[self.form.id])).json()["summary"]
+        self.assertEqual(summary["questions"][0]["top_terms"][0], {"term": "answer", "count": 2})
+
+        self.client.delete(reverse("api_form_responses", args=[self.form.id, compact.id]))
+        self.assertEqual(OptionCounter.objects.get(option=self.form.questions.all()[3].options.all()[0]).selections, 0)
+
+    @override_settings(DJFORMS_RESPONSE_STORAGE="compact")
+    def test_counters_are_rebuilt_from_compact_responses(self):
+        self._respond()
+        self._respond()
+        stored = count_stored([self.form.id])
+
+        self.assertEqual(count_actual([self.form.id]), stored)
+        call_command("rebuild_counters", "--verify", stdout=io.StringIO())
+
+        # compact answers still refer to the deleted option
+        self.form.questions.all()[3].options.all()[0].delete()
+        call_command("rebuild_counters", stdout=io.StringIO())
+        call_command("rebuild_counters", "--verify", stdout=io.StringIO())
+
+        form_counts, question_counts, option_counts = count_stored([self.form.id])
+        self.assertEqual(form_counts, stored[0])
+        self.assertEqual(question_counts, stored[1])
+        self.assertEqual(option_counts, {key: count for key, count in stored[2].items()
+                                         if Option.objects.filter(id=key).exists()})
+        self.assertEqual(len(option_counts), 2)
+
+    def test_conversion_round_trip(self):
+        create_response(self.form)
+        create_response(self.form, user=self.owner)
+        rows = self._download()
+        answers = [form_response.answers_as_dict() for form_response in Response.objects.order_by("id")]
+
+        call_command("convert_responses", "compact", stdout=io.StringIO())
+
+        self.assertFalse(Answer.objects.exists())
+        self.assertEqual(self._download()[1:], rows[1:])
+
+        call_command("convert_responses", "normalized", stdout=io.StringIO())
+
+        self.assertFalse(Response.objects.filter(answers_data__isnull=False).exists())
+        self.assertEqual([form_response.answers_as_dict() for form_response in Response.objects.order_by("id")],
+                         answers)
+
+
+class ResponseFilterTestCase(DjformsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.questions = list(self.form.questions.order_by("order"))
+        self.radio_options = list(self.questions[2].options.order_by("order"))
+        self.checkbox_options = list(self.questions[3].options.order_by("order"))
+
+        self.normalized_response = create_response(self.form)
+        Response.objects.filter(pk=self.normalized_response.id).update(
+            created_at=timezone.make_aware(timezone.datetime(2026, 1, 1, 12)))
+
+        self.compact_response = Response(form_id=self.form.id, user=self.owner,
+                                         created_at=timezone.make_aware(timezone.datetime(2026, 2, 1, 12)))
+        save_response(get_compiled_form(self.form.id), self.compact_response, {
+            str(self.questions[0].id): "Some special words",
+            str(self.questions[1].id): "More words",
+            str(self.questions[2].id): str(self.radio_options[1].id),
+            str(self.questions[3].id): [str(self.checkbox_options[2].id)],
+        }, storage="compact")
+
+    def _filter(self, **params):
+        response = self.client.get(reverse("form_responses", args=[self.form.id]), params)
+        return [form_response.id for form_response in response.context["page_obj"]]
+
+    def test_filters_match_both_storages(self):
+        normalized_id, compact_id = self.normalized_response.id, self.compact_response.id
+
+        self.assertEqual(self._filter(option=self.radio_options[1].id), [compact_id])
+        self.assertEqual(self._filter(option=self.checkbox_options[0].id), [normalized_id])
+        self.assertEqual(self._filter(option=[self.checkbox_options[0].id, self.checkbox_options[2].id]), [])
+        self.assertEqual(self._filter(text="SPECIAL"), [compact_id])
+        self.assertEqual(self._filter(text="answer to"), [normalized_id])
+        self.assertEqual(self._filter(respondent="anonymous"), [normalized_id])
+        self.assertEqual(self._filter(respondent="owner"), [compact_id])
+        self.assertEqual(self._filter(since="2026-01-15"), [compact_id])
+        self.assertEqual(self._filter(until="2026-01-01"), [normalized_id])
+        self.assertEqual(self._filter(since="", respondent=""), [compact_id, normalized_id])
+
+    def test_filtered_download_selects_columns(self):
+        response = self.client.get(reverse("download", args=[self.form.id]), {
+            "option": self.radio_options[1].id,
+            "column": [self.questions[2].id, self.questions[0].id],
+        })
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+
+        self.assertEqual(rows, [["User", "Email", "Timestamp", "Question 1", "Question 3"],
+                                ["owner", "owner@example.com", rows[1][2], "Some special words", "Option 2"]])
+        self.assertFalse(ExportCache.objects.filter(form=self.form).exists())
+
+    def test_invalid_filters_are_rejected(self):
+        other_form = create_form(self.owner)
+        other_option = Option.objects.filter(question__form=other_form).first()
+        url = reverse("download", args=[self.form.id])
+
+        self.assertEqual(self.client.get(url, {"option": other_option.id}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"since": "yesterday"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("form_responses", args=[self.form.id]),
+                                         {"column": "x"}).status_code, 400)
+
+
+class SearchTestCase(DjformsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.questions = list(self.form.questions.order_by("order"))
+
+    def _save(self, short_text, long_text, storage):
+        form_response = Response(form_id=self.form.id)
+        save_response(get_compiled_form(self.form.id), form_response, {
+            str(self.questions[0].id): short_text,
+            str(self.questions[1].id): long_text,
+            str(self.questions[2].id): str(self.questions[2].options.first().id),
+            str(self.questions[3].id): [str(self.questions[3].options.first().id)],
+        }, storage=storage)
+        return form_response
+
+    def _search(self, **params):
+        response = self.client.get(reverse("api_form_search", args=[self.form.id]), params)
+        return response.json()["results"]
+
+    def test_search_is_ranked_scoped_and_synced(self):
+        normalized = self._save("Blue <b>whale</b>", "Nothing here", "normalized")
+        compact = self._save("Café", "A whale, another whale and a blue sky", "compact")
+
+        results = self._search(q="whale")
+        self.assertEqual([result["response_id"] for result in results], [compact.id, normalized.id])
+        self.assertEqual(results[1]["snippets"], [{"question_id": self.questions[0].id,
+                                                   "snippet": "Blue &lt;b&gt;<mark>whale</mark>&lt;/b&gt;"}])
+        self.assertEqual(results[1]["url"], reverse("response", args=[normalized.id]))
+
+        results = self._search(q="blue whale", question=self.questions[0].id)
+        self.assertEqual([result["response_id"] for result in results], [normalized.id])
+        self.assertEqual([result["response_id"] for result in self._search(q="cafe")], [compact.id])
+        self.assertEqual(self._search(q="'\"*"), [])
+
+        other_form = create_form(self.owner)
+        self.assertEqual(self.client.get(reverse("api_form_search", args=[other_form.id]), {"q": "whale"}).json(),
+                         {"results": []})
+
+        self.client.delete(reverse("api_form_responses", args=[self.form.id, compact.id]))
+        self.assertEqual([result["response_id"] for result in self._search(q="whale")], [normalized.id])
+
+        page = self.client.get(reverse("form_responses", args=[self.form.id]), {"q": "whale"})
+        self.assertContains(page, "<mark>whale</mark>")
+
+    def test_rebuild_indexes_existing_answers(self):
+        form_response = create_response(self.form)
+        self.assertEqual(self._search(q="answer"), [])
+
+        call_command("rebuild_search_index", stdout=io.StringIO())
+
+        self.assertEqual([result["response_id"] for result in self._search(q="answer")], [form_response.id])
+
+
+class DeletionTestCase(DjformsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.questions = list(self.form.questions.order_by("order"))
+
+    def _save(self, storage="normalized", form=None):
+        form = get_compiled_form((form or self.form).id)
+        form_response = Response(form_id=form.id)
+        save_response(form, form_response, {
+            str(question.id): (f"Answer to {question.text}" if not question.options else
+                               str(question.options[0].id) if question.type == Question.QuestionType.RADIO else
+                               [str(option.id) for option in question.options[:2]])
+            for question in form.questions
+        }, storage=storage)
+        return form_response
+
+    def _delete_responses(self, response_ids):
+        return self.client.delete(reverse("api_form_response_list", args=[self.form.id]),
+                                  {"ids": response_ids}, content_type="application/json")
+
+    def test_selected_responses_are_deleted_in_fixed_queries(self):
+        other_response = self._save(form=create_form(self.owner))
+        responses = [self._save("normalized" if index % 2 else "compact") for index in range(12)]
+
+        with CaptureQueriesContext(connection) as context:
+            response = self._delete_responses([responses[0].id, responses[1].id, other_response.id])
+        few_responses_queries = len(context.captured_queries)
+
+        self.assertEqual(response.json(), {"deleted": 2})
+        self.assertTrue(Response.objects.filter(pk=other_response.id).exists())
+
+        with CaptureQueriesContext(connection) as context:
+            self._delete_responses([form_response.id for form_response in responses[2:]])
+
+        self.assertEqual(len(context.captured_queries), few_responses_queries)
+        self.assertFalse(Response.objects.filter(form=self.form).exists())
+        self.assertFalse(Answer.objects.filter(question__form=self.form).exists())
+        self.assertEqual(FormCounter.objects.get(form=self.form).responses, 0)
+        self.assertEqual(set(QuestionCounter.objects.filter(question__form=self.form).values_list(
+            "answers", flat=True)), {0})
+        self.assertEqual(set(OptionCounter.objects.filter(option__question__form=self.form).values_list(
+            "selections", flat=True)), {0})
+
+    @override_settings(DJFORMS_EXPORT_WORKER="command")
+    def test_form_is_marked_deleted_then_purged(self):
+        for _ in range(3):
+            self._save()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(reverse("api_forms", args=[self.form.id])).status_code, 204)
+
+        self.assertEqual(self.client.get(reverse("api_forms", args=[self.form.id])).status_code, 404)
+        self.assertNotContains(self.client.get(reverse("index")), "Survey")
+        self.assertEqual(Response.objects.filter(form=self.form).count(), 3)
+
+        call_command("purge_deleted_forms", stdout=io.StringIO())
+
+        self.assertFalse(Form.objects.filter(pk=self.form.id).exists())
+        self.assertFalse(Response.objects.filter(form_id=self.form.id).exists())
+        self.assertFalse(Answer.objects.filter(question__form_id=self.form.id).exists())
+
+
+class CloneTestCase(DjformsTestCase):
+    question_types = None
+
+    def _clone(self, form, **data):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse("api_form_clone", args=[form.id]), data,
+                                        content_type="application/json")
+        return response, len(context.captured_queries)
+
+    def test_clone_query_count_is_independent_of_form_size(self):
+        small_form = create_form(self.owner, [Question.QuestionType.RADIO])
+        large_form = create_form(self.owner, Question.QuestionType.values * 10)
+        get_compiled_form(small_form.id)
+        get_compiled_form(large_form.id)
+
+        _, small_form_queries = self._clone(small_form)
+        response, large_form_queries = self._clone(large_form)
+        clone = response.json()["form"]
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(small_form_queries, large_form_queries)
+        self.assertEqual(clone["title"], "Survey (copy)")
+        self.assertEqual(
+            [(question["text"], question["type"], [option["text"] for option in question["options"]])
+             for question in clone["questions"]],
+            [(question["text"], question["type"], [option["text"] for option in question["options"]])
+             for question in get_compiled_form(large_form.id).serialize()["questions"]],
+        )
+        self.assertEqual(Option.objects.filter(question__form_id=clone["id"]).count(),
+                         Option.objects.filter(question__form=large_form).count())
+
+    def test_clone_with_responses(self):
+        form = create_form(self.owner)
+        compiled_form = get_compiled_form(form.id)
+        create_response(form)
+        save_response(compiled_form, Response(form_id=form.id), {
+            str(question.id): ("Compact words" if not question.options else
+                               str(question.options[1].id) if question.type == Question.QuestionType.RADIO else
+                               [str(question.options[2].id)])
+            for question in compiled_form.questions
+        }, storage="compact")
+
+        with override_settings(DJFORMS_CLONE_RESPONSES=False):
+            self.assertEqual(self._clone(form, responses=True)[0].status_code, 403)
+
+        with override_settings(DJFORMS_CLONE_RESPONSES=True):
+            clone_id = self._clone(form, responses=True)[0].json()["form"]["id"]
+
+        rows = list(csv.reader(io.StringIO(b"".join(
+            self.client.get(reverse("download", args=[form.id])).streaming_content).decode())))
+        clone_rows = list(csv.reader(io.StringIO(b"".join(
+            self.client.get(reverse("download", args=[clone_id])).streaming_content).decode())))
+
+        self.assertEqual(len(clone_rows), 3)
+        self.assertEqual(clone_rows, rows)
+        self.assertEqual(FormCounter.objects.get(form_id=clone_id).responses, 1)
+        self.assertEqual(
+            [result["response_id"] for result in
+             self.client.get(reverse("api_form_search", args=[clone_id]), {"q": "compact"}).json()["results"]],
+            list(Response.objects.filter(form_id=clone_id, answers_data__isnull=False).values_list("id", flat=True)),
+        )
+
+    def test_clone_compact_response_with_deleted_option_and_question(self):
+        form = create_form(self.owner, [Question.QuestionType.SHORT_TEXT, Question.QuestionType.RADIO,
+                                        Question.QuestionType.CHECKBOX])
+        compiled_form = get_compiled_form(form.id)
+        text_question, radio_question, checkbox_question = compiled_form.questions
+        save_response(compiled_form, Response(form_id=form.id), {
+            str(text_question.id): "Kept",
+            str(radio_question.id): str(radio_question.options[0].id),
+            str(checkbox_question.id): [str(option.id) for option in checkbox_question.options[:2]],
+        }, storage="compact")
+
+        Option.objects.filter(id__in=[radio_question.options[0].id, checkbox_question.options[0].id]).delete()
+        Question.objects.filter(id=text_question.id).delete()
+        form_cache.clear()
+
+        with override_settings(DJFORMS_CLONE_RESPONSES=True):
+            response = self._clone(form, responses=True)[0]
+
+        self.assertEqual(response.status_code, 201)
+        clone = get_compiled_form(response.json()["form"]["id"])
+        self.assertEqual(Response.objects.get(form_id=clone.id).answers_as_dict(), {
+            clone.questions[1].id: [clone.questions[1].options[0].id],
+        })
+
+    def test_dashboard_duplicate(self):
+        form = create_form(self.owner)
+
+        response = self.client.post(reverse("duplicate", args=[form.id]))
+        clone = Form.objects.exclude(pk=form.id).get()
+
+        self.assertRedirects(response, reverse("edit", args=[clone.id]), fetch_redirect_response=False)
+        self.assertEqual(self.client.get(reverse("duplicate", args=[form.id])).status_code, 405)
+
+
+class ExportJobTestCase(DjformsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.override_export_settings(DJFORMS_EXPORT_WORKER="command")
+
+    def _request_export(self):
+        return self.client.post(reverse("api_form_exports", args=[self.form.id]))
+
+    def test_export_is_run_by_worker_and_reused(self):
+        create_response(self.form)
+        FormCounter.objects.create(form=self.form, responses=1)
+
+        response = self._request_export()
+        job = response.json()["job"]
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(job["status"], "PENDING")
+        self.assertEqual(self._request_export().json()["job"]["id"], job["id"])
+
+        call_command("run_export_jobs", "--once", stdout=io.StringIO())
+
+        job = self.client.get(reverse("api_export_jobs", args=[job["id"]])).json()["job"]
+        self.assertEqual((job["status"], job["processed"], job["progress"]), ("DONE", 1, 100.0))
+
+        response = self._request_export()
+        self.assertEqual((response.status_code, response.json()["job"]["id"]), (200, job["id"]))
+
+        content = b"".join(self.client.get(job["url"]).streaming_content).decode()
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][3], "Answer to Question 1")
+
+        create_response(self.form)
+        FormCounter.objects.filter(form=self.form).update(responses=2)
+
+        self.assertNotEqual(self._request_export().json()["job"]["id"], job["id"])
+
+    def test_export_reuses_materialized_export(self):
+        create_response(self.form)
+        create_response(self.form, user=self.owner)
+        refresh_export_cache(get_compiled_form(self.form.id))
+        job = self._request_export().json()["job"]
+
+        with CaptureQueriesContext(connection) as context:
+            call_command("run_export_jobs", "--once", stdout=io.StringIO())
+
+        self.assertFalse(any('"djforms_answer"' in query["sql"] for query in context.captured_queries))
+        with gzip.open(get_export_cache_path(self.form.id), "rb") as file:
+            self.assertEqual(b"".join(self.client.get(reverse("export_file", args=[job["id"]])).streaming_content),
+                             file.read())
+
+        # not reused once it is behind the responses of the job
+        create_response(self.form)
+        job = self._request_export().json()["job"]
+        call_command("run_export_jobs", "--once", stdout=io.StringIO())
+
+        content = b"".join(self.client.get(reverse("export_file", args=[job["id"]])).streaming_content)
+        rows = list(csv.reader(io.StringIO(content.decode())))
+        self.assertEqual(len(rows), 4)
+
+    def test_file_is_served_by_ranges(self):
+        create_response(self.form)
+        job = self._request_export().json()["job"]
+        call_command("run_export_jobs", "--once", stdout=io.StringIO())
+        url = reverse("export_file", args=[job["id"]])
+
+        full = self.client.get(url)
+        content = b"".join(full.streaming_content)
+        self.assertEqual(full.headers["Accept-Ranges"], "bytes")
+
+        partial = self.client.get(url, HTTP_RANGE="bytes=10-", HTTP_IF_RANGE=full.headers["ETag"])
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial.headers["Content-Range"], f"bytes 10-{len(content) - 1}/{len(content)}")
+        self.assertEqual(b"".join(partial.streaming_content), content[10:])
+
+        self.assertEqual(self.client.get(url, HTTP_RANGE="bytes=-5").headers["Content-Length"], "5")
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f"bytes={len(content)}-").status_code, 416)
+        self.assertEqual(self.client.get(url, HTTP_RANGE="bytes=10-", HTTP_IF_RANGE='"other"').status_code, 200)
+
+    def test_shards_are_concatenated_in_order(self):
+        other_form = create_form(self.owner)
+
+        for _ in range(5):
+            create_response(self.form)
+            create_response(other_form)
+
+        form = get_compiled_form(self.form.id)
+        objects = Response.objects.filter(form_id=self.form.id)
+        ranges = split_id_ranges(objects, 3)
+        self.assertEqual([objects.filter(id__gte=first, id__lte=last).count() for first, last in ranges], [1, 2, 2])
+
+        file = io.StringIO()
+        rows = write_csv_shards(ExportPlan(form), self.form.id, objects.order_by("-id")[0].id, file, shards=3)
+
+        expected = "".join(stream_csv(ExportPlan(form), objects))
+        self.assertEqual(rows, 5)
+        self.assertEqual(file.getvalue(), expected.split("\r\n", 1)[1])
+
+
+class BenchmarkViewsTestCase(TestCase):
+    def test_results_are_written_and_compared(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        output = os.path.join(directory, "results.json")
+
+        call_command("benchmark_views", forms=2, questions=4, options=2, responses=3, repeat=1, output=output,
+                     stdout=io.StringIO())
+
+        with open(output) as file:
+            results = json.load(file)
+
+        self.assertEqual(list(results["results"]), [benchmark.name for benchmark in VIEW_BENCHMARKS])
+        self.assertTrue(all(result["queries"] > 0 for result in results["results"].values()))
+        self.assertFalse(Form.objects.exists())
+
+        faster = json.loads(json.dumps(results))
+        faster["results"]["index"]["queries"] -= 1
+        faster["results"]["download"]["median_ms"] = results["results"]["download"]["median_ms"] / 2
+
+        regressions = compare_benchmark_results(faster, results, 0.5)
+        self.assertEqual(len(regressions), 2)
+        self.assertEqual(compare_benchmark_results(results, faster, 0.5), [])
+
+
+class SeedTestCase(TestCase):
+    def setUp(self):
+        form_cache.clear()
+
+    def test_seeded_responses_are_counted_and_indexed(self):
+        call_command("seed_djforms", users=3, forms=2, questions=8, options=3, responses=30, batch_size=7,
+                     storage="normalized", stdout=io.StringIO())
+
+        self.assertEqual(Form.objects.count(), 2)
+        self.assertEqual(Response.objects.count(), 30)
+        self.assertEqual(set(Question.objects.values_list("type", flat=True)), set(Question.QuestionType.values))
+        self.assertEqual(count_stored(), count_actual())
+
+        form_response = Response.objects.order_by("id").last()
+        answers = form_response.answers_as_dict()
+        form = get_compiled_form(form_response.form_id)
+        text = next(value for value in answers.values() if isinstance(value, str))
+        self.assertIn(form_response.id, [result["response_id"] for result in search_responses(form, text)])
+        self.assertTrue(all(question.id in answers for question in form.questions if question.is_required))
+
+        # IDs allocated after the seeded ones
+        self.assertGreater(Response.objects.create(form_id=form.id).id, form_response.id)
+
+    def test_compact_storage(self):
+        call_command("seed_djforms", users=1, forms=1, questions=4, options=2, responses=5, storage="compact",
+                     no_search_index=True, stdout=io.StringIO())
+
+        self.assertFalse(Answer.objects.exists())
+        self.assertFalse(Response.objects.filter(answers_data__isnull=True).exists())
+        self.assertEqual(FormCounter.objects.get().responses, 5)
+
+
+class InstrumentationTestCase(DjformsTestCase):
+    def _set_budget(self, view, queries):
+        previous = view.query_budget
+        view.query_budget = queries
+        self.addCleanup(setattr, view, "query_budget", previous)
+
+    def test_metrics_are_sent_and_logged(self):
+        with self.assertLogs("djforms.instrumentation", "INFO") as logs:
+            response = self.client.get(reverse("index"))
+
+        self.assertRegex(response.headers["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+$')
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record["view"], "index")
+        self.assertEqual(record["budget"], views.index.query_budget)
+        self.assertGreater(record["queries"], 0)
+
+        with override_settings(DJFORMS_INSTRUMENTATION=False):
+            self.assertNotIn("Server-Timing", self.client.get(reverse("index")).headers)
+
+    def test_streamed_queries_are_counted(self):
+        for _ in range(3):
+            create_response(self.form)
+
+        with override_settings(DJFORMS_EXPORT_CACHE=False), self.assertLogs("djforms.instrumentation", "INFO") as logs:
+            response = self.client.get(reverse("download", args=[self.form.id]))
+            self.assertEqual(logs.records, [])
+            b"".join(response.streaming_content)
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record["view"], "download")
+        self.assertGreater(record["queries"], int(response.headers["Server-Timing"].split('desc="')[1].split()[0]))
+
+    def test_exceeded_budget_raises_or_warns(self):
+        self._set_budget(views.index, 1)
+
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse("index"))
+
+        with override_settings(DJFORMS_QUERY_BUDGET_RAISE=False), \
+                self.assertLogs("djforms.instrumentation", "WARNING") as logs:
+            self.assertEqual(self.client.get(reverse("index")).status_code, 200)
+
+        self.assertIn("over its budget of 1", logs.records[-1].getMessage())
+
+    def test_duplicate_queries_share_a_fingerprint(self):
+        self.assertEqual(fingerprint("SELECT * FROM t WHERE id IN (%s, %s) AND name = 'a'")[0],
+                         fingerprint("SELECT * FROM t WHERE id IN (%s) AND name = 'b'")[0])
+        self.assertNotEqual(fingerprint("SELECT * FROM t WHERE id = %s")[0],
+                            fingerprint("SELECT * FROM u WHERE id = %s")[0])
+
+
+class MetricsTestCase(DjformsTestCase):
+    question_types = [Question.QuestionType.SHORT_TEXT]
+    login = False
+
+    def setUp(self):
+        super().setUp()
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def _scrape(self, **headers):
+        response = self.client.get(reverse("metrics"), **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Type"], EXPOSITION_CONTENT_TYPE)
+        return response.content.decode()
+
+    def test_metrics_require_staff_or_token(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+        with override_settings(DJFORMS_METRICS_TOKEN="secret"):
+            self.assertEqual(self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer other").status_code, 403)
+            self._scrape(HTTP_AUTHORIZATION="Bearer secret")
+
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        self._scrape()
+
+    def test_submissions_and_requests_are_measured(self):
+        question = self.form.questions.get()
+        self.client.post(reverse("respond", args=[self.form.id]), {f"answers[{question.id}]": "Yes"})
+        self.client.post(reverse("respond", args=[self.form.id]), {f"answers[{question.id}]": ""})
+
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        text = self._scrape()
+
+        self.assertIn(f'djforms_submissions_total{{form="{self.form.id}",outcome="saved"}} 1\n', text)
+        self.assertIn(f'djforms_submissions_total{{form="{self.form.id}",outcome="failed"}} 1\n', text)
+        self.assertIn('djforms_requests_total{view="respond",method="POST",status="200"} 2\n', text)
+        self.assertIn('djforms_request_duration_seconds_count{view="respond",method="POST"} 2\n', text)
+
+        buckets = [line for line in text.splitlines()
+                   if line.startswith('djforms_request_duration_seconds_bucket{view="respond",method="POST"')]
+        self.assertEqual(len(buckets), len(DEFAULT_BUCKETS))
+        self.assertTrue(buckets[-1].endswith('le="+Inf"} 2'))
+
+    def test_process_files_are_summed(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        with override_settings(DJFORMS_METRICS_DIR=directory):
+            for _ in range(3):
+                SUBMISSIONS.inc(form=1, outcome="saved")
+
+            # file of another worker process
+            shutil.copy(os.path.join(directory, f"metrics-{os.getpid()}.db"), os.path.join(directory, "metrics-1.db"))
+            SUBMISSIONS.inc(form=2, outcome="saved")
+
+            text = registry.render()
+
+        self.assertIn('djforms_submissions_total{form="1",outcome="saved"} 6\n', text)
+        self.assertIn('djforms_submissions_total{form="2",outcome="saved"} 1\n', text)
+
+
+class ProfilingTestCase(DjformsTestCase):
+    question_types = [Question.QuestionType.SHORT_TEXT]
+    login = False
+
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.staff = User.objects.create_user("staff", is_staff=True)
+        self.url = reverse("respond", args=[self.form.id])
+
+    def _settings(self, **kwargs):
+        return override_settings(DJFORMS_PROFILING=True, DJFORMS_PROFILE_ROOT=self.root, **kwargs)
+
+    def test_disabled(self):
+        with override_settings(DJFORMS_PROFILING=False, DJFORMS_PROFILE_ROOT=self.root,
+                               DJFORMS_PROFILE_SAMPLE_RATE=1):
+            self.client.get(self.url, {PROFILE_PARAMETER: make_profile_token(self.staff)})
+
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_requested_profiles(self):
+        with self._settings():
+            self.client.get(self.url)
+            self.client.get(self.url, {PROFILE_PARAMETER: "invalid"})
+            self.assertEqual(list_profiles(), [])
+
+            self.client.get(self.url, {PROFILE_PARAMETER: make_profile_token(self.staff)})
+            self.client.get(self.url, headers={PROFILE_HEADER: make_profile_token(self.staff)})
+            profiles = list_profiles()
+
+        self.assertEqual(len(profiles), 2)
+        self.assertEqual({profile["reason"] for profile in profiles}, {"requested"})
+        self.assertEqual({profile["view"] for profile in profiles}, {"respond"})
+        self.assertTrue(all(profile["url"] == self.url and profile["size"] > 0 for profile in profiles))
+
+    def test_concurrent_requests_are_not_profiled(self):
+        with self._settings(DJFORMS_PROFILE_SAMPLE_RATE=1):
+            # held by a request being profiled in another thread
+            with profile_lock:
+                self.assertEqual(self.client.get(self.url).status_code, 200)
+
+            self.assertEqual(list_profiles(), [])
+            self.client.get(self.url)
+            self.assertEqual(len(list_profiles()), 1)
+            self.assertFalse(profile_lock.locked())
+
+    def test_sampled_profiles_are_pruned(self):
+        with self._settings(DJFORMS_PROFILE_SAMPLE_RATE=1, DJFORMS_PROFILE_LIMIT=2):
+            for _ in range(3):
+                self.client.get(self.url)
+
+            profiles = list_profiles()
+
+        self.assertEqual([profile["reason"] for profile in profiles], ["sampled", "sampled"])
+        self.assertEqual(len(os.listdir(self.root)), 4)
+
+    def test_admin_page(self):
+        with self._settings(DJFORMS_PROFILE_SAMPLE_RATE=1):
+            self.client.get(self.url)
+            name = list_profiles()[0]["name"]
+
+            self.client.force_login(self.owner)
+            self.assertEqual(self.client.get(reverse("profiles")).status_code, 302)
+            self.assertEqual(self.client.get(reverse("profile_file", args=[name])).status_code, 302)
+
+            self.client.force_login(self.staff)
+            response = self.client.get(reverse("profiles"))
+            self.assertContains(response, reverse("profile_file", args=[name]))
+
+            response = self.client.get(reverse("profile_file", args=[name]))
+            self.assertEqual(response.headers["Content-Disposition"], f'attachment; filename="{name}.prof"')
+            self.assertContains(self.client.get(reverse("profile_file", args=[name]), {"format": "text"}),
+                                "cumulative")
+            self.assertEqual(self.client.get(reverse("profile_file", args=["missing"])).status_code, 404)
+
+            self.client.post(reverse("profiles"), {"name": name})
+            self.assertNotIn(name, [profile["name"] for profile in list_profiles()])
@@ -7,18 +7,29 @@ urlpatterns = [
     path("login", views.login_view, name="login"),
     path("logout", views.logout_view, name="logout"),
     path("register", views.register, name="register"),
+    path("metrics", views.metrics, name="metrics"),
 
     path("forms/create", views.create, name="create"),
 
     path("forms/<slug:form_id>", views.respond, name="respond"),
     path("forms/<slug:form_id>/edit", views.edit, name="edit"),
+    path("forms/<slug:form_id>/duplicate", views.duplicate, name="duplicate"),
     path("forms/<slug:form_id>/responses", views.form_responses, name="form_responses"),
     path("forms/<slug:form_id>/responses/download", views.download, name="download"),
+    path("forms/<slug:form_id>/summary", views.summary, name="summary"),
+
+    path("exports/<int:job_id>", views.export_file, name="export_file"),
 
     path("responses/", views.user_responses, name="user_responses"),
     path("responses/<slug:response_id>", views.response, name="response"),
 
     path("api/forms/<slug:form_id>", views.api_forms, name="api_forms"),
     path("api/forms/<slug:form_id>/settings", views.api_form_settings, name="api_form_settings"),
+    path("api/forms/<slug:form_id>/clone", views.api_form_clone, name="api_form_clone"),
+    path("api/forms/<slug:form_id>/summary", views.api_form_summary, name="api_form_summary"),
+    path("api/forms/<slug:form_id>/search", views.api_form_search, name="api_form_search"),
+    path("api/forms/<slug:form_id>/responses", views.api_form_response_list, name="api_form_response_list"),
     path("api/forms/<slug:form_id>/responses/<slug:response_id>", views.api_form_responses, name="api_form_responses"),
+    path("api/forms/<slug:form_id>/exports", views.api_form_exports, name="api_form_exports"),
+    path("api/exports/<int:job_id>", views.api_export_jobs, name="api_export_jobs"),
 ]
@@ -28,3 +28,35 @@ def parse_form_data_arrays(multi_value_dict: MultiValueDict):
             result_dict[key] = value[0] if len(value) == 1 else value
 
     return result_dict
+
+
+def parse_range_header(header: str, size: int):
+    """
+    Parses a ``Range`` header of a single byte range (``bytes=start-end``, ``bytes=start-`` or ``bytes=-suffix``)
+    for a content of the given size. Returns the first and last byte positions, or None if the header
+    is missing, malformed or has many ranges (the full content is then served).
+    Raises ValueError if the range is not satisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+
+    start, _, end = header[len("bytes="):].strip().partition("-")
+
+    if not (start.isdigit() or end.isdigit()) or (start and not start.isdigit()) or (end and not end.isdigit()):
+        return None
+
+    if not start:  # suffix range: last bytes
+        length = int(end)
+        if length == 0 or size == 0:
+            raise ValueError("Range not satisfiable")
+        return max(size - length, 0), size - 1
+
+    first, last = int(start), int(end) if end else size - 1
+
+    if first >= size:
+        raise ValueError("Range not satisfiable")
+
+    if first > last:
+        return None
+
+    return first, min(last, size - 1)
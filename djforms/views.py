@@ -1,38 +1,69 @@
-import csv
+import hashlib
+import io
 import json
+import os
+import pstats
+import time
 import traceback
 
 from django import forms
-from django.contrib import messages
+from django.contrib import admin, messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError, PermissionDenied
 from django.core.paginator import Paginator
-from django.db import transaction
-from django.db.models import Count
+from django.db import transaction, IntegrityError, NotSupportedError
+from django.db.models import F
+from django.db.models.functions import Coalesce
 from django.http import HttpResponseRedirect, JsonResponse, Http404, HttpResponseNotAllowed, HttpResponse, HttpRequest, \
-    StreamingHttpResponse
-from django.shortcuts import render, redirect, get_object_or_404
+    StreamingHttpResponse, FileResponse, HttpResponseBadRequest
+from django.shortcuts import render, redirect
+from django.conf import settings as django_settings
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date
 from django.utils.text import slugify
 
-from .forms import FormForm, QuestionForm, OptionForm, SettingsForm
-from .models import User, Form, Question, Option, Response, Settings, Answer
-from .util import parse_form_data_arrays
+from .cloning import clone_form, is_response_cloning_allowed
+from .compression import GZIP, accepted_encodings, compress_stream, decompress_gzip_stream
+from .deletion import delete_form, delete_responses
+from .editing import update_questions, apply_operations
+from .export import ExportPlan
+from .export_cache import is_export_cache_enabled, get_current_export_cache, request_export_cache_refresh, \
+    get_export_cache_path
+from .export_formats import EXPORT_FORMATS
+from .filters import parse_response_filter
+from .forms import FormForm, SettingsForm
+from .instrumentation import query_budget
+from .jobs import request_export, get_export_path
+from .metrics import EXPOSITION_CONTENT_TYPE, SUBMISSIONS, FORM_UPDATE_DURATION, registry, get_metrics_token, \
+    measure_export
+from .models import User, Form, Question, Option, Response, Settings, ExportJob
+from .pagination import CursorPaginator
+from .profiling import PROFILE_HEADER, PROFILE_PARAMETER, is_profiling_enabled, get_profile_sample_rate, \
+    make_profile_token, list_profiles, get_profile_path, delete_profile
+from .schema import CompiledForm, get_compiled_form, compile_form, invalidate_compiled_form
+from .search import search_responses
+from .storage import save_response, read_answer_index
+from .summary import get_summary, SUMMARY_BUCKETS
+from .util import parse_form_data_arrays, parse_range_header
 
 ITEMS_PER_PAGE = 10
 
+# functions listed in the text summary of a profile
+PROFILE_TEXT_FUNCTIONS = 60
 
+
+@query_budget(5)
 def index(request):
     if request.user.is_authenticated:  # my forms
-        my_forms = Form.objects.filter(created_by=request.user).order_by("-created_at").annotate(
-            responses=Count("response")
-        )
-        paginator = Paginator(my_forms, ITEMS_PER_PAGE)
-
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        my_forms = Form.objects.filter(created_by=request.user, deleted_at__isnull=True).order_by(
+            "-created_at"
+        ).annotate(responses=Coalesce("counter__responses", 0))
+        page_obj = _paginate(request, my_forms)
 
         return render(request, "djforms/dash.html", {
             "page_obj": page_obj
@@ -132,12 +163,42 @@ def create(request):
 
 
 @login_required
-def user_responses(request):
-    objects = Response.objects.filter(user=request.user).order_by("-created_at")
+def duplicate(request, form_id):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(permitted_methods=["POST"])
+
+    form = get_compiled_form(form_id)
+
+    if not form:
+        raise Http404()
+
+    if form.created_by_id != request.user.id:
+        raise PermissionDenied()
+
+    clone = clone_form(form, request.user)
+
+    return redirect("edit", clone.id)
+
+
+def _paginate(request, objects):
+    """
+    Paginates the objects with page numbers, or with cursors when ``DJFORMS_CURSOR_PAGINATION`` is enabled.
+    """
+    if getattr(django_settings, "DJFORMS_CURSOR_PAGINATION", False):
+        return CursorPaginator(objects, ITEMS_PER_PAGE).get_page(request.GET.get("after"), request.GET.get("before"))
+
     paginator = Paginator(objects, ITEMS_PER_PAGE)
 
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    return paginator.get_page(page_number)
+
+
+@login_required
+def user_responses(request):
+    objects = Response.objects.select_related("form").filter(
+        user=request.user, form__deleted_at__isnull=True
+    ).order_by("-created_at")
+    page_obj = _paginate(request, objects)
 
     return render(request, "djforms/user_responses.html", {
         "page_obj": page_obj,
@@ -145,261 +206,429 @@ def user_responses(request):
 
 
 @login_required
+@query_budget(8)
 def form_responses(request, form_id):
-    form = get_object_or_404(Form, pk=form_id)
+    form = get_compiled_form(form_id)
 
-    if form.created_by != request.user:
+    if not form:
+        raise Http404()
+
+    if form.created_by_id != request.user.id:
         raise PermissionDenied()
 
-    objects = Response.objects.filter(form=form).order_by("-created_at")
-    paginator = Paginator(objects, ITEMS_PER_PAGE)
+    try:
+        response_filter = parse_response_filter(form, request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
 
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    search_query = request.GET.get("q", "").strip()
+    search_results = None
+    page_obj = None
+
+    if search_query:
+        try:
+            search_results = _search(form, request.GET)
+        except (ValueError, NotSupportedError) as e:
+            return HttpResponseBadRequest(str(e))
+    else:
+        objects = Response.objects.select_related("user").filter(form_id=form.id).order_by("-created_at")
+        page_obj = _paginate(request, response_filter.apply(form, objects))
 
     return render(request, "djforms/form_responses.html", {
         "form": form,
         "page_obj": page_obj,
+        "search_query": search_query,
+        "search_results": search_results,
+        "response_filter": response_filter,
+        "filter_query": response_filter.to_query() if response_filter.is_active else "",
+    })
+
+
+@login_required
+def summary(request, form_id):
+    form = get_compiled_form(form_id)
+
+    if not form:
+        raise Http404()
+
+    if form.created_by_id != request.user.id:
+        raise PermissionDenied()
+
+    bucket = request.GET.get("bucket", "day")
+
+    if bucket not in SUMMARY_BUCKETS:
+        bucket = "day"
+
+    return render(request, "djforms/summary.html", {
+        "form": form,
+        "summary": get_summary(form, bucket),
+        "buckets": SUMMARY_BUCKETS,
     })
 
 
 @login_required
+@query_budget(20)
 def download(request, form_id):
-    form = get_object_or_404(Form, pk=form_id)
+    form = get_compiled_form(form_id)
+
+    if not form:
+        raise Http404()
 
-    if form.created_by != request.user:
+    if form.created_by_id != request.user.id:
         raise PermissionDenied()
 
-    class Echo:
-        def write(self, value):
-            return value
-
-    filename = f"djforms-{slugify(form.title[0:20])}-{slugify(timezone.now())}.csv"
-    objects = Response.objects.select_related("user").filter(form=form).order_by("-created_at")
-
-    return StreamingHttpResponse(
-        (_stream_form_response_csv_rows(form, objects, Echo())),
-        content_type='text/csv',
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-    )
-
-
-def _stream_form_response_csv_rows(form, objects, pseudo_buffer):
-    writer = csv.writer(pseudo_buffer, delimiter=",", quoting=csv.QUOTE_ALL)
-
-    # write header
-    question_texts = [q.text for q in form.questions.all()]
-    header = ['User', 'Email', 'Timestamp'] + question_texts
-    yield writer.writerow(header)
-
-    # write responses
-    for form_response in objects.iterator():
-        user = form_response.user.username if form_response.user else "Anonymous"
-        email = form_response.user.email if form_response.user else ""
-        timestamp = str(form_response.created_at)
-
-        row_data = [user, email, timestamp]
-
-        answers = form_response.answers_as_dict()
-
-        for question in form.questions.all():
-            if question.type in [Question.QuestionType.SHORT_TEXT,
-                                 Question.QuestionType.LONG_TEXT]:
-                if question.id in answers:
-                    row_data.append(answers.get(question.id))
-                else:
-                    row_data.append(None)
-            elif question.type == Question.QuestionType.RADIO:
-                if question.id in answers:
-                    option = Option.objects.get(pk=answers[question.id])
-                    row_data.append(option.text)
-                else:
-                    row_data.append(None)
-            elif question.type == Question.QuestionType.CHECKBOX:
-                if question.id in answers:
-                    options = Option.objects.filter(pk__in=answers[question.id])
-                    joined_choices = '; '.join([option.text for option in options])
-                    row_data.append(joined_choices)
-                else:
-                    row_data.append(None)
-            else:
-                raise ValueError(f"Question type {question.type} not supported")
-
-        yield writer.writerow(row_data)
+    format_name = request.GET.get("format", "csv")
+    export_format = EXPORT_FORMATS.get(format_name)
+
+    if not export_format:
+        return HttpResponseBadRequest(f"Export format not supported, choose one of: {', '.join(EXPORT_FORMATS)}")
+
+    try:
+        response_filter = parse_response_filter(form, request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    filename = f"djforms-{slugify(form.title[0:20])}-{slugify(timezone.now())}.{export_format.extension}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    encodings = accepted_encodings(request.headers.get("Accept-Encoding", "")) if export_format.compressible else []
+    use_cache = export_format is EXPORT_FORMATS["csv"] and is_export_cache_enabled() and not response_filter.is_active
+    export_cache = get_current_export_cache(form) if use_cache else None
+
+    if use_cache and not export_cache:
+        # streamed meanwhile, rather than rendering the whole export before the first byte
+        request_export_cache_refresh(form.id)
+
+    if export_cache:
+        # the materialized export is gzip-compressed: served as is, or decompressed for the other clients
+        chunks = measure_export(_iter_file_range(get_export_cache_path(form.id), 0, export_cache.file_size),
+                                "cache", format_name)
+
+        if GZIP in encodings:
+            response = StreamingHttpResponse(chunks, content_type=export_format.content_type, headers=headers)
+            response["Content-Encoding"] = GZIP
+            response["Content-Length"] = str(export_cache.file_size)
+        else:
+            response = StreamingHttpResponse(decompress_gzip_stream(chunks), content_type=export_format.content_type,
+                                             headers=headers)
+    else:
+        objects = response_filter.apply(form, Response.objects.filter(form_id=form.id))
+        chunks = measure_export(export_format.stream(ExportPlan(form, response_filter.question_ids), objects),
+                                "download", format_name)
+
+        if encodings:
+            response = StreamingHttpResponse(compress_stream(chunks, encodings[0]),
+                                             content_type=export_format.content_type, headers=headers)
+            response["Content-Encoding"] = encodings[0]
+        else:
+            response = StreamingHttpResponse(chunks, content_type=export_format.content_type, headers=headers)
+
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
 
 
 @login_required
+def export_file(request, job_id):
+    job = ExportJob.objects.select_related("form").filter(
+        pk=job_id, status=ExportJob.Status.DONE, form__deleted_at__isnull=True
+    ).first()
+
+    if not job:
+        raise Http404()
+
+    if job.form.created_by_id != request.user.id:
+        raise PermissionDenied()
+
+    path = get_export_path(job)
+
+    if not os.path.exists(path):
+        raise Http404()
+
+    filename = f"djforms-{slugify(job.form.title[0:20])}-{slugify(job.created_at)}.csv"
+    return _ranged_file_response(request, path, "text/csv", filename, f'"export-{job.id}-{job.file_size}"')
+
+
+def _ranged_file_response(request, path, content_type, filename, etag):
+    """
+    Serves the file, or the single byte range of the ``Range`` header (honoring ``If-Range``),
+    so interrupted downloads can be resumed.
+    """
+    size = os.path.getsize(path)
+    byte_range = None
+
+    if request.headers.get("If-Range", etag) == etag:
+        try:
+            byte_range = parse_range_header(request.headers.get("Range"), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, "rb"), content_type=content_type, as_attachment=True, filename=filename)
+    else:
+        first, last = byte_range
+        response = StreamingHttpResponse(_iter_file_range(path, first, last - first + 1), status=206,
+                                         content_type=content_type)
+        response["Content-Range"] = f"bytes {first}-{last}/{size}"
+        response["Content-Length"] = str(last - first + 1)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    return response
+
+
+def _iter_file_range(path, offset, length, block_size=64 * 1024):
+    with open(path, "rb") as file:
+        file.seek(offset)
+
+        while length > 0:
+            block = file.read(min(block_size, length))
+
+            if not block:
+                return
+
+            length -= len(block)
+            yield block
+
+
+@login_required
+@query_budget(10)
 def response(request, response_id):
-    form_response = Response.objects.prefetch_related(
-        "answers__choices",
-        "form__questions__options",
-        "form__settings"
-    ).filter(pk=response_id).first()
+    form_response = Response.objects.select_related("user").filter(pk=response_id).first()
+    form = get_compiled_form(form_response.form_id) if form_response else None
 
-    if not form_response:
+    if not form:
         raise Http404()
 
-    if (request.user != form_response.form.created_by) and (request.user != form_response.user):
+    if (request.user.id != form.created_by_id) and (request.user.id != form_response.user_id):
         raise PermissionDenied()
 
     return render(request, "djforms/response.html", {
+        "form": form,
         "form_response": form_response,
-        "answers": form_response.answers_as_dict(),
+        "answers": read_answer_index(form_response),
     })
 
 
+@query_budget(20)
 def respond(request, form_id):
-    form = Form.objects.prefetch_related('questions__options', 'settings').filter(pk=form_id).first()
-    form_response = None
-
     if request.method == "POST":
+        form = get_compiled_form(form_id)
+        form_response = None
+
         if form:
             form_response = _save_form_response(request, form)
         else:
             messages.error(request, "Sorry, looks like this form was deleted while you were filling it out.")
 
         return render(request, "djforms/responded.html", {
+            "form": form,
             "form_response": form_response,
         })
     elif request.method == "GET":
+        return _get_respond_page(request, form_id)
+    else:
+        return HttpResponseNotAllowed(permitted_methods=["GET", "POST"])
+
+
+def _get_respond_page(request, form_id):
+    """
+    Validates the ETag and modification date of the page against the current version of the form (one query)
+    before compiling it, so respondents revalidating an unchanged page get a 304 without the form being loaded.
+    """
+    try:
+        form_id = int(form_id)
+    except ValueError:
+        raise Http404()
+
+    validators = Form.objects.filter(pk=form_id, deleted_at__isnull=True).values_list(
+        "version", "created_at", "updated_at").first()
+
+    if not validators:
+        raise Http404()
+
+    version, created_at, updated_at = validators
+
+    if request.user.is_authenticated:
+        last_response = Response.objects.filter(user=request.user, form_id=form_id).order_by("-created_at").first()
+    else:
+        last_response = None
+
+    # the page also depends on the respondent and on the CSRF token embedded in it
+    etag = hashlib.sha1(":".join([
+        str(form_id),
+        str(version),
+        str(request.user.id),
+        str(last_response.id if last_response else None),
+        request.COOKIES.get(django_settings.CSRF_COOKIE_NAME, ""),
+    ]).encode()).hexdigest()
+    last_modified = updated_at or created_at
+
+    if last_response:
+        last_modified = max(last_modified, last_response.created_at)
+
+    def render_page():
+        form = get_compiled_form(form_id, version)
+
         if not form:
             raise Http404()
 
-        if request.user.is_authenticated:
-            last_response = Response.objects.filter(user=request.user, form=form).order_by("-created_at").first()
-        else:
-            last_response = None
-
         return render(request, "djforms/respond.html", {
             "form": form,
             "last_response": last_response
         })
-    else:
-        return HttpResponseNotAllowed(permitted_methods=["GET", "POST"])
 
+    return _conditional_response(request, f'"{etag}"', last_modified, render_page, private=True)
 
-def _save_form_response(request, form_model):
+
+def _save_form_response(request, form_model: CompiledForm):
     # noinspection PyBroadException
     try:
         with (transaction.atomic()):  # all or nothing
-            response_model = Response(form=form_model)
+            response_model = Response(form_id=form_model.id)
 
             if form_model.settings.authenticated_response:
                 if not request.user.is_authenticated:
                     raise PermissionDenied()
 
                 if not form_model.settings.multiple_response \
-                        and Response.objects.filter(form=form_model, user=request.user).count() > 0:
+                        and Response.objects.filter(form_id=form_model.id, user=request.user).count() > 0:
                     raise PermissionDenied()
 
                 response_model.user = request.user
 
-            response_model.full_clean()
-            response_model.save()
-
-            _save_answers(request, form_model, response_model)
+            # the rule of Response.clean is enforced above, without loading the form from the database
+            parsed_form_data = parse_form_data_arrays(request.POST)
+            save_response(form_model, response_model, parsed_form_data.get("answers", {}))
 
             messages.success(request, "Your response has been recorded.")
 
-            return response_model
+        SUBMISSIONS.inc(form=form_model.id, outcome="saved")
+        return response_model
     except Exception:
         print(traceback.format_exc())
         messages.error(request, "Ops! Something went wrong.")
+        SUBMISSIONS.inc(form=form_model.id, outcome="failed")
         return None
 
 
-def _save_answers(request, form: Form, response_model: Response):
-    parsed_form_data = parse_form_data_arrays(request.POST)
-    answers_data = parsed_form_data.get("answers", {})
-
-    questions = Question.objects.filter(form=form).prefetch_related('options')
-    questions_by_id = {str(question.id): question for question in questions}
-    answered_question_ids = []
-
-    for question_id in answers_data:
-        answer_data = answers_data[question_id]
-
-        if question_id not in questions_by_id:
-            raise ValidationError("Answered not found question", code="answered_question_not_found")
-        question = questions_by_id[question_id]
-
-        answer = Answer.objects.create(
-            response=response_model,
-            question=question,
-        )
-
-        if question.type in [Question.QuestionType.SHORT_TEXT, Question.QuestionType.LONG_TEXT]:
-            answer.text = answer_data
-        elif question.type in [Question.QuestionType.RADIO, Question.QuestionType.CHECKBOX]:
-            if question.type == Question.QuestionType.RADIO:
-                answer_data = [answer_data]
-
-            options = Option.objects.filter(pk__in=answer_data)
-            answer.choices.add(*options)
-        else:
-            raise ValueError(f"Question type {question.type} not supported")
-
-        answer.full_clean()
-        answer.save()
-
-        answered_question_ids.append(questions_by_id.pop(question_id))
-
-    required_question_ids = [question for question in questions if question.is_required]
-
-    if len(set(required_question_ids) - set(answered_question_ids)) > 0:
-        raise ValidationError("Question required", code="question_required")
-
-
 @login_required
 def edit(request, form_id):
-    form = Form.objects.prefetch_related('questions__options', 'settings').filter(pk=form_id).first()
+    form = get_compiled_form(form_id)
 
     if not form:
         raise Http404()
 
-    if request.user != form.created_by:
+    if request.user.id != form.created_by_id:
         raise PermissionDenied()
 
     return render(request, "djforms/edit.html", {
         "form": form,
-        "count_questions": form.questions.all().count(),
+        "count_questions": len(form.questions),
         "question_types": [{'id': choice[0], 'name': choice[1]} for choice in Question.QuestionType.choices],
     })
 
 
+def _conditional_response(request, etag, last_modified, render_response, private=False):
+    """
+    Answers conditional GET requests with 304 Not Modified when the validators match,
+    otherwise renders the response. Clients must always revalidate.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+
+    if response is None:
+        response = render_response()
+
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(last_modified.timestamp())
+    if private:
+        patch_cache_control(response, no_cache=True, private=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+
+    return response
+
+
 # API
 
 
 @login_required
+@query_budget(24)
 def api_forms(request: HttpRequest, form_id):
-    form = Form.objects.prefetch_related('questions__options', 'settings').filter(pk=form_id).first()
+    if request.method == "GET":
+        return _get_form(request, form_id)
 
-    if not form:
+    compiled_form = get_compiled_form(form_id)
+
+    if not compiled_form:
         return JsonResponse({"error": "Form not found"}, status=404)
 
-    if request.method == "GET":
-        return JsonResponse({"form": form.serialize()}, status=200)
+    if request.method in ["PUT", "PATCH", "DELETE"] and request.user.id != compiled_form.created_by_id:
+        raise PermissionDenied()
 
-    if request.method == "PUT":
-        if request.user != form.created_by:
-            raise PermissionDenied()
+    form = Form.objects.filter(pk=compiled_form.id).first()
+
+    if not form:
+        return JsonResponse({"error": "Form not found"}, status=404)
 
+    if request.method == "PUT":
         return _update_form(form, json.loads(request.body))
 
+    if request.method == "PATCH":
+        return _patch_form(form, json.loads(request.body))
+
     if request.method == "DELETE":
-        if request.user != form.created_by:
-            raise PermissionDenied()
-        form.delete()
+        delete_form(form.id)
         return HttpResponse(status=204)
 
-    return HttpResponseNotAllowed(permitted_methods=["GET", "PUT", "DELETE"])
+    return HttpResponseNotAllowed(permitted_methods=["GET", "PUT", "PATCH", "DELETE"])
+
+
+def _get_form(request: HttpRequest, form_id):
+    """
+    Validates the ETag of the form against its current version (one query) before compiling it,
+    so editors revalidating an unchanged form get a 304 without the form being loaded.
+    """
+    try:
+        form_id = int(form_id)
+    except ValueError:
+        return JsonResponse({"error": "Form not found"}, status=404)
+
+    validators = Form.objects.filter(pk=form_id, deleted_at__isnull=True).values_list(
+        "version", "created_at", "updated_at").first()
+
+    if not validators:
+        return JsonResponse({"error": "Form not found"}, status=404)
+
+    version, created_at, updated_at = validators
+
+    def render_form():
+        compiled_form = get_compiled_form(form_id, version)
+
+        if not compiled_form:
+            return JsonResponse({"error": "Form not found"}, status=404)
+
+        return JsonResponse({"form": compiled_form.serialize()}, status=200)
+
+    return _conditional_response(request, f'"{form_id}-{version}"', updated_at or created_at, render_form)
 
 
 def _update_form(form: Form, form_data: dict):
     """
-    Saves the edited form with all question and options, removing orphans
-    Use of Django formsets instead of multiple model forms would also be possible.
+    Saves the edited form with all question and options, removing orphans.
+    Only the differences with the saved questions and options are written, see ``update_questions``.
     """
+    start = time.perf_counter()
+    response = _save_form(form, form_data)
+    FORM_UPDATE_DURATION.observe(time.perf_counter() - start,
+                                 outcome="saved" if response.status_code == 200 else "invalid")
+
+    return response
+
+
+def _save_form(form: Form, form_data: dict):
     try:
         with transaction.atomic():  # all or nothing
             form_data["updated_at"] = timezone.now()
@@ -409,11 +638,12 @@ def _update_form(form: Form, form_data: dict):
             if not form.is_valid():
                 raise forms.ValidationError(form.errors.as_text(), code="invalid_form")
             form = form.save()
+            Form.objects.filter(pk=form.id).update(version=F("version") + 1)
 
-            _update_questions(form, form_data)
+            update_questions(form, form_data.get("questions", []))
 
-            form = Form.objects.prefetch_related('questions__options', 'settings').get(pk=form.id)
-            return JsonResponse({"form": form.serialize()}, status=200)
+            invalidate_compiled_form(form.id)
+            return JsonResponse({"form": compile_form(form.id).serialize()}, status=200)
 
     except ValidationError as e:
         return JsonResponse({"error": "Invalid input data", "details": e.messages}, status=400)
@@ -421,83 +651,100 @@ def _update_form(form: Form, form_data: dict):
         return JsonResponse({"error": str(e)}, status=400)
 
 
-def _update_questions(form: Form, form_data: dict):
-    questions_data = form_data.get("questions", [])
+def _patch_form(form: Form, patch_data: dict):
+    """
+    Applies the operations of the edit SPA on single questions and options, see ``apply_operations``.
+    The version the operations are based on must still be the current one (optimistic concurrency),
+    otherwise nothing is changed and 409 is returned.
+    """
+    version = patch_data.get("version")
 
-    if not questions_data or len(questions_data) < 1:
-        raise ValidationError("Form must have at least one question", code="question_required")
+    try:
+        with transaction.atomic():  # all or nothing
+            if not Form.objects.filter(pk=form.id, version=version).update(
+                    version=F("version") + 1, updated_at=timezone.now()):
+                return JsonResponse({"error": "Form changed since it was loaded", "version": form.version},
+                                    status=409)
 
-    question_ids_in_db = [q.id for q in Question.objects.filter(form=form)]
-    question_ids_in_payload = [q.get("id") for q in questions_data if q.get("id") is not None]
+            results = apply_operations(form, patch_data.get("operations", []))
 
-    if set(question_ids_in_payload) - set(question_ids_in_db):
-        raise ValidationError("Attempt to change question not belonging to the form")
+            invalidate_compiled_form(form.id)
+            return JsonResponse({"version": version + 1, "results": results}, status=200)
 
-    # delete from database the removed questions
-    form.questions.exclude(pk__in=question_ids_in_payload).delete()
+    except ValidationError as e:
+        return JsonResponse({"error": "Invalid input data", "details": e.messages}, status=400)
+    except IntegrityError:
+        return JsonResponse({"error": "Question orders, option orders and option texts must be unique"}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
-    for question_data in questions_data:
-        question_data["form"] = form.id
-        question_id = question_data.get("id")
 
-        if question_id:
-            # update existing question
-            question = form.questions.get(pk=question_id)
-            question_form = QuestionForm(question_data, instance=question)
-        else:
-            # create a new question
-            question_form = QuestionForm(question_data)
+@login_required
+def api_form_exports(request: HttpRequest, form_id):
+    form = get_compiled_form(form_id)
+
+    if not form:
+        return JsonResponse({"error": "Form not found"}, status=404)
 
-        question_form.form = form
-        if not question_form.is_valid():
-            raise forms.ValidationError(question_form.errors.as_text(), code="invalid_question")
-        question = question_form.save()
+    if request.user.id != form.created_by_id:
+        raise PermissionDenied()
+
+    if request.method == "POST":
+        job = request_export(form, request.user)
+        return JsonResponse({"job": _serialize_export_job(job)},
+                            status=200 if job.status == ExportJob.Status.DONE else 202)
+
+    return HttpResponseNotAllowed(permitted_methods=["POST"])
 
-        _update_options(question, question_data)
 
+@login_required
+def api_export_jobs(request: HttpRequest, job_id):
+    job = ExportJob.objects.select_related("form").filter(pk=job_id, form__deleted_at__isnull=True).first()
 
-def _update_options(question: Question, question_data: dict):
-    if question.type in [Question.QuestionType.RADIO, Question.QuestionType.CHECKBOX]:
-        options_data = question_data.get("options", [])
+    if not job:
+        return JsonResponse({"error": "Export not found"}, status=404)
 
-        if not options_data or len(options_data) < 1:
-            raise ValidationError(
-                message=f"Question ID {question.id} of {question.type} type must have at least one option",
-                code="option_required",
-            )
+    if request.user.id != job.form.created_by_id:
+        raise PermissionDenied()
 
-        option_ids_in_db = [o.id for o in Option.objects.filter(question=question)]
-        option_ids_in_payload = [o.get("id") for o in options_data if o.get("id") is not None]
+    if request.method == "GET":
+        return JsonResponse({"job": _serialize_export_job(job)}, status=200)
 
-        if set(option_ids_in_payload) - set(option_ids_in_db):
-            raise ValidationError("Attempt to change option of question not belonging to the form")
+    return HttpResponseNotAllowed(permitted_methods=["GET"])
 
-        # delete from database the removed options
-        question.options.exclude(pk__in=option_ids_in_payload).delete()
 
-        for option_data in options_data:
-            option_data["question"] = question
-            option_id = option_data.get("id")
+def _serialize_export_job(job: ExportJob):
+    data = job.serialize()
+    data["url"] = reverse("export_file", args=[job.id]) if job.status == ExportJob.Status.DONE else None
+    return data
 
-            if option_id:
-                # update existing option
-                option = question.options.get(pk=option_id)
-                option_form = OptionForm(option_data, instance=option)
-            else:
-                # create a new option
-                option_form = OptionForm(option_data)
 
-            if not option_form.is_valid():
-                raise forms.ValidationError(option_form.errors.as_text(), code="invalid_option")
-            option_form.save()
-    else:
-        # remove all options for changed question type to non-radio and non-checkbox
-        question.options.all().delete()
+@login_required
+def api_form_clone(request: HttpRequest, form_id):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(permitted_methods=["POST"])
+
+    form = get_compiled_form(form_id)
+
+    if not form:
+        return JsonResponse({"error": "Form not found"}, status=404)
+
+    if request.user.id != form.created_by_id:
+        raise PermissionDenied()
+
+    with_responses = bool(json.loads(request.body or "{}").get("responses", False))
+
+    if with_responses and not is_response_cloning_allowed():
+        return JsonResponse({"error": "Cloning responses is not allowed"}, status=403)
+
+    clone = clone_form(form, request.user, with_responses)
+
+    return JsonResponse({"form": get_compiled_form(clone.id).serialize()}, status=201)
 
 
 @login_required
 def api_form_settings(request: HttpRequest, form_id):
-    form = Form.objects.prefetch_related('settings').filter(pk=form_id).first()
+    form = Form.objects.prefetch_related('settings').filter(pk=form_id, deleted_at__isnull=True).first()
 
     if not form:
         return JsonResponse({"error": "Form not found"}, status=404)
@@ -516,15 +763,106 @@ def _update_settings(form: Form, settings_data: dict):
         model_form = SettingsForm(settings_data, instance=form.settings)
         if not model_form.is_valid():
             raise forms.ValidationError(model_form.errors.as_text(), code="invalid_settings")
-        settings = model_form.save()
+        with transaction.atomic():
+            settings = model_form.save()
+            Form.objects.filter(pk=form.id).update(version=F("version") + 1, updated_at=timezone.now())
+            version = Form.objects.values_list("version", flat=True).get(pk=form.id)
+            invalidate_compiled_form(form.id)
 
-        return JsonResponse({"settings": settings.serialize()}, status=200)
+        return JsonResponse({"settings": settings.serialize(), "version": version}, status=200)
     except ValidationError as e:
         return JsonResponse({"error": "Invalid input data", "details": e.messages}, status=400)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
 
+@login_required
+def api_form_summary(request: HttpRequest, form_id):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(permitted_methods=["GET"])
+
+    form = get_compiled_form(form_id)
+
+    if not form:
+        return JsonResponse({"error": "Form not found"}, status=404)
+
+    if request.user.id != form.created_by_id:
+        raise PermissionDenied()
+
+    bucket = request.GET.get("bucket", "day")
+
+    if bucket not in SUMMARY_BUCKETS:
+        return JsonResponse({"error": f"Bucket must be one of {', '.join(SUMMARY_BUCKETS)}"}, status=400)
+
+    return JsonResponse({"summary": get_summary(form, bucket)}, status=200)
+
+
+@login_required
+def api_form_search(request: HttpRequest, form_id):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(permitted_methods=["GET"])
+
+    form = get_compiled_form(form_id)
+
+    if not form:
+        return JsonResponse({"error": "Form not found"}, status=404)
+
+    if request.user.id != form.created_by_id:
+        raise PermissionDenied()
+
+    try:
+        results = _search(form, request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except NotSupportedError as e:
+        return JsonResponse({"error": str(e)}, status=501)
+
+    return JsonResponse({"results": results}, status=200)
+
+
+def _search(form: CompiledForm, params):
+    """
+    Searches the text answers of the form with the ``q`` parameter, scoped to the ``question`` parameter if any.
+    """
+    question_id = params.get("question") or None
+
+    if question_id is not None:
+        question_id = int(question_id) if question_id.isdigit() else None
+
+        if question_id not in form.questions_by_id:
+            raise ValueError("Question not found")
+
+    results = search_responses(form, params.get("q", ""), question_id)
+
+    for result in results:
+        result["url"] = reverse("response", args=[result["response_id"]])
+
+    return results
+
+
+@login_required
+def api_form_response_list(request: HttpRequest, form_id):
+    if request.method != "DELETE":
+        return HttpResponseNotAllowed(permitted_methods=["DELETE"])
+
+    form = get_compiled_form(form_id)
+
+    if not form:
+        return JsonResponse({"error": "Form not found"}, status=404)
+
+    if request.user.id != form.created_by_id:
+        raise PermissionDenied()
+
+    response_ids = json.loads(request.body).get("ids")
+
+    if not isinstance(response_ids, list) or not all(isinstance(response_id, int) for response_id in response_ids):
+        return JsonResponse({"error": "List of response IDs required"}, status=400)
+
+    response_ids = list(Response.objects.filter(form_id=form.id, id__in=response_ids).values_list("id", flat=True))
+
+    return JsonResponse({"deleted": delete_responses(response_ids)}, status=200)
+
+
 @login_required
 def api_form_responses(request: HttpRequest, form_id, response_id):
     if request.method != "DELETE":
@@ -538,6 +876,60 @@ def api_form_responses(request: HttpRequest, form_id, response_id):
     if request.user != form_response.form.created_by:
         raise PermissionDenied()
 
-    form_response.delete()
+    delete_responses([form_response.id])
 
     return HttpResponse(status=204)
+
+
+def metrics(request: HttpRequest):
+    """
+    Metrics of the application in the text exposition format of Prometheus,
+    for staff users and the scrapers with the bearer token of ``DJFORMS_METRICS_TOKEN``.
+    """
+    token = get_metrics_token()
+    authorization = request.headers.get("Authorization", "")
+
+    if not request.user.is_staff and not (token and constant_time_compare(authorization, f"Bearer {token}")):
+        raise PermissionDenied()
+
+    return HttpResponse(registry.render(), content_type=EXPOSITION_CONTENT_TYPE)
+
+
+# Admin
+
+
+@staff_member_required
+def profiles(request: HttpRequest):
+    if request.method == "POST":
+        delete_profile(request.POST.get("name", ""))
+        return HttpResponseRedirect(reverse("profiles"))
+
+    return render(request, "admin/djforms/profiles.html", {
+        **admin.site.each_context(request),
+        "title": "Profiles",
+        "profiles": list_profiles(),
+        "enabled": is_profiling_enabled(),
+        "sample_rate": get_profile_sample_rate(),
+        "header": PROFILE_HEADER,
+        "parameter": PROFILE_PARAMETER,
+        "token": make_profile_token(request.user),
+    })
+
+
+@staff_member_required
+def profile_file(request: HttpRequest, name):
+    """
+    Stats of the profile, downloaded for ``pstats`` (or snakeviz), or summarized as text with ``format=text``
+    (the functions of highest cumulative time).
+    """
+    path = get_profile_path(name)
+
+    if not path or not os.path.exists(path):
+        raise Http404()
+
+    if request.GET.get("format") == "text":
+        stream = io.StringIO()
+        pstats.Stats(path, stream=stream).sort_stats("cumulative").print_stats(PROFILE_TEXT_FUNCTIONS)
+        return HttpResponse(stream.getvalue(), content_type="text/plain; charset=utf-8")
+
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=f"{name}.prof")
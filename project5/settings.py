@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'djforms.profiling.ProfilingMiddleware',
+    'djforms.metrics.MetricsMiddleware',
+    'djforms.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -125,3 +129,61 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# DjForms
+
+# Size and timeout (in seconds) of the process-local cache of compiled forms
+DJFORMS_FORM_CACHE_SIZE = 256
+DJFORMS_FORM_CACHE_TIMEOUT = 30
+
+# Cursor (keyset) pagination instead of page numbers for listings of forms and responses
+DJFORMS_CURSOR_PAGINATION = False
+
+# Storage of the answers of new responses: "normalized" (answer rows) or "compact" (JSON in the response row)
+DJFORMS_RESPONSE_STORAGE = "normalized"
+
+# Worker of the export jobs: "thread" (thread pool of the web process) or "command" (run_export_jobs command)
+DJFORMS_EXPORT_WORKER = "thread"
+DJFORMS_EXPORT_THREADS = 2
+DJFORMS_EXPORT_ROOT = BASE_DIR / "exports"
+
+# Materialized CSV export per form, served when up to date, appended with the newer responses in the background
+DJFORMS_EXPORT_CACHE = True
+
+# Worker processes rendering the export jobs in shards of responses (1: rendered in the worker of the job)
+DJFORMS_EXPORT_PROCESSES = 1
+
+# Whether forms can be cloned with their responses (for test environments)
+DJFORMS_CLONE_RESPONSES = DEBUG
+
+# Whether the process runs the tests
+TESTING = len(sys.argv) > 1 and sys.argv[1] == "test"
+
+# Per-request measures of the queries and wall time (Server-Timing header and djforms.instrumentation logs),
+# and query budgets of the views: exceeding one raises in tests, and logs a warning otherwise
+DJFORMS_INSTRUMENTATION = DEBUG or TESTING
+DJFORMS_QUERY_BUDGET_RAISE = TESTING
+
+# Counters and latency histograms served at /metrics (to staff users, or with the bearer token),
+# shared by the processes of the server through files in DJFORMS_METRICS_DIR when set (kept per process otherwise)
+DJFORMS_METRICS = True
+DJFORMS_METRICS_DIR = None
+DJFORMS_METRICS_TOKEN = None
+
+# cProfile of 1 request out of DJFORMS_PROFILE_SAMPLE_RATE (0: none), or of the requests with a token of the
+# admin page of the profiles, kept in DJFORMS_PROFILE_ROOT (the newest DJFORMS_PROFILE_LIMIT ones)
+DJFORMS_PROFILING = False
+DJFORMS_PROFILE_SAMPLE_RATE = 0
+DJFORMS_PROFILE_ROOT = BASE_DIR / "profiles"
+DJFORMS_PROFILE_LIMIT = 200
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "djforms.instrumentation": {"handlers": ["console"], "level": "WARNING" if TESTING else "INFO"},
+    },
+}
@@ -17,7 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from djforms import views as djforms_views
+
 urlpatterns = [
+    # pages of the admin site not tied to a model, before its catch-all
+    path('admin/profiles/', djforms_views.profiles, name="profiles"),
+    path('admin/profiles/<str:name>', djforms_views.profile_file, name="profile_file"),
     path('admin/', admin.site.urls),
     path("", include("djforms.urls")),
 ]